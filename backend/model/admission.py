@@ -0,0 +1,224 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+# Highest priority first: uploads someone is waiting on, then live-detection frames
+# (a dropped one is replaced by the next), then batch and video jobs
+PRIORITIES = ("interactive", "live", "bulk")
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; retry_after is a hint in whole seconds"""
+
+    def __init__(self, reason, retry_after=1):
+        super().__init__(f"Server overloaded ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("client", "level", "event", "granted", "reason", "queued_at")
+
+    def __init__(self, client, level):
+        self.client = client
+        self.level = level
+        self.event = threading.Event()
+        self.granted = False
+        self.reason = None
+        self.queued_at = time.perf_counter()
+
+
+class AdmissionController:
+    """
+    Bounded, prioritized admission in front of inference.
+
+    At most `max_concurrent` requests hold a slot at once. Others wait in a queue
+    of at most `max_queue` entries, served strictly by priority and round-robin
+    across clients within a priority, so one busy client cannot starve the rest.
+    A request is shed with Overloaded instead of queueing when:
+
+    - its client already has `max_per_client` requests waiting ("client"),
+    - the queue is full and holds nothing of lower priority to evict ("queue_full"),
+    - the estimated wait, from the average slot hold time, exceeds `max_wait` ("wait"),
+    - it waited `max_wait` seconds without getting a slot ("timeout").
+
+    A full queue makes room for a higher-priority request by evicting the newest
+    waiter of the lowest priority present, taken from the client with the most
+    queued; that waiter is shed with "preempted".
+    """
+
+    def __init__(self, max_concurrent=64, max_queue=128, max_per_client=8, max_wait=1.0,
+                 on_admit=None, on_shed=None):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.max_per_client = max(1, int(max_per_client))
+        self.max_wait = max_wait
+        self.on_admit = on_admit
+        self.on_shed = on_shed
+        self.in_flight = 0
+        self.admitted = dict.fromkeys(PRIORITIES, 0)
+        self.shed = {priority: {} for priority in PRIORITIES}
+        self._queues = [OrderedDict() for _ in PRIORITIES]
+        self._queued = [0] * len(PRIORITIES)
+        self._client_queued = {}
+        self._service_seconds = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _level(priority):
+        try:
+            return PRIORITIES.index(priority)
+        except ValueError:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {PRIORITIES}") from None
+
+    def queued(self, priority=None):
+        """Requests waiting for a slot, for one priority or in total"""
+        with self._lock:
+            return self._queued[self._level(priority)] if priority else sum(self._queued)
+
+    def retry_after(self):
+        with self._lock:
+            return self._retry_after()
+
+    def _retry_after(self):
+        if not self._service_seconds:
+            return 1
+        return max(1, math.ceil((sum(self._queued) + 1) * self._service_seconds / self.max_concurrent))
+
+    def acquire(self, client=None, priority="interactive"):
+        """Block until the request holds a slot; raises Overloaded when it is shed"""
+        level = self._level(priority)
+        start = time.perf_counter()
+        with self._lock:
+            if self.in_flight < self.max_concurrent and not any(self._queued):
+                self.in_flight += 1
+                self.admitted[priority] += 1
+                waiter = None
+            else:
+                reason = self._rejection(client, level)
+                if reason:
+                    self._record_shed(priority, reason)
+                    raise Overloaded(reason, self._retry_after())
+                waiter = self._enqueue(client, level)
+
+        if waiter is None:
+            if self.on_admit:
+                self.on_admit(priority, 0.0)
+            return
+
+        waiter.event.wait(self.max_wait)
+        with self._lock:
+            if not waiter.granted and waiter.reason is None:
+                self._remove(waiter)
+                waiter.reason = "timeout"
+                self._record_shed(priority, "timeout")
+            if not waiter.granted:
+                raise Overloaded(waiter.reason, self._retry_after())
+            self.admitted[priority] += 1
+        if self.on_admit:
+            self.on_admit(priority, time.perf_counter() - start)
+
+    def release(self, seconds=None):
+        """Give up a slot, handing it straight to the next waiter. seconds is how long it was held"""
+        with self._lock:
+            if seconds is not None:
+                # Smoothed slot hold time, used for wait estimates and Retry-After
+                self._service_seconds = seconds if self._service_seconds is None else (
+                    0.9 * self._service_seconds + 0.1 * seconds
+                )
+            waiter = self._pop_next()
+            if waiter is None:
+                self.in_flight -= 1
+            else:
+                waiter.granted = True
+                waiter.event.set()
+
+    @contextmanager
+    def slot(self, client=None, priority="interactive"):
+        self.acquire(client, priority)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def _rejection(self, client, level):
+        """Reason to shed a request that would have to queue, or None; evicts a waiter if that makes room"""
+        if self._client_queued.get(client, 0) >= self.max_per_client:
+            return "client"
+        if sum(self._queued) >= self.max_queue and not self._evict_below(level):
+            return "queue_full"
+        if self._service_seconds is not None:
+            ahead = sum(self._queued[:level + 1])
+            if (ahead + 1) * self._service_seconds / self.max_concurrent > self.max_wait:
+                return "wait"
+        return None
+
+    def _enqueue(self, client, level):
+        waiter = _Waiter(client, level)
+        self._queues[level].setdefault(client, deque()).append(waiter)
+        self._queued[level] += 1
+        self._client_queued[client] = self._client_queued.get(client, 0) + 1
+        return waiter
+
+    def _dequeued(self, waiter):
+        self._queued[waiter.level] -= 1
+        remaining = self._client_queued[waiter.client] - 1
+        if remaining:
+            self._client_queued[waiter.client] = remaining
+        else:
+            del self._client_queued[waiter.client]
+
+    def _pop_next(self):
+        """Oldest waiter of the next client in line at the highest non-empty priority"""
+        for queue in self._queues:
+            if queue:
+                client, waiters = next(iter(queue.items()))
+                waiter = waiters.popleft()
+                # Re-inserting moves the client to the back of the round-robin
+                del queue[client]
+                if waiters:
+                    queue[client] = waiters
+                self._dequeued(waiter)
+                return waiter
+        return None
+
+    def _remove(self, waiter):
+        queue = self._queues[waiter.level]
+        waiters = queue[waiter.client]
+        waiters.remove(waiter)
+        if not waiters:
+            del queue[waiter.client]
+        self._dequeued(waiter)
+
+    def _evict_below(self, level):
+        for lower in range(len(PRIORITIES) - 1, level, -1):
+            queue = self._queues[lower]
+            if queue:
+                waiters = max(queue.values(), key=len)
+                waiter = waiters[-1]
+                self._remove(waiter)
+                waiter.reason = "preempted"
+                self._record_shed(PRIORITIES[lower], "preempted")
+                waiter.event.set()
+                return True
+        return False
+
+    def _record_shed(self, priority, reason):
+        self.shed[priority][reason] = self.shed[priority].get(reason, 0) + 1
+        if self.on_shed:
+            self.on_shed(priority, reason)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "max_concurrent": self.max_concurrent,
+                "queued": dict(zip(PRIORITIES, self._queued)),
+                "max_queue": self.max_queue,
+                "admitted": dict(self.admitted),
+                "shed": {priority: dict(reasons) for priority, reasons in self.shed.items()},
+                "avg_service_ms": self._service_seconds * 1000.0 if self._service_seconds is not None else None,
+            }
@@ -0,0 +1,113 @@
+"""
+Background job handlers, run inside jobs.py worker processes.
+
+Each takes (params, job) and returns a JSON-serializable result; see jobs.py.
+Models are loaded on first use and kept for the life of the worker, so a worker
+pays the load once rather than per job.
+"""
+
+import os
+
+import numpy as np
+
+_models = {}
+
+
+def load_model(backend, path):
+    from inference import load_backend
+
+    key = (backend, path)
+    if key not in _models:
+        _models[key] = load_backend(backend, path, num_threads=int(os.getenv("INFERENCE_THREADS", "0")) or None)
+    return _models[key]
+
+
+def score_images(params, job):
+    """
+    Score the image files in the job directory, like /predict/batch.
+
+    params: model_path, backend, files (stored names in job.dir), names (the
+    uploaded file names, reported in the results), batch_size
+    """
+    from emotions import format_prediction
+    from preprocessing import decode_grayscale, preprocess_batch
+
+    model = load_model(params["backend"], params["model_path"])
+    files = params["files"]
+    names = params.get("names") or files
+    batch_size = params.get("batch_size", 32)
+    buffer = np.empty((batch_size, 48, 48, 1), dtype=np.float32)
+    results = [None] * len(files)
+    for start in range(0, len(files), batch_size):
+        images, positions = [], []
+        for i in range(start, min(start + batch_size, len(files))):
+            with open(os.path.join(job.dir, files[i]), "rb") as f:
+                data = f.read()
+            try:
+                images.append(decode_grayscale(data))
+                positions.append(i)
+            except Exception as e:
+                results[i] = {"filename": names[i], "error": f"Invalid image: {e}"}
+        if images:
+            scores = model.predict(preprocess_batch(images, buffer[:len(images)]))
+            for i, row in zip(positions, scores):
+                results[i] = {"filename": names[i], **format_prediction(row)}
+        done = min(start + batch_size, len(files))
+        job.progress(done / len(files), f"{done}/{len(files)} images")
+    return {"count": len(results), "results": results, "model": params.get("model")}
+
+
+def analyze_video(params, job):
+    """
+    Emotion timeline for a video in the job directory, like /analyze/video.
+
+    params: model_path, backend, file, sample_fps, max_frames, batch_size
+    """
+    import cv2
+    from emotions import CLASS_NAMES, format_prediction
+    from preprocessing import preprocess_batch
+    from video_analysis import VideoSummary, analyze_video as analyze
+
+    path = os.path.join(job.dir, params["file"])
+    model = load_model(params["backend"], params["model_path"])
+    sample_fps = params.get("sample_fps", 2.0)
+    max_frames = params.get("max_frames")
+
+    capture = cv2.VideoCapture(path)
+    frame_count = capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+    fps = capture.get(cv2.CAP_PROP_FPS) or 0
+    capture.release()
+    # Frames we expect to sample, for progress only
+    expected = frame_count * sample_fps / fps if fps and sample_fps > 0 else frame_count
+    if max_frames:
+        expected = min(expected, max_frames)
+
+    summary = VideoSummary(CLASS_NAMES)
+    timeline = []
+    for entry in analyze(path, model.predict, preprocess_batch, format_prediction, summary,
+                         sample_fps=sample_fps, batch_size=params.get("batch_size", 32), max_frames=max_frames):
+        timeline.append(entry)
+        if expected:
+            job.progress(min(len(timeline) / expected, 0.99), f"{entry['time']:.1f}s analyzed")
+    return {"timeline": timeline, "summary": summary.result(), "model": params.get("model")}
+
+
+SUMMARY_PROMPT = (
+    "Summarize this conversation in a few sentences for the user to look back on: "
+    "how they were feeling, what they talked about and any advice that helped."
+)
+
+
+def summarize_session(params, job):
+    """
+    LLM summary of a chat session.
+
+    params: messages (the session history as {"role", "content"} dicts)
+    """
+    from emotion_agent import EmotionAgent
+
+    job.progress(0.1, "Waiting for the language model")
+    summary, error = EmotionAgent().chat(SUMMARY_PROMPT, None, None, params["messages"])
+    if error:
+        raise RuntimeError(error)
+    return {"summary": summary, "messages": len(params["messages"])}
@@ -1,31 +1,656 @@
-from flask import Flask, request, jsonify
+import os
+import hmac
+import json
+import uuid
+import secrets
+import time
+import shutil
+import tarfile
+import tempfile
+import zipfile
+from contextlib import nullcontext
+from io import BytesIO
+from flask import Flask, Response, g, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
-import tensorflow as tf
+from werkzeug.exceptions import RequestEntityTooLarge
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
 import numpy as np
 from PIL import Image
-from emotion_agent import EmotionAgent
+from emotion_agent import EmotionAgent, TEXT_MODEL
+from chat_cache import ChatResponseCache
+from batching import MicroBatcher
+from inference import artifact_backend, load_backend, backend_model_path
+from emotions import CLASS_NAMES, format_prediction
+from face_detection import load_face_detector, crop_faces
+from stream import FrameStreamSession
+from smoothing import StreamSmoother
+from video_analysis import VideoSummary, analyze_video
+from preprocessing import BufferPool, decode_grayscale, preprocess_batch, preprocess_into
+from prediction_cache import PredictionCache, SqlitePredictionStore
+from conversation_store import ConversationStore, SqliteConversationBackend
+from startup import Startup, FAILED
+from frame_store import FrameStore, SqliteFrameStore
+from metrics import REGISTRY, Counter, Gauge, Histogram
+from model_registry import ModelRegistry
+from admission import PRIORITIES, AdmissionController, Overloaded
+from jobs import FINISHED, SUCCEEDED, JobQueue
+from profiling import FORMATS as PROFILE_FORMATS, Profiler
+from timeline_store import SCORE_DTYPES as TIMELINE_SCORE_DTYPES, TimelineStore
 
 app = Flask(__name__)
-CORS(app)
+# Retry-After is exposed so the frontend can show how long to wait after a 429
+CORS(app, expose_headers=["Retry-After"])
+sock = Sock(app) if Sock else None
+
+# In-process metrics, scraped from /metrics in the Prometheus text format
+REQUESTS = Counter("http_requests_total", "HTTP requests by route, method and status", ("endpoint", "method", "status"))
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time until the response is returned (first byte for streams)", ("endpoint",)
+)
+STAGE_SECONDS = Histogram("stage_duration_seconds", "Latency of individual request stages", ("stage",))
+BATCH_ROWS = Histogram("model_batch_rows", "Rows per model forward pass", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+QUEUE_DEPTH = Gauge("model_queue_depth", "Requests waiting for the next forward pass")
+CACHE_HIT_RATIO = Gauge("cache_hit_ratio", "Fraction of lookups served from cache", ("cache",))
+CACHE_ENTRIES = Gauge("cache_entries", "Entries currently held per cache", ("cache",))
+APP_READY = Gauge("app_ready", "1 once every required component has loaded")
+MODEL_SECONDS = Histogram("model_inference_seconds", "Forward-pass latency per model version", ("model",))
+MODEL_PREDICTIONS = Counter(
+    "model_predictions_total", "Served predictions by model version and top emotion", ("model", "emotion")
+)
+STREAM_FRAMES = Counter("stream_frames_total", "Live-stream frames by whether the model ran", ("outcome",))
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Requests holding an inference slot")
+ADMISSION_QUEUED = Gauge("admission_queue_depth", "Requests waiting for an inference slot", ("priority",))
+ADMISSION_SHED = Counter("admission_shed_total", "Requests rejected with 429 by admission control", ("priority", "reason"))
+JOBS = Gauge("jobs", "Background jobs in the job store by status", ("status",))
+JOB_WORKERS = Gauge("job_workers", "Background job worker processes running for this server")
+# hit + coalesced = upstream LLM calls saved
+CHAT_CACHE_REQUESTS = Counter("chat_cache_requests_total", "Cacheable chat requests by cache outcome", ("outcome",))
+TIMELINE_FRAMES = Counter("timeline_frames_total", "Predictions appended to emotion timelines")
+
 emotion_agent = EmotionAgent()
+emotion_agent.on_timing = lambda stage, seconds: STAGE_SECONDS.observe(seconds, stage=stage)
 
-# Load the trained model
-model_path = "models/FER_model.h5"
-try:
-    model = tf.keras.models.load_model(model_path)
-    print(f"✅ Successfully loaded model from {model_path}")
-except FileNotFoundError:
-    print(f"⚠️ Warning: Model file not found at {model_path}")
-    model = None
+# Replies to text-only first turns (typically the prompt generated from a detected
+# emotion) are shared between users: keyed on the normalized message, the emotion with
+# its confidence in CHAT_CACHE_BUCKET-point buckets and the model. Identical concurrent
+# requests also share one upstream call
+CHAT_CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", "512"))
+chat_cache = ChatResponseCache(
+    max_entries=CHAT_CACHE_SIZE,
+    ttl=float(os.getenv("CHAT_CACHE_TTL", "600")),
+    bucket_width=int(os.getenv("CHAT_CACHE_BUCKET", "10")),
+) if CHAT_CACHE_SIZE > 0 else None
+if chat_cache is not None:
+    CACHE_HIT_RATIO.set_function(lambda: chat_cache.stats()["hit_ratio"], cache="chat")
+    CACHE_ENTRIES.set_function(lambda: chat_cache.stats()["size"], cache="chat")
+
+# Per-session chat histories; CHAT_SESSION_DB persists them in a local SQLite file.
+# serve.py sets SERVE_WORKERS so multi-process deployments re-read the shared file
+CHAT_SESSION_DB = os.getenv("CHAT_SESSION_DB")
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "1"))
+conversations = ConversationStore(
+    max_sessions=int(os.getenv("CHAT_SESSION_MAX", "1000")),
+    ttl=float(os.getenv("CHAT_SESSION_TTL", "3600")),
+    max_tokens=int(os.getenv("CHAT_HISTORY_TOKENS", "2000")),
+    backend=SqliteConversationBackend(CHAT_SESSION_DB) if CHAT_SESSION_DB else None,
+    shared=SERVE_WORKERS > 1,
+)
+
+# Requests arriving within BATCH_MAX_WAIT_MS of each other share one forward pass
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+MODEL_XLA_JIT = os.getenv("MODEL_XLA_JIT", "0") == "1"
+
+# keras (default), tflite, tflite_int8 or onnx; the others serve files made by
+# convert_models.py (tflite_int8: quantize_model.py) next to the .h5
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "keras")
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0")) or None
+
+# The trained model is loaded and warmed up by the startup subsystem below; until then
+# the registry has no active version and the prediction routes answer 503.
+# MODEL_CANDIDATE_PATH loads a second version that serves MODEL_CANDIDATE_PERCENT of traffic
+MODEL_PATH = os.getenv("MODEL_PATH", "models/model.h5")
+MODEL_CANDIDATE_PATH = os.getenv("MODEL_CANDIDATE_PATH")
+MODEL_CANDIDATE_PERCENT = float(os.getenv("MODEL_CANDIDATE_PERCENT", "10"))
+# Required by the /models admin routes when set; otherwise they only answer localhost
+MODEL_ADMIN_TOKEN = os.getenv("MODEL_ADMIN_TOKEN")
+backend_options = {"num_threads": INFERENCE_THREADS}
+if INFERENCE_BACKEND == "keras":
+    backend_options["jit_compile"] = MODEL_XLA_JIT
+
+def model_name(path):
+    """Version name for a model file: its file name without the extension"""
+    return os.path.splitext(os.path.basename(path))[0]
+
+def load_inference_backend(path):
+    """
+    Load and warm up one model file. A .h5 uses the configured backend; a converted
+    file such as models/model_int8.tflite picks its own, so it can be A/B tested
+    against the float model.
+    """
+    backend = artifact_backend(path) or INFERENCE_BACKEND
+    options = backend_options if backend == INFERENCE_BACKEND else {"num_threads": INFERENCE_THREADS}
+    try:
+        loaded = load_backend(backend, path, **options)
+        loaded.warmup(batch_sizes=(1, BATCH_MAX_SIZE))
+    except (FileNotFoundError, OSError, ValueError, ImportError) as e:
+        print(f"⚠️ Warning: Could not load {backend} model for {path}: {e}")
+        raise
+    print(f"✅ Successfully loaded {backend} model from {backend_model_path(path, backend)}")
+    return loaded
+
+def create_batcher(predict_fn):
+    """Start a micro-batching thread in front of one model version"""
+    return MicroBatcher(predict_fn, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS)
+
+def record_batch(name, rows, seconds):
+    BATCH_ROWS.observe(rows)
+    STAGE_SECONDS.observe(seconds, stage="inference")
+    MODEL_SECONDS.observe(seconds, model=name)
+
+models = ModelRegistry(load_inference_backend, create_batcher, class_names=CLASS_NAMES, on_batch=record_batch)
+QUEUE_DEPTH.set_function(models.queue_depth)
+
+def load_model():
+    """
+    Load MODEL_PATH as the active version and MODEL_CANDIDATE_PATH, if set, as the
+    candidate. A candidate that fails to load is skipped rather than failing startup.
+    """
+    models.load(model_name(MODEL_PATH), MODEL_PATH, activate=True)
+    if MODEL_CANDIDATE_PATH:
+        name = model_name(MODEL_CANDIDATE_PATH)
+        if name in models.versions:
+            name += "-candidate"
+        try:
+            models.load(name, MODEL_CANDIDATE_PATH)
+        except (FileNotFoundError, OSError, ValueError, ImportError):
+            return
+        models.set_candidate(name, MODEL_CANDIDATE_PERCENT)
+
+# Cache of model outputs keyed by the preprocessed 48x48 input. PREDICTION_CACHE_BITS < 8
+# lets near-identical frames share an entry; PREDICTION_CACHE_PATH shares entries across workers
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "4096"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "300"))
+PREDICTION_CACHE_BITS = int(os.getenv("PREDICTION_CACHE_BITS", "6"))
+PREDICTION_CACHE_PATH = os.getenv("PREDICTION_CACHE_PATH")
+prediction_cache = PredictionCache(
+    max_entries=PREDICTION_CACHE_SIZE,
+    ttl=PREDICTION_CACHE_TTL,
+    bits=PREDICTION_CACHE_BITS,
+    store=SqlitePredictionStore(PREDICTION_CACHE_PATH) if PREDICTION_CACHE_PATH else None,
+) if PREDICTION_CACHE_SIZE > 0 else None
+if prediction_cache:
+    CACHE_HIT_RATIO.set_function(lambda: prediction_cache.stats()["hit_ratio"], cache="prediction")
+    CACHE_ENTRIES.set_function(lambda: prediction_cache.stats()["size"], cache="prediction")
+
+def predict_cached(version, batch):
+    """Score a (N, 48, 48, 1) batch with one model version, only sending rows missing from the prediction cache"""
+    if not prediction_cache:
+        scores = version.predict(batch)
+    else:
+        # Entries are per loaded version, so a swapped-in model never serves its predecessor's scores
+        keys = [version.cache_prefix + prediction_cache.key(row) for row in batch]
+        scores = [prediction_cache.get(key) for key in keys]
+        missing = [i for i, cached in enumerate(scores) if cached is None]
+        if missing:
+            predictions = version.predict(batch[missing])
+            for i, row in zip(missing, predictions):
+                prediction_cache.put(keys[i], row)
+                scores[i] = row
+        scores = np.stack(scores)
+    for row in scores:
+        version.record(row)
+        MODEL_PREDICTIONS.inc(model=version.name, emotion=CLASS_NAMES[int(np.argmax(row))].lower())
+    return scores
+
+# Admission control in front of inference: at most ADMISSION_MAX_CONCURRENT requests
+# (0 disables) are scored at once and up to ADMISSION_MAX_QUEUE wait, by priority and
+# round-robin across clients, at most ADMISSION_MAX_PER_CLIENT per client. Requests that
+# cannot be served within ADMISSION_MAX_WAIT_MS get a 429 with Retry-After
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", str(BATCH_MAX_SIZE * 2)))
+admission = AdmissionController(
+    max_concurrent=ADMISSION_MAX_CONCURRENT,
+    max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "128")),
+    max_per_client=int(os.getenv("ADMISSION_MAX_PER_CLIENT", "8")),
+    max_wait=float(os.getenv("ADMISSION_MAX_WAIT_MS", "1000")) / 1000.0,
+    on_admit=lambda priority, seconds: STAGE_SECONDS.observe(seconds, stage="admission"),
+    on_shed=lambda priority, reason: ADMISSION_SHED.inc(priority=priority, reason=reason),
+) if ADMISSION_MAX_CONCURRENT > 0 else None
+if admission is not None:
+    ADMISSION_IN_FLIGHT.set_function(lambda: admission.in_flight)
+    for name in PRIORITIES:
+        ADMISSION_QUEUED.set_function(lambda name=name: admission.queued(name), priority=name)
+
+def admitted(client, priority):
+    """Hold an inference slot for the block; raises Overloaded when the request is shed"""
+    return admission.slot(client, priority) if admission is not None else nullcontext()
+
+def overloaded(error):
+    return jsonify({"error": "Server busy, try again shortly", "reason": error.reason}), 429, {
+        "Retry-After": str(error.retry_after)
+    }
+
+# Optional OpenCV face detector for /predict/faces, loaded at startup
+face_detector = None
+
+def load_faces():
+    global face_detector
+    face_detector = load_face_detector()
+FACE_MAX_COUNT = int(os.getenv("FACE_MAX_COUNT", "10"))
+
+# Upper bounds for /predict/batch uploads; score_images jobs take up to JOB_MAX_IMAGES.
+# Archive members over ARCHIVE_MAX_MEMBER_BYTES are skipped, and extraction stops with a
+# 413 past BATCH_MAX_BYTES (held in memory) or JOB_MAX_BYTES (written to the job's files)
+BATCH_MAX_IMAGES = int(os.getenv("BATCH_MAX_IMAGES", "256"))
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(256 * 1024 * 1024)))
+JOB_MAX_IMAGES = int(os.getenv("JOB_MAX_IMAGES", "20000"))
+JOB_MAX_BYTES = int(os.getenv("JOB_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+ARCHIVE_MAX_MEMBER_BYTES = 20 * 1024 * 1024
+
+# /analyze/video: upload size cap, default sampling rate and the most frames scored per video.
+# Without stream=true the response lists at most VIDEO_RESPONSE_MAX_FRAMES timeline entries
+VIDEO_MAX_BYTES = int(os.getenv("VIDEO_MAX_BYTES", str(500 * 1024 * 1024)))
+VIDEO_SAMPLE_FPS = float(os.getenv("VIDEO_SAMPLE_FPS", "2"))
+VIDEO_MAX_FRAMES = int(os.getenv("VIDEO_MAX_FRAMES", "20000"))
+VIDEO_RESPONSE_MAX_FRAMES = int(os.getenv("VIDEO_RESPONSE_MAX_FRAMES", "1000"))
+
+# Largest request body of any route, enforced before it is parsed
+app.config["MAX_CONTENT_LENGTH"] = int(os.getenv("MAX_UPLOAD_BYTES", str(max(VIDEO_MAX_BYTES, 1024 * 1024 * 1024))))
+
+# Recent /predict uploads, so /chat can reference a live-detection frame by frame_id
+FRAME_STORE_SIZE = int(os.getenv("FRAME_STORE_SIZE", "256"))
+FRAME_STORE_TTL = float(os.getenv("FRAME_STORE_TTL", "120"))
+FRAME_STORE_PATH = os.getenv("FRAME_STORE_PATH")
+frame_store = FrameStore(
+    max_frames=FRAME_STORE_SIZE,
+    ttl=FRAME_STORE_TTL,
+    store=SqliteFrameStore(FRAME_STORE_PATH) if FRAME_STORE_PATH else None,
+) if FRAME_STORE_SIZE > 0 else None
+if frame_store is not None:
+    CACHE_HIT_RATIO.set_function(lambda: frame_store.hits / max(1, frame_store.hits + frame_store.misses), cache="frame")
+    CACHE_ENTRIES.set_function(lambda: len(frame_store), cache="frame")
+
+# /predict/stream skips the model for frames that differ from the last scored one by less
+# than STREAM_CHANGE_THRESHOLD (mean pixel change, 0 disables) and smooths the scores it
+# sends with STREAM_SMOOTHING: ema (weight STREAM_SMOOTHING_ALPHA on the newest frame),
+# window (mean of the last STREAM_SMOOTHING_WINDOW) or none
+STREAM_CHANGE_THRESHOLD = float(os.getenv("STREAM_CHANGE_THRESHOLD", "0.01"))
+STREAM_MAX_REUSE = int(os.getenv("STREAM_MAX_REUSE", "10"))
+STREAM_SMOOTHING = os.getenv("STREAM_SMOOTHING", "ema")
+STREAM_SMOOTHING_ALPHA = float(os.getenv("STREAM_SMOOTHING_ALPHA", "0.5"))
+STREAM_SMOOTHING_WINDOW = int(os.getenv("STREAM_SMOOTHING_WINDOW", "5"))
+if STREAM_SMOOTHING not in StreamSmoother.METHODS:
+    print(f"⚠️ Warning: Unknown STREAM_SMOOTHING '{STREAM_SMOOTHING}', using ema")
+    STREAM_SMOOTHING = "ema"
+
+def create_smoother():
+    return StreamSmoother(
+        change_threshold=STREAM_CHANGE_THRESHOLD,
+        method=STREAM_SMOOTHING,
+        alpha=STREAM_SMOOTHING_ALPHA,
+        window=STREAM_SMOOTHING_WINDOW,
+        max_reuse=STREAM_MAX_REUSE,
+    )
+
+# Reusable (1, 48, 48, 1) input buffers for single-frame requests
+input_buffers = BufferPool(batch_size=1)
+
+# Background jobs (POST /jobs) run in JOB_WORKERS worker processes next to each server
+# process, tracked in a SQLite store under JOBS_DIR that every process shares. They are
+# off (0) unless JOB_WORKERS is set, which serve.py does, so importing the app never
+# spawns processes. Finished jobs are kept for JOB_RETENTION seconds, at most
+# JOB_MAX_RESULTS of them
+JOBS_DIR = os.getenv("JOBS_DIR", os.path.join(tempfile.gettempdir(), "emotion-jobs"))
+JOB_WORKERS_COUNT = int(os.getenv("JOB_WORKERS", "0"))
+JOB_HANDLERS = {
+    "score_images": "analysis_jobs:score_images",
+    "analyze_video": "analysis_jobs:analyze_video",
+    "summarize_session": "analysis_jobs:summarize_session",
+}
+jobs = JobQueue(
+    os.path.join(JOBS_DIR, "jobs.db"),
+    JOB_HANDLERS,
+    workers=JOB_WORKERS_COUNT,
+    retention=float(os.getenv("JOB_RETENTION", "86400")),
+    max_jobs=int(os.getenv("JOB_MAX_RESULTS", "1000")),
+    extra_paths=[os.path.dirname(os.path.abspath(__file__))],
+) if JOB_WORKERS_COUNT > 0 else None
+if jobs is not None:
+    for name in ("queued", "running", *FINISHED):
+        JOBS.set_function(lambda name=name: jobs.store.counts().get(name, 0), status=name)
+    JOB_WORKERS.set_function(jobs.alive)
+
+# On-demand profiling: a request is stack-sampled every PROFILE_INTERVAL_MS when it sends
+# X-Profile (the PROFILE_TOKEN value if set, otherwise any value from localhost), during a
+# window opened with POST /profiling, or at random with PROFILE_SAMPLE_RATE. Profiles go to
+# PROFILE_DIR in PROFILE_FORMAT (speedscope or collapsed), at most PROFILE_MAX_ACTIVE at once
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_FORMAT = os.getenv("PROFILE_FORMAT", "speedscope")
+if PROFILE_FORMAT not in PROFILE_FORMATS:
+    print(f"⚠️ Warning: Unknown PROFILE_FORMAT '{PROFILE_FORMAT}', using speedscope")
+    PROFILE_FORMAT = "speedscope"
+profiler = Profiler(
+    os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "emotion-profiles")),
+    interval=float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000.0,
+    sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+    max_active=int(os.getenv("PROFILE_MAX_ACTIVE", "2")),
+    max_files=int(os.getenv("PROFILE_MAX_FILES", "100")),
+    retention=float(os.getenv("PROFILE_RETENTION", "86400")),
+    output_format=PROFILE_FORMAT,
+)
+PROFILE_MAX_WINDOW = float(os.getenv("PROFILE_MAX_WINDOW", "600"))
+
+# Emotion timelines, off unless TIMELINE_ENABLED=1. Then live-detection streams opened
+# with ?timeline=<session> and /predict uploads with an X-Timeline-Session header append
+# each prediction to that session's timeline under TIMELINE_DIR, with scores stored as
+# TIMELINE_SCORE_DTYPE (uint8 or float16). Sessions with no new frames for
+# TIMELINE_RETENTION seconds are deleted (0 keeps them forever). Reading or deleting
+# timelines takes the TIMELINE_TOKEN value in X-Timeline-Token if set, else localhost.
+# The same check guards writes under a named user (X-User-ID / ?user=); anyone else
+# is recorded as "anonymous"
+TIMELINE_ENABLED = os.getenv("TIMELINE_ENABLED", "0").lower() in ("1", "true")
+TIMELINE_DIR = os.getenv("TIMELINE_DIR", os.path.join(tempfile.gettempdir(), "emotion-timelines"))
+TIMELINE_RETENTION = float(os.getenv("TIMELINE_RETENTION", str(30 * 86400)))
+TIMELINE_TOKEN = os.getenv("TIMELINE_TOKEN")
+TIMELINE_SCORE_DTYPE = os.getenv("TIMELINE_SCORE_DTYPE", "uint8")
+if TIMELINE_SCORE_DTYPE not in TIMELINE_SCORE_DTYPES:
+    print(f"⚠️ Warning: Unknown TIMELINE_SCORE_DTYPE '{TIMELINE_SCORE_DTYPE}', using uint8")
+    TIMELINE_SCORE_DTYPE = "uint8"
+timelines = TimelineStore(
+    TIMELINE_DIR,
+    CLASS_NAMES,
+    score_dtype=TIMELINE_SCORE_DTYPE,
+    chunk_rows=int(os.getenv("TIMELINE_CHUNK_ROWS", "65536")),
+    retention=TIMELINE_RETENTION or None,
+) if TIMELINE_ENABLED else None
+TIMELINE_MAX_POINTS = int(os.getenv("TIMELINE_MAX_POINTS", "2000"))
+
+def load_chat_client():
+    if emotion_agent.client is None:
+        raise RuntimeError("Groq client not initialized (is GROQ_API_KEY set?)")
+
+# Heavy components load in parallel background threads so the server answers /healthz
+# right away; /readyz turns 200 once the required ones are in. APP_STARTUP=eager loads
+# them before the import returns instead
+APP_STARTUP = os.getenv("APP_STARTUP", "background")
+startup = Startup()
+startup.add("model", load_model)
+startup.add("face_detector", load_faces)
+startup.add("chat_client", load_chat_client, required=False)
+if jobs is not None:
+    startup.add("job_workers", jobs.start, required=False)
+startup.start(background=APP_STARTUP != "eager")
+APP_READY.set_function(lambda: startup.ready)
+
+@app.errorhandler(413)
+def request_too_large(error):
+    limit = request.max_content_length
+    return jsonify({"error": f"Upload too large (max {limit} bytes)" if limit else "Upload too large"}), 413
+
+@app.before_request
+def reject_oversized_body():
+    """413 from Content-Length alone, before a route's catch-all error handling parses the body"""
+    limit = request.max_content_length
+    if limit and request.content_length and request.content_length > limit:
+        return request_too_large(None)
+
+def model_unavailable():
+    """503 for the prediction routes while the model is loading or after it failed to"""
+    if startup.state("model") == FAILED:
+        return jsonify({"error": "Model not loaded"}), 503
+    return jsonify({"error": "Model not loaded yet, still starting up"}), 503, {"Retry-After": "1"}
+
+def before_fork():
+    """Finish startup and stop background threads so serve.py can fork workers from this process"""
+    startup.wait()
+    models.stop()
+    if jobs is not None:
+        jobs.stop()
+
+def after_fork():
+    """
+    Rebuild per-process state in a freshly forked worker. Threads do not survive
+    fork and SQLite connections must not be shared across it; the loaded model
+    and caches are inherited copy-on-write.
+    """
+    models.restart()
+    if jobs is not None:
+        jobs.restart()
+    if prediction_cache and PREDICTION_CACHE_PATH:
+        prediction_cache.store = SqlitePredictionStore(PREDICTION_CACHE_PATH)
+    if frame_store is not None and FRAME_STORE_PATH:
+        frame_store.store = SqliteFrameStore(FRAME_STORE_PATH)
+    if CHAT_SESSION_DB:
+        conversations.backend = SqliteConversationBackend(CHAT_SESSION_DB)
 
 def preprocess_image(image):
     """Convert image to required model input format"""
-    image = image.convert("L")  # Grayscale
-    image = image.resize((48, 48))
-    image = np.array(image, dtype=np.float32) / 255.0
-    image = np.expand_dims(image, axis=-1)  # Shape: (48, 48, 1)
-    image = np.expand_dims(image, axis=0)   # Shape: (1, 48, 48, 1)
-    return image
+    input_image = np.empty((1, 48, 48, 1), dtype=np.float32)  # Shape: (1, 48, 48, 1)
+    preprocess_into(image, input_image[0])
+    return input_image
+
+def archive_members(archive_file, max_files, max_bytes):
+    """
+    Yield (name, file object) for the regular files inside a zip or tar upload,
+    read from the upload's own (spooled) stream rather than copied into memory.
+    Iteration stops after max_files + 1 entries so oversized archives can be
+    rejected early, and raises RequestEntityTooLarge once the members add up to
+    more than max_bytes. Each file object is only valid until the next one.
+    """
+    stream = archive_file.stream
+    is_zip = zipfile.is_zipfile(stream)
+    stream.seek(0)
+    total = count = 0
+    if is_zip:
+        with zipfile.ZipFile(stream) as archive:
+            for info in archive.infolist():
+                # Reads stop at the declared file_size, so it bounds what is extracted
+                if info.is_dir() or info.file_size > ARCHIVE_MAX_MEMBER_BYTES:
+                    continue
+                total += info.file_size
+                if total > max_bytes:
+                    raise RequestEntityTooLarge(f"Archive contents too large (max {max_bytes} bytes)")
+                with archive.open(info) as member:
+                    yield info.filename, member
+                count += 1
+                if count > max_files:
+                    return
+    else:
+        with tarfile.open(fileobj=stream) as archive:
+            for member in archive:
+                if not member.isfile() or member.size > ARCHIVE_MAX_MEMBER_BYTES:
+                    continue
+                total += member.size
+                if total > max_bytes:
+                    raise RequestEntityTooLarge(f"Archive contents too large (max {max_bytes} bytes)")
+                yield member.name, archive.extractfile(member)
+                count += 1
+                if count > max_files:
+                    return
+
+def read_archive(archive_file, max_files, max_bytes):
+    """(name, bytes) pairs for the regular files inside a zip or tar upload; see archive_members"""
+    return [(name, member.read()) for name, member in archive_members(archive_file, max_files, max_bytes)]
+
+def save_limited(source, path, max_bytes):
+    """Copy a file object to path in chunks, raising RequestEntityTooLarge past max_bytes"""
+    written = 0
+    with open(path, "wb") as f:
+        while True:
+            chunk = source.read(1024 * 1024)
+            if not chunk:
+                return written
+            written += len(chunk)
+            if written > max_bytes:
+                raise RequestEntityTooLarge(f"Upload too large (max {max_bytes} bytes)")
+            f.write(chunk)
+
+def routing_key():
+    """Key for sticky A/B routing: requests with the same X-Session-ID hit the same model version"""
+    return request.headers.get("X-Session-ID")
+
+def client_id():
+    """Who admission control treats as one client: X-Client-ID, else X-Session-ID, else the peer address"""
+    return request.headers.get("X-Client-ID") or routing_key() or request.remote_addr
+
+def request_priority(default):
+    """
+    Admission priority for this request: the route's default, or a lower one asked
+    for with X-Priority (live-detection frames send "live"). Never a higher one.
+    """
+    asked = request.headers.get("X-Priority", "").lower()
+    if asked in PRIORITIES and PRIORITIES.index(asked) > PRIORITIES.index(default):
+        return asked
+    return default
+
+def predict_image_file(image_file, route_key=None, smoother=None, client=None, priority="interactive"):
+    """
+    Decode one uploaded image (file object or bytes) and return its /predict result.
+
+    The encoded bytes are kept in the frame store and the result carries their
+    frame_id, which /chat accepts in place of a base64 image, and the name of the
+    model version that scored it. With a StreamSmoother, an unchanged frame reuses
+    the stream's previous result ("reused": true) and scores are smoothed over
+    the stream's recent frames. Scoring waits for an admission slot and raises
+    Overloaded when the request is shed; reused frames need no slot.
+    """
+    with STAGE_SECONDS.time(stage="decode"):
+        data = image_file if isinstance(image_file, (bytes, bytearray)) else image_file.read()
+        image = decode_grayscale(data)
+    if smoother is not None and not smoother.changed(image):
+        STREAM_FRAMES.inc(outcome="reused")
+        result = dict(smoother.last_result, reused=True)
+    else:
+        with admitted(client, priority), models.use(route_key) as version, input_buffers.borrow() as input_image:
+            with STAGE_SECONDS.time(stage="preprocess"):
+                preprocess_into(image, input_image[0])
+            # Includes cache lookups and time queued behind other requests in the batcher
+            with STAGE_SECONDS.time(stage="predict"):
+                predictions = predict_cached(version, input_image)
+        scores = predictions[0]
+        if smoother is not None:
+            STREAM_FRAMES.inc(outcome="inferred")
+            scores = smoother.smooth(scores)
+        result = format_prediction(scores)
+        result["model"] = version.name
+        if smoother is not None:
+            smoother.last_result = dict(result)
+            result["reused"] = False
+    frame_id = frame_store.put(data) if frame_store is not None else None
+    if frame_id:
+        result["frame_id"] = frame_id
+    return result
+
+def record_timeline(user, session, result):
+    """Append a prediction's all_emotions (percentages) to the user's session timeline"""
+    emotions = result["all_emotions"]
+    scores = np.array([emotions[name.lower()] for name in CLASS_NAMES], dtype=np.float32) / 100.0
+    timelines.append(user, session, time.time(), scores)
+    TIMELINE_FRAMES.inc()
+
+def timeline_session(session):
+    """The session to record this request's predictions under, or None when it did not opt in"""
+    if timelines is None or not session:
+        return None
+    timelines.session_key(session)  # ValueError for an invalid id
+    return session
+
+def timeline_denied():
+    """Error response unless the caller may read timelines: TIMELINE_TOKEN if set, else localhost only"""
+    if TIMELINE_TOKEN:
+        if not hmac.compare_digest(request.headers.get("X-Timeline-Token", ""), TIMELINE_TOKEN):
+            return jsonify({"error": "Invalid timeline token"}), 403
+    elif request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"error": "Timelines are only readable from localhost"}), 403
+    return None
+
+def timeline_user(claimed):
+    """
+    The user to record under. Only a caller who may read timelines may name
+    one; anyone else records as "anonymous", so they cannot write into, or
+    fill up, another user's timeline.
+    """
+    if not claimed or timeline_denied() is not None:
+        return "anonymous"
+    return claimed
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+def profiling_denied():
+    """Error response unless the caller may profile: PROFILE_TOKEN if set, else localhost only"""
+    if PROFILE_TOKEN:
+        if not hmac.compare_digest(request.headers.get("X-Profile", ""), PROFILE_TOKEN):
+            return jsonify({"error": "Invalid profiling token"}), 403
+    elif request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"error": "Profiling is only allowed from localhost"}), 403
+    return None
+
+@app.before_request
+def start_profile():
+    g.profile = None
+    if request.path.startswith("/profiling"):
+        return
+    requested = request.headers.get("X-Profile")
+    if requested and PROFILE_TOKEN:
+        requested = hmac.compare_digest(requested, PROFILE_TOKEN)
+    elif requested:
+        requested = request.remote_addr in ("127.0.0.1", "::1")
+    # Label by route pattern, like the request metrics
+    label = f"{request.method} {request.url_rule.rule if request.url_rule else 'unmatched'}"
+    g.profile = profiler.start(label, requested=bool(requested))
+
+def stop_profile(profile):
+    try:
+        profiler.stop(profile)
+    except OSError as e:
+        print(f"⚠️ Could not save profile {profile.name}: {e}")
+
+@app.after_request
+def finish_profile(response):
+    profile = g.pop("profile", None)
+    if profile is not None:
+        # Stop once the body is sent, so streamed responses are covered to the end
+        response.headers["X-Profile-Id"] = profile.name
+        response.call_on_close(lambda: stop_profile(profile))
+    return response
+
+@app.teardown_request
+def abandon_profile(exc):
+    # finish_profile never ran (an after_request hook raised, or the request
+    # failed outright), so nothing else will stop this profile
+    profile = g.pop("profile", None)
+    if profile is not None:
+        stop_profile(profile)
+
+@app.after_request
+def record_request_metrics(response):
+    # Label by route pattern rather than raw path to keep label cardinality bounded
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    start = g.get("request_start")
+    if start is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+    return response
+
+@app.route("/metrics")
+def metrics():
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/healthz")
+def healthz():
+    """Liveness: the process is up and serving HTTP, whatever is still loading"""
+    return jsonify({"status": "ok"}), 200
+
+@app.route("/readyz")
+def readyz():
+    """Readiness: 200 once every required component has loaded and warmed up, 503 before"""
+    ready = startup.ready
+    return jsonify({"ready": ready, "components": startup.status()}), 200 if ready else 503
 
 @app.route("/")
 def home():
@@ -33,46 +658,595 @@ def home():
 
 @app.route("/predict", methods=["POST"])
 def predict():
-    class_names = ['Angry', 'Disgust', 'Fear', 'Happy', 'Neutral', 'Sad', 'Surprise']
+    try:
+        if models.active is None:
+            return model_unavailable()
+        with STAGE_SECONDS.time(stage="parse"):
+            files = request.files
+        if "image" not in files:
+            return jsonify({"error": "No image provided"}), 400
+        try:
+            session = timeline_session(request.headers.get("X-Timeline-Session"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        result = predict_image_file(
+            files["image"], routing_key(), client=client_id(), priority=request_priority("interactive")
+        )
+        if session:
+            record_timeline(timeline_user(request.headers.get("X-User-ID")), session, result)
+        with STAGE_SECONDS.time(stage="serialize"):
+            response = jsonify(result)
+        return response, 200
+
+    except Overloaded as e:
+        return overloaded(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    """Score many images in one request: a multipart list under "images" or a zip/tar "archive" """
+    try:
+        if models.active is None:
+            return model_unavailable()
+
+        if "archive" in request.files:
+            files = read_archive(request.files["archive"], BATCH_MAX_IMAGES, BATCH_MAX_BYTES)
+        else:
+            files = [(f.filename, f.read()) for f in request.files.getlist("images")]
 
+        if not files:
+            return jsonify({"error": "No images provided"}), 400
+        if len(files) > BATCH_MAX_IMAGES:
+            return jsonify({"error": f"Too many images (max {BATCH_MAX_IMAGES})"}), 413
+
+        # Undecodable entries get a per-image error instead of failing the whole batch
+        results = [None] * len(files)
+        images, positions = [], []
+        for i, (name, data) in enumerate(files):
+            try:
+                images.append(decode_grayscale(data))
+                positions.append(i)
+            except Exception as e:
+                results[i] = {"filename": name, "error": f"Invalid image: {e}"}
+
+        model_used = None
+        if images:
+            with admitted(client_id(), request_priority("bulk")), models.use(routing_key()) as version:
+                predictions = predict_cached(version, preprocess_batch(images))
+            model_used = version.name
+            for i, scores in zip(positions, predictions):
+                results[i] = {"filename": files[i][0], **format_prediction(scores)}
+
+        return jsonify({"count": len(results), "results": results, "model": model_used}), 200
+
+    except Overloaded as e:
+        return overloaded(e)
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        return jsonify({"error": f"Invalid archive: {e}"}), 400
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": e.description}), 413
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/predict/faces", methods=["POST"])
+def predict_faces():
+    """Detect every face in the frame and classify all crops in one batched pass"""
     try:
-        if not model:
-            return jsonify({"error": "Model not loaded"}), 503
+        if models.active is None:
+            return model_unavailable()
         if "image" not in request.files:
             return jsonify({"error": "No image provided"}), 400
 
-        image_file = request.files["image"]
-        image = Image.open(image_file).convert("RGB")  
-        input_image = preprocess_image(image)
-        predictions = model.predict(input_image)
-        emotion_label = class_names[np.argmax(predictions)]
+        gray = Image.open(request.files["image"]).convert("L")
+        if face_detector:
+            boxes = face_detector.detect(gray)[:FACE_MAX_COUNT]
+        else:
+            boxes = [(0, 0, gray.width, gray.height)]
 
-        # Create dictionary with all emotions and their confidence scores (in percentage)
-        all_emotions = {
-            class_names[i].lower(): float(predictions[0][i] * 100)
-            for i in range(len(class_names))
-        }
+        faces = []
+        model_used = None
+        if boxes:
+            with admitted(client_id(), request_priority("interactive")), models.use(routing_key()) as version:
+                predictions = predict_cached(version, crop_faces(gray, boxes))
+            model_used = version.name
+            for (x, y, w, h), scores in zip(boxes, predictions):
+                faces.append({
+                    "box": {"x": x, "y": y, "width": w, "height": h},
+                    **format_prediction(scores)
+                })
 
-        return jsonify({
-            "prediction": emotion_label,
-            "confidence": float(np.max(predictions)),
-            "all_emotions": all_emotions
-        }), 200
+        return jsonify({"count": len(faces), "faces": faces, "model": model_used}), 200
 
+    except Overloaded as e:
+        return overloaded(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route("/chat", methods=["POST"])
-def chat():
+def save_upload(upload, prefix):
+    """Copy an uploaded file to a temporary path in chunks (OpenCV needs a file name)"""
+    suffix = os.path.splitext(upload.filename or "")[1][:16]
+    fd, path = tempfile.mkstemp(prefix=prefix, suffix=suffix)
+    with os.fdopen(fd, "wb") as f:
+        shutil.copyfileobj(upload.stream, f, 1024 * 1024)
+    return path
+
+def remove_file(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+@app.route("/analyze/video", methods=["POST"])
+def analyze_video_upload():
+    """
+    Emotion timeline for an uploaded recording ("video" file field).
+
+    Optional form fields: sample_fps (default VIDEO_SAMPLE_FPS) and max_frames.
+    The answer is {"timeline", "summary", "model"}, with the timeline cut to the
+    first VIDEO_RESPONSE_MAX_FRAMES entries ("truncated": true) while the summary
+    covers every frame. With stream=true the whole timeline arrives as server-sent
+    "frame" events followed by "done" with the summary, in constant memory.
+    """
+    if models.active is None:
+        return model_unavailable()
+    # Checked before the body is parsed; max_content_length also stops chunked uploads
+    if request.content_length and request.content_length > VIDEO_MAX_BYTES:
+        return jsonify({"error": f"Video too large (max {VIDEO_MAX_BYTES} bytes)"}), 413
+    request.max_content_length = VIDEO_MAX_BYTES
+    if "video" not in request.files:
+        return jsonify({"error": "No video provided"}), 400
+    try:
+        sample_fps = float(request.form.get("sample_fps", VIDEO_SAMPLE_FPS))
+        max_frames = min(int(request.form.get("max_frames", VIDEO_MAX_FRAMES)), VIDEO_MAX_FRAMES)
+    except ValueError:
+        return jsonify({"error": "sample_fps and max_frames must be numbers"}), 400
+
+    path = save_upload(request.files["video"], "video_")
+    # One version for the whole video, even while an A/B split is running
+    route_key = routing_key() or uuid.uuid4().hex
+    client, priority = client_id(), request_priority("bulk")
+    model_used = []
+
+    # Each batch of frames is admitted on its own, so a long video never holds a slot for long
+    def predict(batch):
+        with admitted(client, priority), models.use(route_key) as version:
+            if not model_used:
+                model_used.append(version.name)
+            return predict_cached(version, batch)
+
+    summary = VideoSummary(CLASS_NAMES)
+    entries = analyze_video(
+        path, predict, preprocess_batch, format_prediction, summary,
+        sample_fps=sample_fps, batch_size=BATCH_MAX_SIZE, max_frames=max_frames,
+    )
+
+    if str(request.form.get("stream", "")).lower() in ("1", "true"):
+        def generate():
+            try:
+                for entry in entries:
+                    yield f"event: frame\ndata: {json.dumps({'type': 'frame', **entry})}\n\n"
+                done = {"type": "done", "summary": summary.result(), "model": model_used[0] if model_used else None}
+                yield f"event: done\ndata: {json.dumps(done)}\n\n"
+            except Overloaded as e:
+                error = {"type": "error", "error": "Server busy, try again shortly", "retry_after": e.retry_after}
+                yield f"event: error\ndata: {json.dumps(error)}\n\n"
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+
+        response = Response(
+            stream_with_context(generate()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        # Also runs when the client goes away before the generator was started
+        response.call_on_close(lambda: remove_file(path))
+        return response
+
+    frames, scored = [], 0
+    try:
+        for entry in entries:
+            scored += 1
+            if len(frames) < VIDEO_RESPONSE_MAX_FRAMES:
+                frames.append(entry)
+    except ValueError:
+        return jsonify({"error": "Invalid or unsupported video"}), 400
+    except Overloaded as e:
+        return overloaded(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        remove_file(path)
+    return jsonify({
+        "timeline": frames,
+        "truncated": scored > len(frames),
+        "summary": summary.result(),
+        "model": model_used[0] if model_used else None,
+    }), 200
+
+if sock:
+    @sock.route("/predict/stream")
+    def predict_stream(ws):
+        """
+        Live detection over a WebSocket: the client sends binary JPEG frames and
+        receives one JSON prediction per processed frame. Frames that arrive while
+        inference is busy replace each other, so only the newest one is scored.
+        Frames that barely differ from the last scored one reuse its result, and
+        scores are smoothed across the stream (see STREAM_SMOOTHING). Frames are
+        admitted at "live" priority; a shed frame is answered with "busy": true and
+        retry_after instead of a prediction. With ?timeline=<session> (and
+        ?user=), every prediction is also appended to that session's timeline.
+        """
+        if models.active is None:
+            ws.send(json.dumps({"error": "Model not loaded"}))
+            return
+        # Each frame picks a version on its own so a swap takes effect mid-stream,
+        # but the per-stream key keeps a stream on one side of an A/B split
+        route_key = uuid.uuid4().hex
+        client = client_id()
+        smoother = create_smoother()
+        user = timeline_user(request.args.get("user"))
+        try:
+            session = timeline_session(request.args.get("timeline"))
+        except ValueError as e:
+            ws.send(json.dumps({"error": str(e)}))
+            return
+
+        def process_frame(data):
+            try:
+                result = predict_image_file(data, route_key, smoother, client=client, priority="live")
+            except Overloaded as e:
+                return {"error": "Server busy", "busy": True, "retry_after": e.retry_after}
+            if session:
+                record_timeline(user, session, result)
+            return result
+
+        FrameStreamSession(ws.receive, ws.send, process_frame).run()
+else:
+    print("⚠️ Warning: flask-sock not installed, /predict/stream is disabled")
+
+def jobs_unavailable():
+    return jsonify({"error": "Background jobs are disabled (JOB_WORKERS=0)"}), 503
+
+def job_model(name=None):
+    """Model parameters for a job: the named loaded version (to re-score with it) or the active one"""
+    version = models.versions.get(name) if name else models.active
+    if version is None:
+        return None
+    return {
+        "model": version.name,
+        "model_path": os.path.abspath(version.path),
+        "backend": artifact_backend(version.path) or INFERENCE_BACKEND,
+        "batch_size": BATCH_MAX_SIZE,
+    }
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    """
+    Queue long-running analysis and answer 202 with the job id right away.
+
+    kind (form field or JSON) selects the job:
+        score_images       "images" files or an "archive", like /predict/batch but
+                           up to JOB_MAX_IMAGES / JOB_MAX_BYTES; optional "model" re-scores with
+                           another loaded version
+        analyze_video      a "video" file, like /analyze/video
+        summarize_session  JSON {"session_id"} (or X-Session-ID), as sent to /chat:
+                           an LLM summary of that chat session
+    The answer carries a "token"; send it as X-Job-Token to GET /jobs/<id> for
+    status and progress, GET /jobs/<id>/result and DELETE /jobs/<id>.
+    """
+    if jobs is None:
+        return jobs_unavailable()
+    data = request.get_json(silent=True) or {}
+    kind = request.form.get("kind") or data.get("kind")
+    job_id = uuid.uuid4().hex
+    token = secrets.token_urlsafe(24)
+    try:
+        if kind == "summarize_session":
+            # Knowing the session id is what lets a client continue that chat, so it is
+            # also what lets it read the history back; short ids are too easy to guess
+            session_id = chat_session_id(data)
+            if not session_id or len(session_id) < CHAT_SESSION_MIN_ID_LENGTH:
+                return jsonify({
+                    "error": f"session_id must be the chat's random id ({CHAT_SESSION_MIN_ID_LENGTH}+ characters)"
+                }), 400
+            messages = conversations.history(session_id)
+            if not messages:
+                return jsonify({"error": "Unknown or empty chat session"}), 404
+            params = {"messages": messages}
+        elif kind in ("score_images", "analyze_video"):
+            if models.active is None:
+                return model_unavailable()
+            params = job_model(request.form.get("model"))
+            if params is None:
+                return jsonify({"error": f"Unknown model '{request.form.get('model')}'"}), 404
+            if kind == "analyze_video":
+                if "video" not in request.files:
+                    return jsonify({"error": "No video provided"}), 400
+                upload = request.files["video"]
+                params["file"] = "video" + os.path.splitext(upload.filename or "")[1][:16]
+                save_limited(upload.stream, os.path.join(jobs.job_dir(job_id), params["file"]), VIDEO_MAX_BYTES)
+                params["sample_fps"] = float(request.form.get("sample_fps", VIDEO_SAMPLE_FPS))
+                params["max_frames"] = min(int(request.form.get("max_frames", VIDEO_MAX_FRAMES)), VIDEO_MAX_FRAMES)
+            else:
+                # Each image goes straight from the upload to the job's files
+                if "archive" in request.files:
+                    members = archive_members(request.files["archive"], JOB_MAX_IMAGES, JOB_MAX_BYTES)
+                else:
+                    uploads = request.files.getlist("images")
+                    if len(uploads) > JOB_MAX_IMAGES:
+                        return jsonify({"error": f"Too many images (max {JOB_MAX_IMAGES})"}), 413
+                    members = ((upload.filename, upload.stream) for upload in uploads)
+                job_dir = jobs.job_dir(job_id)
+                params["files"], params["names"] = [], []
+                remaining = JOB_MAX_BYTES
+                for name, member in members:
+                    if len(params["files"]) >= JOB_MAX_IMAGES:
+                        jobs.delete(job_id)
+                        return jsonify({"error": f"Too many images (max {JOB_MAX_IMAGES})"}), 413
+                    stored = f"{len(params['files']):06d}"
+                    remaining -= save_limited(member, os.path.join(job_dir, stored), remaining)
+                    params["files"].append(stored)
+                    params["names"].append(name)
+                if not params["files"]:
+                    jobs.delete(job_id)
+                    return jsonify({"error": "No images provided"}), 400
+        else:
+            return jsonify({"error": "kind must be score_images, analyze_video or summarize_session"}), 400
+        jobs.submit(kind, params, job_id, token=token)
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        jobs.delete(job_id)
+        return jsonify({"error": f"Invalid archive: {e}"}), 400
+    except RequestEntityTooLarge as e:
+        jobs.delete(job_id)
+        return jsonify({"error": e.description}), 413
+    except ValueError:
+        jobs.delete(job_id)
+        return jsonify({"error": "sample_fps and max_frames must be numbers"}), 400
+    except Exception as e:
+        jobs.delete(job_id)
+        return jsonify({"error": str(e)}), 500
+    return jsonify({**jobs.get(job_id), "token": token}), 202, {"Location": f"/jobs/{job_id}"}
+
+def authorized_job(job_id):
+    """Whether the request carries the X-Job-Token the job was submitted with"""
+    return jobs.check_token(job_id, request.headers.get("X-Job-Token"))
+
+def unknown_job():
+    # Same answer for a missing job and a wrong token, so job ids cannot be probed
+    return jsonify({"error": "Unknown job"}), 404
+
+@app.route("/jobs", methods=["GET"])
+def list_jobs():
+    """Most recent jobs of every client first, for administrators; ?status= filters, ?limit= caps the list"""
+    if jobs is None:
+        return jobs_unavailable()
+    denied = admin_denied()
+    if denied:
+        return denied
+    limit = min(request.args.get("limit", 50, type=int), 500)
+    stats = jobs.stats()
+    return jsonify({
+        "jobs": jobs.list(request.args.get("status"), limit),
+        "workers": stats["workers"],
+        "counts": stats["jobs"],
+    }), 200
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    if jobs is None:
+        return jobs_unavailable()
+    job = jobs.get(job_id) if authorized_job(job_id) else None
+    if job is None:
+        return unknown_job()
+    return jsonify(job), 200
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    """200 with the result once the job succeeded, 202 while it runs, 409 if it failed or was cancelled"""
+    if jobs is None:
+        return jobs_unavailable()
+    job = jobs.get(job_id, with_result=True) if authorized_job(job_id) else None
+    if job is None:
+        return unknown_job()
+    if job["status"] == SUCCEEDED:
+        return jsonify(job["result"]), 200
+    if job["status"] in FINISHED:
+        return jsonify({"error": job["error"] or f"Job {job['status']}", "status": job["status"]}), 409
+    return jsonify({"status": job["status"], "progress": job["progress"]}), 202, {"Retry-After": "1"}
+
+@app.route("/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    """Cancel a queued or running job; a finished one is deleted along with its result"""
+    if jobs is None:
+        return jobs_unavailable()
+    job = jobs.get(job_id) if authorized_job(job_id) else None
+    if job is None:
+        return unknown_job()
+    if job["status"] in FINISHED:
+        jobs.delete(job_id)
+        return jsonify({"id": job_id, "deleted": True}), 200
+    jobs.cancel(job_id)
+    return jsonify(jobs.get(job_id)), 202
+
+@app.route("/profiling", methods=["GET"])
+def profiling_status():
+    """Profiler settings and the saved profiles, newest first"""
+    denied = profiling_denied()
+    if denied:
+        return denied
+    files = [{"name": name, "bytes": size, "modified": mtime} for name, size, mtime in profiler.files()]
+    return jsonify({**profiler.stats(), "format": profiler.format, "profiles": files}), 200
+
+@app.route("/profiling", methods=["POST"])
+def profiling_window():
+    """Profile every request for the next {"seconds": N} (0 ends the window early)"""
+    denied = profiling_denied()
+    if denied:
+        return denied
+    try:
+        seconds = float((request.get_json(silent=True) or {}).get("seconds", 60))
+    except (TypeError, ValueError):
+        return jsonify({"error": "seconds must be a number"}), 400
+    profiler.enable_window(min(seconds, PROFILE_MAX_WINDOW))
+    return jsonify(profiler.stats()), 200
+
+@app.route("/profiling/<name>", methods=["GET"])
+def profiling_download(name):
+    """Download one saved profile; open .speedscope.json files at speedscope.app"""
+    denied = profiling_denied()
+    if denied:
+        return denied
+    return send_from_directory(profiler.directory, name, as_attachment=True)
+
+def timeline_unavailable():
+    return jsonify({"error": "Emotion timelines are disabled (TIMELINE_ENABLED is off)"}), 503
+
+@app.route("/timeline/<user>/sessions", methods=["GET"])
+def timeline_sessions(user):
+    """A user's recorded sessions, newest first, with their time span and frame count"""
+    if timelines is None:
+        return timeline_unavailable()
+    denied = timeline_denied()
+    if denied:
+        return denied
+    return jsonify({"sessions": timelines.sessions(user)}), 200
+
+@app.route("/timeline/<user>/<session>", methods=["GET"])
+def timeline_query(user, session):
+    """
+    Aggregated timeline of one session between ?start= and ?end= (unix seconds,
+    both optional): ?bucket= seconds per point (e.g. 60 for per-minute means), or
+    ?points= to fit the range into about that many buckets (default 300). The
+    response is columnar: start, count, mean per emotion (percent) and dominant
+    per bucket, plus the dominant-emotion histogram of the whole range.
+    """
+    if timelines is None:
+        return timeline_unavailable()
+    denied = timeline_denied()
+    if denied:
+        return denied
+    start = request.args.get("start", type=float)
+    end = request.args.get("end", type=float)
+    bucket = request.args.get("bucket", type=float)
+    try:
+        if bucket is not None:
+            result = timelines.aggregate(user, session, bucket, start, end, max_buckets=TIMELINE_MAX_POINTS)
+        else:
+            points = min(request.args.get("points", 300, type=int), TIMELINE_MAX_POINTS)
+            result = timelines.downsample(user, session, points, start, end)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not result["frames"] and not os.path.isdir(timelines.stream_dir(user, session)):
+        return jsonify({"error": "Unknown session"}), 404
+    return jsonify({"session": session, **result}), 200
+
+@app.route("/timeline/<user>/<session>", methods=["DELETE"])
+def timeline_delete(user, session):
+    if timelines is None:
+        return timeline_unavailable()
+    denied = timeline_denied()
+    if denied:
+        return denied
+    try:
+        timelines.delete(user, session)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"session": session, "deleted": True}), 200
+
+def admin_denied():
+    """Error response unless the caller may manage models: MODEL_ADMIN_TOKEN if set, else localhost only"""
+    if MODEL_ADMIN_TOKEN:
+        if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), MODEL_ADMIN_TOKEN):
+            return jsonify({"error": "Invalid admin token"}), 403
+    elif request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"error": "Model administration is only allowed from localhost"}), 403
+    return None
+
+# Model administration. Under serve.py each call only reaches the worker that
+# answers it, and SIGHUP re-forks workers from a parent that keeps its environment
+# and preloaded model, so changing MODEL_PATH / MODEL_CANDIDATE_PATH for every
+# worker takes a full restart of serve.py
+@app.route("/models", methods=["GET"])
+def list_models():
+    """Active and candidate versions plus per-version latency and prediction distribution"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    return jsonify(models.stats()), 200
+
+@app.route("/models/load", methods=["POST"])
+def load_model_version():
+    """Load {"path", "name"?, "activate"?} next to the serving versions, replacing one with the same name"""
+    denied = admin_denied()
+    if denied:
+        return denied
     data = request.json or {}
+    path = data.get("path")
+    if not path:
+        return jsonify({"error": "No model path provided"}), 400
+    name = str(data.get("name") or model_name(path))
+    try:
+        models.load(name, path, activate=bool(data.get("activate", False)))
+    except (FileNotFoundError, OSError, ValueError, ImportError) as e:
+        return jsonify({"error": f"Could not load model: {e}"}), 400
+    return jsonify(models.stats()), 200
 
-    new_chat = data.get("new_chat", False)
-    if new_chat:
-        emotion_agent.reset()
-        return jsonify({"response": ""}), 200
+@app.route("/models/promote", methods=["POST"])
+def promote_model():
+    """Make {"name"} the active version; requests already running finish on the old one"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    try:
+        models.promote(str((request.json or {}).get("name")))
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 404
+    return jsonify(models.stats()), 200
+
+@app.route("/models/candidate", methods=["POST"])
+def set_candidate_model():
+    """Send {"percent"} of traffic to {"name"}; a null name ends the experiment"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    data = request.json or {}
+    try:
+        name = data.get("name")
+        models.set_candidate(str(name) if name else None, float(data.get("percent", 0)))
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 404
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(models.stats()), 200
+
+@app.route("/models/<name>", methods=["DELETE"])
+def unload_model(name):
+    denied = admin_denied()
+    if denied:
+        return denied
+    try:
+        models.unload(name)
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify(models.stats()), 200
+
+def parse_chat_request(data):
+    """
+    Turn a /chat JSON body into (user_message, image_data, emotion_data).
 
+    The image is either base64 under "image" or a "frame_id" returned by /predict;
+    an expired frame_id is treated as no image. Raises ValueError when there is
+    neither a message nor emotion context.
+    """
     user_message = data.get("message", "").strip()
     image_data = data.get("image")
+    frame_id = data.get("frame_id")
+    if not image_data and frame_id and frame_store is not None:
+        image_data = frame_store.get(str(frame_id))
     emotion = data.get("emotion", "").strip().capitalize()
     confidence = float(data.get("confidence", 0.0))
 
@@ -88,26 +1262,150 @@ def chat():
         elif "Detected emotions" not in user_message:
             user_message += f" (Detected emotions: {emotion_context})"
     elif not user_message:
-        return jsonify({"error": "No message provided and emotion context missing."}), 400
+        raise ValueError("No message provided and emotion context missing.")
+
+    emotion_data = [{
+        "emotion": emotion,
+        "confidence": confidence
+    }] if emotion and confidence > 0 else None
+
+    return user_message, image_data, emotion_data
+
+def chat_cache_key(user_message, image_data, emotion_data, history, stream=False):
+    """Response cache key, or None when the reply depends on an image or earlier turns"""
+    if chat_cache is None or image_data or history:
+        return None
+    emotion = emotion_data[0] if emotion_data else {}
+    # Streamed replies are not post-processed like /chat's, so they are cached separately
+    model = f"{TEXT_MODEL}/stream" if stream else TEXT_MODEL
+    return chat_cache.key(user_message, emotion.get("emotion"), emotion.get("confidence", 0.0), model)
+
+# Chat session ids are bearer secrets (the chat client uses random UUIDs); reading a
+# history back, as summarize_session jobs do, needs one at least this long
+CHAT_SESSION_MIN_ID_LENGTH = 16
+
+def chat_session_id(data):
+    """Conversation key from the JSON body or the X-Session-ID header; None means stateless"""
+    session_id = data.get("session_id") or request.headers.get("X-Session-ID")
+    return str(session_id)[:128] if session_id else None
+
+@app.route("/chat", methods=["POST"])
+def chat():
+    data = request.json or {}
+
+    session_id = chat_session_id(data)
+
+    new_chat = data.get("new_chat", False)
+    if new_chat:
+        # Only this user's history is dropped; the shared Groq client is left alone
+        if session_id:
+            conversations.clear(session_id)
+        return jsonify({"response": ""}), 200
 
     try:
-        emotion_data = [{
-            "emotion": emotion,
-            "confidence": confidence
-        }] if emotion and confidence > 0 else None
+        user_message, image_data, emotion_data = parse_chat_request(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        response, error = emotion_agent.chat(user_message, image_data, emotion_data)
+    try:
+        history = conversations.history(session_id) if session_id else None
+        cache_key = chat_cache_key(user_message, image_data, emotion_data, history)
+        cached = False
+        if cache_key:
+            start = time.perf_counter()
+            response, error, outcome = chat_cache.get_or_compute(
+                cache_key, lambda: emotion_agent.chat(user_message, image_data, emotion_data, history)
+            )
+            CHAT_CACHE_REQUESTS.inc(outcome=outcome)
+            cached = outcome != "miss"
+            if cached:
+                STAGE_SECONDS.observe(time.perf_counter() - start, stage="chat_cache_hit")
+        else:
+            response, error = emotion_agent.chat(user_message, image_data, emotion_data, history)
 
         if error:
             status_code = 500 if "API Error" in error else 400
             return jsonify({"error": error}), status_code
 
+        if session_id:
+            conversations.append(
+                session_id,
+                {"role": "user", "content": user_message},
+                {"role": "assistant", "content": response},
+            )
+
         # Return the response in markdown format
-        return jsonify({"response": response, "format": "markdown"}), 200
+        return jsonify({"response": response, "format": "markdown", "cached": cached}), 200
 
     except Exception as e:
         print(f"[Error] Exception in /chat: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
+@app.route("/chat/stream", methods=["POST"])
+def chat_stream():
+    """
+    Same request body as /chat, answered as server-sent events: one "token" event
+    per generated chunk, then "done" with time-to-first-token, or "error". A cached
+    reply arrives as a single token event and "done" carries "cached": true.
+    """
+    data = request.json or {}
+    session_id = chat_session_id(data)
+    try:
+        user_message, image_data, emotion_data = parse_chat_request(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        history = conversations.history(session_id) if session_id else None
+    except Exception as e:
+        print(f"[Error] Exception in /chat/stream: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+    cache_key = chat_cache_key(user_message, image_data, emotion_data, history, stream=True)
+
+    def cached_events(reply):
+        start = time.perf_counter()
+        yield {"type": "token", "content": reply}
+        elapsed = time.perf_counter() - start
+        chat_cache.record_hit(elapsed)
+        CHAT_CACHE_REQUESTS.inc(outcome="hit")
+        STAGE_SECONDS.observe(elapsed, stage="chat_cache_hit")
+        yield {"type": "done", "ttft_ms": 0.0, "total_ms": round(elapsed * 1000.0, 2), "cached": True}
+
+    def generate():
+        # If the browser disconnects, Werkzeug closes this generator, which
+        # closes chat_stream's upstream request as well
+        reply = []
+        try:
+            cached_reply = chat_cache.get(cache_key) if cache_key else None
+            if cached_reply is not None:
+                events = cached_events(cached_reply)
+            else:
+                events = emotion_agent.chat_stream(user_message, image_data, emotion_data, history)
+            for event in events:
+                if event["type"] == "token":
+                    reply.append(event["content"])
+                elif event["type"] == "done":
+                    if cache_key and cached_reply is None:
+                        chat_cache.put(cache_key, "".join(reply))
+                        chat_cache.record_upstream(event["total_ms"] / 1000.0)
+                        CHAT_CACHE_REQUESTS.inc(outcome="miss")
+                    if session_id:
+                        conversations.append(
+                            session_id,
+                            {"role": "user", "content": user_message},
+                            {"role": "assistant", "content": "".join(reply)},
+                        )
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            print(f"[Error] Exception in /chat/stream: {e}")
+            yield f"event: error\ndata: {json.dumps({'type': 'error', 'error': 'Internal server error'})}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 if __name__ == "__main__":
+    # Development server; use serve.py for multi-worker production serving
     app.run(debug=True)
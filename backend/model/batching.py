@@ -0,0 +1,104 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Collect inputs from concurrent requests into a single batched forward pass.
+
+    Each call to `submit` queues an array of shape (n, ...) and returns a Future.
+    A background thread drains the queue until either `max_batch_size` rows are
+    collected or `max_wait_ms` has passed since the first item arrived, runs
+    `predict_fn` once on the concatenated batch and hands every caller its slice.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=5.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._carry = None
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, inputs):
+        """Queue a batch of inputs and return a Future resolving to its predictions"""
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        future = Future()
+        self._queue.put((np.asarray(inputs), future))
+        return future
+
+    def predict(self, inputs, timeout=None):
+        """Blocking helper: submit inputs and wait for their predictions"""
+        return self.submit(inputs).result(timeout=timeout)
+
+    def qsize(self):
+        """Number of requests waiting for the next forward pass"""
+        return self._queue.qsize() + (1 if self._carry is not None else 0)
+
+    def close(self, timeout=None):
+        """Stop accepting work, flush what is queued and join the worker thread"""
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join(timeout)
+
+    def _next_item(self, timeout=None):
+        if self._carry is not None:
+            item, self._carry = self._carry, None
+            return item
+        return self._queue.get(timeout=timeout)
+
+    def _collect(self):
+        first = self._next_item()
+        if first is None:
+            return None
+
+        batch = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._next_item(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the sentinel back so the loop exits after this batch
+                self._queue.put(None)
+                break
+            if size + len(item[0]) > self.max_batch_size:
+                self._carry = item
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            # Drop callers that gave up before the forward pass started
+            batch = [(x, f) for x, f in batch if f.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                inputs = np.concatenate([x for x, _ in batch], axis=0)
+                outputs = np.asarray(self.predict_fn(inputs))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for x, future in batch:
+                future.set_result(outputs[offset:offset + len(x)])
+                offset += len(x)
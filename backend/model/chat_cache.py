@@ -0,0 +1,158 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_PERCENT = re.compile(r"(\d+(?:\.\d+)?)\s*%")
+_SPACE = re.compile(r"\s+")
+
+
+def bucket_confidence(confidence, width=10):
+    """Round a 0-100 confidence to the middle of its `width`-point bucket (62.3 -> 65 for width 10)"""
+    width = max(1, int(width))
+    return int(min(float(confidence), 100.0) // width) * width + width // 2
+
+
+def normalize_message(message, bucket_width=10):
+    """
+    Lowercase, collapse whitespace and bucket every percentage, so the prompts
+    /chat generates from a detected emotion ("...about 62.3% intensity...")
+    match for every confidence in the same bucket.
+    """
+    message = _SPACE.sub(" ", message.strip().lower())
+    return _PERCENT.sub(lambda m: f"{bucket_confidence(float(m.group(1)), bucket_width)}%", message)
+
+
+class _Flight:
+    __slots__ = ("done", "result")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class ChatResponseCache:
+    """
+    LRU cache of chat replies with TTL expiry and single-flight coalescing.
+
+    Keys combine the normalized message, the top emotion with its bucketed
+    confidence and the upstream model name. get_or_compute() runs the upstream
+    call once per key: concurrent identical requests wait for the first one and
+    share its reply instead of making their own call. Only successful replies
+    are stored; an error is shared with the waiting requests but not cached.
+    """
+
+    def __init__(self, max_entries=512, ttl=600.0, bucket_width=10, wait_timeout=60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.bucket_width = bucket_width
+        self.wait_timeout = wait_timeout
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.upstream_calls = 0
+        self.upstream_seconds = 0.0
+        self.hit_seconds = 0.0
+
+    def key(self, message, emotion=None, confidence=0.0, model=None):
+        parts = [normalize_message(message, self.bucket_width), model or ""]
+        if emotion:
+            parts += [emotion.lower(), str(bucket_confidence(confidence, self.bucket_width))]
+        return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=16).hexdigest()
+
+    def get(self, key):
+        """Return the cached reply for a key, or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, reply = entry
+            if expires <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return reply
+
+    def put(self, key, reply):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, reply)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def record_hit(self, seconds):
+        with self._lock:
+            self.hits += 1
+            self.hit_seconds += seconds
+
+    def record_upstream(self, seconds):
+        with self._lock:
+            self.misses += 1
+            self.upstream_calls += 1
+            self.upstream_seconds += seconds
+
+    def get_or_compute(self, key, compute):
+        """
+        Return (reply, error, outcome) where outcome is "hit", "coalesced" or "miss".
+
+        compute() makes the upstream call and returns (reply, error) like
+        EmotionAgent.chat.
+        """
+        start = time.perf_counter()
+        reply = self.get(key)
+        if reply is not None:
+            self.record_hit(time.perf_counter() - start)
+            return reply, None, "hit"
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        if not leader:
+            if flight.done.wait(self.wait_timeout) and flight.result is not None:
+                with self._lock:
+                    self.coalesced += 1
+                    self.hit_seconds += time.perf_counter() - start
+                return (*flight.result, "coalesced")
+            # The leader is stuck; make our own call rather than waiting forever
+            result = compute()
+            self.record_upstream(time.perf_counter() - start)
+            return (*result, "miss")
+
+        try:
+            flight.result = compute()
+            self.record_upstream(time.perf_counter() - start)
+            reply, error = flight.result
+            if error is None and reply:
+                self.put(key, reply)
+            return reply, error, "miss"
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def stats(self):
+        with self._lock:
+            saved = self.hits + self.coalesced
+            lookups = saved + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "coalesced": self.coalesced,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": saved / lookups if lookups else 0.0,
+                "upstream_calls": self.upstream_calls,
+                "upstream_calls_saved": saved,
+                "avg_hit_ms": self.hit_seconds / saved * 1000.0 if saved else None,
+                "avg_upstream_ms": self.upstream_seconds / self.upstream_calls * 1000.0 if self.upstream_calls else None,
+            }
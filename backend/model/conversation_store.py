@@ -0,0 +1,169 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def estimate_tokens(message):
+    """Rough token count for budgeting (about 4 characters per token plus per-message overhead)"""
+    return len(message["content"]) // 4 + 4
+
+
+class SqliteConversationBackend:
+    """Persist conversation histories in a local SQLite file so they survive restarts"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversations (session_id TEXT PRIMARY KEY, messages TEXT, updated REAL)"
+        )
+
+    def load(self, session_id, newer_than=None):
+        """A session's messages, or None if it is unknown or not updated since newer_than (unix time)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT messages, updated FROM conversations WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None or (newer_than is not None and row[1] < newer_than):
+            return None
+        return json.loads(row[0])
+
+    def save(self, session_id, messages):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO conversations (session_id, messages, updated) VALUES (?, ?, ?)",
+                (session_id, json.dumps(messages), time.time()),
+            )
+
+    def delete(self, session_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
+
+    def purge(self, older_than):
+        """Drop histories not updated since the given unix timestamp"""
+        with self._lock:
+            self._conn.execute("DELETE FROM conversations WHERE updated < ?", (older_than,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class _Conversation:
+    __slots__ = ("messages", "lock", "last_used")
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+
+class ConversationStore:
+    """
+    Session-keyed chat histories with LRU/TTL eviction and a token budget per session.
+
+    The store-wide lock only guards the session map; reading or appending to one
+    session takes that session's own lock, so users never wait on each other.
+    An optional backend (e.g. SqliteConversationBackend) is written through on
+    every change and consulted when a session is not in memory. With shared=True
+    (several worker processes on one backend) every lookup re-reads the backend,
+    since another process may have appended to the session in the meantime.
+    Sessions idle for longer than `ttl` expire in the backend too: they are not
+    loaded back, and expired rows are purged at most every `purge_interval` seconds.
+    """
+
+    def __init__(self, max_sessions=1000, ttl=3600.0, max_tokens=2000, max_messages=40, backend=None, shared=False,
+                 purge_interval=60.0):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_tokens = max_tokens
+        self.max_messages = max_messages
+        self.backend = backend
+        self.shared = shared and backend is not None
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, session_id, create=True):
+        now = time.monotonic()
+        with self._lock:
+            conversation = self._sessions.get(session_id)
+            if conversation and now - conversation.last_used > self.ttl:
+                del self._sessions[session_id]
+                conversation = None
+            if conversation and not self.shared:
+                conversation.last_used = now
+                self._sessions.move_to_end(session_id)
+                return conversation
+
+        # Miss: load outside the store lock, then insert (or use a racing insert)
+        messages = None
+        if self.backend:
+            self._purge_backend(now)
+            messages = self.backend.load(session_id, newer_than=time.time() - self.ttl)
+        messages = messages or []
+        if not messages and not create:
+            return None
+        with self._lock:
+            conversation = self._sessions.get(session_id)
+            if conversation is None:
+                conversation = _Conversation(messages)
+                self._sessions[session_id] = conversation
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            elif self.shared:
+                with conversation.lock:
+                    conversation.messages = messages
+                conversation.last_used = now
+                self._sessions.move_to_end(session_id)
+            return conversation
+
+    def _purge_backend(self, now):
+        with self._lock:
+            if now < self._next_purge:
+                return
+            self._next_purge = now + self.purge_interval
+        self.backend.purge(time.time() - self.ttl)
+
+    def history(self, session_id):
+        """Return a copy of the session's messages, oldest first"""
+        conversation = self._get(session_id, create=False)
+        if conversation is None:
+            return []
+        with conversation.lock:
+            return list(conversation.messages)
+
+    def append(self, session_id, *messages):
+        """Add {"role", "content"} messages and trim the oldest ones to stay within budget"""
+        conversation = self._get(session_id)
+        with conversation.lock:
+            conversation.messages.extend({"role": m["role"], "content": m["content"]} for m in messages)
+            self._trim(conversation.messages)
+            snapshot = list(conversation.messages)
+        if self.backend:
+            self.backend.save(session_id, snapshot)
+
+    def clear(self, session_id):
+        """Forget one session's history without touching anyone else's"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        if self.backend:
+            self.backend.delete(session_id)
+
+    def _trim(self, messages):
+        while len(messages) > self.max_messages:
+            messages.pop(0)
+        total = sum(estimate_tokens(m) for m in messages)
+        while messages and total > self.max_tokens:
+            total -= estimate_tokens(messages.pop(0))
+        # Never start a history on a dangling assistant reply
+        while messages and messages[0]["role"] != "user":
+            messages.pop(0)
+
+    def __len__(self):
+        return len(self._sessions)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Export the Keras .h5 emotion models to TFLite and/or ONNX for lean CPU-only serving.
+
+Usage:
+    python convert_models.py models/model.h5 models/face_model.h5 --formats tflite onnx
+
+Converted files are written next to the source model (or into --out-dir) with the
+same base name, which is where INFERENCE_BACKEND=tflite|onnx looks for them.
+ONNX export additionally needs the tf2onnx and onnx packages.
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+
+def convert_to_tflite(model, out_path):
+    """Write a float32 TFLite flatbuffer for a loaded Keras model"""
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    with open(out_path, "wb") as f:
+        f.write(converter.convert())
+    return out_path
+
+
+def convert_to_onnx(model, out_path):
+    """Write an ONNX graph for a loaded Keras model"""
+    try:
+        import tf2onnx  # noqa: F401  (required by keras' ONNX exporter)
+    except ImportError:
+        raise RuntimeError("ONNX export requires the tf2onnx package (pip install tf2onnx onnx)")
+
+    model.export(out_path, format="onnx")
+    return out_path
+
+
+CONVERTERS = {
+    "tflite": (".tflite", convert_to_tflite),
+    "onnx": (".onnx", convert_to_onnx),
+}
+
+
+def convert_model(h5_path, formats, out_dir=None):
+    """Convert one .h5 model to every requested format and return the written paths"""
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(h5_path, compile=False)
+    # Exporters need a built model; a dummy call builds every layer
+    model(np.zeros((1, *model.input_shape[1:]), dtype=np.float32))
+    base = os.path.splitext(os.path.basename(h5_path))[0]
+    out_dir = out_dir or os.path.dirname(h5_path) or "."
+    os.makedirs(out_dir, exist_ok=True)
+
+    written = []
+    for fmt in formats:
+        extension, convert = CONVERTERS[fmt]
+        out_path = os.path.join(out_dir, base + extension)
+        convert(model, out_path)
+        print(f"✅ {h5_path} -> {out_path}")
+        written.append(out_path)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("models", nargs="+", help="Keras .h5 model files to convert")
+    parser.add_argument("--formats", nargs="+", choices=sorted(CONVERTERS), default=["tflite", "onnx"])
+    parser.add_argument("--out-dir", help="Directory for converted models (default: next to each source)")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for h5_path in args.models:
+        try:
+            convert_model(h5_path, args.formats, args.out_dir)
+        except Exception as e:
+            print(f"⚠️ Failed to convert {h5_path}: {e}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,41 @@
-from groq import Groq
+import httpx
+import base64
+import hashlib
 import os
+import threading
 import time
+from collections import OrderedDict
+from io import BytesIO
+from PIL import Image
 from dotenv import load_dotenv
 
 MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
+TEXT_MODEL = "llama-3.3-70b-versatile"
 
 class EmotionAgent:
     def __init__(self):
         load_dotenv()
-        self.client = self._initialize_groq_client()
+        # One keep-alive connection pool shared by every request and every client re-init
+        self.timeout = float(os.getenv("CHAT_TIMEOUT", "30"))
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("CHAT_MAX_CONNECTIONS", "20")),
+                max_keepalive_connections=int(os.getenv("CHAT_MAX_KEEPALIVE", "10")),
+            ),
+            timeout=httpx.Timeout(self.timeout, connect=5.0),
+        )
+        # Settings are read now; the Groq SDK is imported and the client built on first use
+        self.api_key = os.getenv('GROQ_API_KEY')
+        self.base_url = os.getenv("GROQ_BASE_URL") or None
+        self._client = None
+        self._client_ready = False
+        self._client_lock = threading.Lock()
+        # Processed vision payloads keyed by a hash of the uploaded bytes
+        self.image_cache_size = int(os.getenv("IMAGE_CACHE_SIZE", "64"))
+        self._image_cache = OrderedDict()
+        self._image_cache_lock = threading.Lock()
+        # Optional callable(stage, seconds) that receives per-stage latencies
+        self.on_timing = None
         self.system_prompt = (
             "You are a compassionate and insightful AI companion, acting as a personal advisor and therapist. "
             "Offer empathetic, thoughtful guidance to support emotional well-being, tailored to the user's needs. "
@@ -16,60 +43,92 @@ class EmotionAgent:
             "Dont send any abrupt messages in reply. Keep it to the point."
         )
 
+    @property
+    def client(self):
+        if not self._client_ready:
+            with self._client_lock:
+                if not self._client_ready:
+                    self._client = self._initialize_groq_client()
+                    self._client_ready = True
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+        self._client_ready = True
+
     def _initialize_groq_client(self):
         try:
-            api_key = os.getenv('GROQ_API_KEY')
-            if not api_key:
+            from groq import Groq
+
+            if not self.api_key:
                 raise ValueError("GROQ_API_KEY not found in environment variables")
             print("Groq client initialized successfully")
-            return Groq(api_key=api_key)
+            return Groq(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=self.timeout,
+                http_client=self.http_client,
+            )
         except Exception as e:
             print(f"Error initializing Groq client: {str(e)}")
             return None
 
-    def chat(self, user_message=None, image_data=None, emotion_predictions=None):
+    def _build_request(self, user_message, image_data, emotion_predictions, history=None):
+        """Return (messages, model) for a chat completion, replaying earlier turns from history"""
+        text_content = self.test_emotion_detection(user_message, emotion_predictions)
+        history = list(history or [])
+
+        if image_data:
+            # Process image to ensure optimal resolution
+            start = time.perf_counter()
+            processed_image = self.process_image(image_data)
+            self._record_timing("chat_image", time.perf_counter() - start)
+            
+            messages = history
+            messages.append({
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text", 
+                        "text": text_content.strip()
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": 
+                        {
+                            "url": f"data:image/jpeg;base64,{processed_image}",
+                            "detail": "high"
+                        }
+                    }
+                ]
+            })
+            print("Using vision model for image analysis")
+            return messages, MODEL
+
+        messages = [{"role": "system", "content": self.system_prompt}] + history
+        messages.append({"role": "user", "content": text_content})
+        print("Using text model for conversation")
+        return messages, TEXT_MODEL
+
+    def _record_timing(self, stage, seconds):
+        if self.on_timing:
+            self.on_timing(stage, seconds)
+
+    def chat(self, user_message=None, image_data=None, emotion_predictions=None, history=None):
         if not self.client:
             return None, "API Error: Groq client not initialized"
 
         if not user_message and not image_data:
             return None, "No message or image provided"
 
-        text_content = self.test_emotion_detection(user_message, emotion_predictions)
-
-        if image_data:
-            try:
-                # Process image to ensure optimal resolution
-                processed_image = self.process_image(image_data)
-                
-                messages = []
-                messages.append({
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text", 
-                            "text": text_content.strip()
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": 
-                            {
-                                "url": f"data:image/jpeg;base64,{processed_image}",
-                                "detail": "high"
-                            }
-                        }
-                    ]
-                })
-                model = MODEL
-                print("Using vision model for image analysis")
-            except Exception as e:
-                return None, f"Failed to process image data: {str(e)}"
-        else:
-            messages = [{"role": "system", "content": self.system_prompt}]
-            messages.append({"role": "user", "content": text_content})
-            model = "llama-3.3-70b-versatile"
-            print("Using text model for conversation")
+        try:
+            messages, model = self._build_request(user_message, image_data, emotion_predictions, history)
+        except Exception as e:
+            return None, f"Failed to process image data: {str(e)}"
 
         try:
+            start = time.perf_counter()
             chat_completion = self.client.chat.completions.create(
                 messages=messages,
                 model=model,
@@ -79,6 +138,7 @@ class EmotionAgent:
                 stream=False,
                 stop=None
             )
+            self._record_timing("chat_upstream", time.perf_counter() - start)
             response = chat_completion.choices[0].message.content
             
             if emotion_predictions:
@@ -92,6 +152,64 @@ class EmotionAgent:
         except Exception as e:
             return None, f"API Error: {str(e)}"
 
+    def chat_stream(self, user_message=None, image_data=None, emotion_predictions=None, history=None):
+        """
+        Stream a completion as it is generated.
+
+        Yields event dicts: {"type": "token", "content": ...} for each delta, then
+        {"type": "done", "ttft_ms": ..., "total_ms": ...}, or a single
+        {"type": "error", "error": ...}. Closing the generator (e.g. when the HTTP
+        client disconnects) closes the upstream stream so generation stops.
+        """
+        if not self.client:
+            yield {"type": "error", "error": "API Error: Groq client not initialized"}
+            return
+
+        if not user_message and not image_data:
+            yield {"type": "error", "error": "No message or image provided"}
+            return
+
+        try:
+            messages, model = self._build_request(user_message, image_data, emotion_predictions, history)
+        except Exception as e:
+            yield {"type": "error", "error": f"Failed to process image data: {str(e)}"}
+            return
+
+        start = time.perf_counter()
+        ttft = None
+        stream = None
+        try:
+            stream = self.client.chat.completions.create(
+                messages=messages,
+                model=model,
+                temperature=0.3,
+                max_tokens=1000,
+                top_p=1,
+                stream=True,
+                stop=None
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if not content:
+                    continue
+                if ttft is None:
+                    ttft = (time.perf_counter() - start) * 1000.0
+                yield {"type": "token", "content": content}
+        except Exception as e:
+            yield {"type": "error", "error": f"API Error: {str(e)}"}
+            return
+        finally:
+            if stream is not None:
+                stream.close()
+
+        total = (time.perf_counter() - start) * 1000.0
+        self._record_timing("chat_first_token", (ttft or total) / 1000.0)
+        self._record_timing("chat_upstream", total / 1000.0)
+        print(f"Chat stream finished: ttft={ttft or total:.0f}ms total={total:.0f}ms")
+        yield {"type": "done", "ttft_ms": round(ttft or total, 2), "total_ms": round(total, 2)}
+
     def test_emotion_detection(self, user_message, emotion_predictions):
         """Test helper to verify emotion detection formatting"""
         text_content = user_message if user_message else ""
@@ -110,10 +228,13 @@ class EmotionAgent:
         self.client = self._initialize_groq_client()
         print("Chat session reset")
 
-    # Add this method after the test_emotion_detection method
     def process_image(self, image_data, target_resolution=(1024, 1024)):
         """
         Process image data to ensure optimal resolution for LLM analysis
+
+        Small JPEGs are passed through untouched after reading only their header;
+        larger JPEGs are decoded in draft mode (DCT-scaled) before the final
+        LANCZOS thumbnail. Results are cached by content hash.
         
         Args:
             image_data: Base64 encoded image or image bytes
@@ -122,10 +243,6 @@ class EmotionAgent:
         Returns:
             Processed base64 encoded image
         """
-        import base64
-        from io import BytesIO
-        from PIL import Image
-        
         try:
             # Check if image_data is already base64 encoded
             if isinstance(image_data, str):
@@ -133,27 +250,54 @@ class EmotionAgent:
                 image_bytes = base64.b64decode(image_data)
             else:
                 # Assume it's already bytes
-                image_bytes = image_data
-                
-            # Open image with PIL
-            img = Image.open(BytesIO(image_bytes))
-            
-            # Resize image to target resolution while maintaining aspect ratio
-            img.thumbnail(target_resolution, Image.Resampling.LANCZOS)
-            
-            # Save to BytesIO object with high quality
-            buffer = BytesIO()
-            img.save(buffer, format="JPEG", quality=95)
-            buffer.seek(0)
-            
-            # Encode back to base64
-            processed_image = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            
+                image_bytes = bytes(image_data)
+
+            cache_key = (hashlib.blake2b(image_bytes, digest_size=16).digest(), tuple(target_resolution))
+            with self._image_cache_lock:
+                if cache_key in self._image_cache:
+                    self._image_cache.move_to_end(cache_key)
+                    return self._image_cache[cache_key]
+
+            processed_image = self._process_image_bytes(image_data, image_bytes, target_resolution)
+
+            with self._image_cache_lock:
+                self._image_cache[cache_key] = processed_image
+                while len(self._image_cache) > self.image_cache_size:
+                    self._image_cache.popitem(last=False)
             return processed_image
         except Exception as e:
             print(f"Error processing image: {str(e)}")
             return image_data  # Return original if processing fails
 
+    def _process_image_bytes(self, image_data, image_bytes, target_resolution):
+        # Opening only parses the header; pixels are not decoded yet
+        img = Image.open(BytesIO(image_bytes))
+        width, height = img.size
+        max_width, max_height = target_resolution
+
+        if img.format == "JPEG" and width <= max_width and height <= max_height:
+            # Already a small JPEG: send it as-is
+            if isinstance(image_data, str):
+                return image_data
+            return base64.b64encode(image_bytes).decode('utf-8')
+
+        if img.format == "JPEG":
+            # Let libjpeg downscale by 1/2..1/8 while decoding, staying above the final size
+            scale = min(max_width / width, max_height / height, 1.0)
+            img.draft("RGB", (int(width * scale), int(height * scale)))
+
+        # Resize image to target resolution while maintaining aspect ratio
+        img.thumbnail(target_resolution, Image.Resampling.LANCZOS)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+
+        # Save to BytesIO object with high quality
+        buffer = BytesIO()
+        img.save(buffer, format="JPEG", quality=95)
+
+        # Encode back to base64
+        return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
 if __name__ == "__main__":
     agent = EmotionAgent()
     print("EmotionAgent initialized. Use test.py for comprehensive testing.")
\ No newline at end of file
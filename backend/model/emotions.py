@@ -0,0 +1,22 @@
+import numpy as np
+
+# Output order of the 7-class FER models
+CLASS_NAMES = ['Angry', 'Disgust', 'Fear', 'Happy', 'Neutral', 'Sad', 'Surprise']
+
+
+def format_prediction(scores):
+    """Build the /predict response body from one row of softmax scores"""
+    scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+    best = int(np.argmax(scores))
+
+    # Create dictionary with all emotions and their confidence scores (in percentage)
+    all_emotions = {
+        CLASS_NAMES[i].lower(): float(scores[i] * 100)
+        for i in range(len(CLASS_NAMES))
+    }
+
+    return {
+        "prediction": CLASS_NAMES[best],
+        "confidence": float(scores[best]),
+        "all_emotions": all_emotions
+    }
@@ -0,0 +1,74 @@
+import numpy as np
+from PIL import Image
+
+FACE_SIZE = (48, 48)
+
+
+class FaceDetector:
+    """
+    Locate faces in a grayscale frame with OpenCV's frontal-face Haar cascade.
+
+    Detection runs on a copy of the frame scaled down to `detect_width` pixels wide
+    and the boxes are mapped back to full-resolution coordinates, so crops keep the
+    detail of the original upload.
+    """
+
+    def __init__(self, cascade_path=None, detect_width=640, scale_factor=1.1, min_neighbors=5, min_face_ratio=0.08):
+        import cv2
+
+        if not hasattr(cv2, "CascadeClassifier"):
+            raise ImportError("this OpenCV build has no CascadeClassifier (install opencv-python-headless<5)")
+        cascade_path = cascade_path or cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        if self.cascade.empty():
+            raise OSError(f"Could not load Haar cascade from {cascade_path}")
+        self.detect_width = detect_width
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_face_ratio = min_face_ratio
+
+    def detect(self, gray):
+        """
+        Find faces in a grayscale PIL image.
+
+        Returns:
+            List of (x, y, width, height) boxes in original pixel coordinates, largest first
+        """
+        scale = min(1.0, self.detect_width / gray.width)
+        small = gray if scale == 1.0 else gray.resize(
+            (max(1, round(gray.width * scale)), max(1, round(gray.height * scale))),
+            Image.Resampling.BILINEAR,
+        )
+        pixels = np.asarray(small, dtype=np.uint8)
+        min_side = max(12, int(min(pixels.shape) * self.min_face_ratio))
+
+        found = self.cascade.detectMultiScale(
+            pixels,
+            scaleFactor=self.scale_factor,
+            minNeighbors=self.min_neighbors,
+            minSize=(min_side, min_side),
+        )
+        boxes = [
+            (int(x / scale), int(y / scale), int(w / scale), int(h / scale))
+            for (x, y, w, h) in found
+        ]
+        return sorted(boxes, key=lambda box: box[2] * box[3], reverse=True)
+
+
+def crop_faces(gray, boxes):
+    """Crop each box out of a grayscale PIL image and stack them into a (N, 48, 48, 1) model input"""
+    batch = np.empty((len(boxes), *FACE_SIZE, 1), dtype=np.float32)
+    for i, (x, y, w, h) in enumerate(boxes):
+        # resize with a box crops and scales in a single pass
+        face = gray.resize(FACE_SIZE, box=(x, y, x + w, y + h))
+        batch[i, ..., 0] = np.asarray(face, dtype=np.float32) / 255.0
+    return batch
+
+
+def load_face_detector():
+    """Return a FaceDetector, or None when OpenCV is not installed"""
+    try:
+        return FaceDetector()
+    except (ImportError, OSError) as e:
+        print(f"⚠️ Warning: Face detection unavailable, /predict/faces will score the full frame: {e}")
+        return None
@@ -0,0 +1,119 @@
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class SqliteFrameStore:
+    """
+    File-backed store so a frame_id issued by one worker process resolves in another.
+
+    Uses SQLite in WAL mode; put the file on tmpfs (e.g. /dev/shm) since frames are
+    short-lived. Each entry keeps the encoded bytes and an absolute expiry.
+    """
+
+    def __init__(self, path, max_frames=1024):
+        self.path = path
+        self.max_frames = max_frames
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS frames (frame_id TEXT PRIMARY KEY, data BLOB, expires REAL)")
+
+    def get(self, frame_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM frames WHERE frame_id = ? AND expires > ?", (frame_id, time.time())
+            ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def put(self, frame_id, data, ttl):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO frames (frame_id, data, expires) VALUES (?, ?, ?)",
+                (frame_id, data, time.time() + ttl),
+            )
+            self._writes += 1
+            # Trim expired and overflow rows every so often rather than on every write
+            if self._writes % 100 == 0:
+                self._conn.execute("DELETE FROM frames WHERE expires <= ?", (time.time(),))
+                self._conn.execute(
+                    "DELETE FROM frames WHERE frame_id IN (SELECT frame_id FROM frames "
+                    "ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+                    (self.max_frames,),
+                )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class FrameStore:
+    """
+    Bounded LRU/TTL store of recently uploaded frames, keyed by a random frame ID.
+
+    /predict keeps the JPEG bytes it was sent so /chat can refer to the same frame
+    by ID instead of the client encoding and uploading it a second time. Both the
+    number of frames and their total size are capped. An optional shared store
+    (e.g. SqliteFrameStore) is written through on puts and consulted on local
+    misses, so /chat can land on a different worker than the /predict call.
+    """
+
+    def __init__(self, max_frames=256, max_bytes=64 * 1024 * 1024, ttl=120.0, store=None):
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._frames = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, data):
+        """Store one encoded frame and return its ID, or None if it is larger than the whole store"""
+        data = bytes(data)
+        if len(data) > self.max_bytes:
+            return None
+        frame_id = uuid.uuid4().hex
+        with self._lock:
+            self._frames[frame_id] = (data, time.monotonic())
+            self._bytes += len(data)
+            while len(self._frames) > self.max_frames or self._bytes > self.max_bytes:
+                _, (evicted, _) = self._frames.popitem(last=False)
+                self._bytes -= len(evicted)
+        if self.store:
+            self.store.put(frame_id, data, self.ttl)
+        return frame_id
+
+    def get(self, frame_id):
+        """Return the frame's bytes, or None if it is unknown or has expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._frames.get(frame_id)
+            if entry and now - entry[1] > self.ttl:
+                del self._frames[frame_id]
+                self._bytes -= len(entry[0])
+                entry = None
+            if entry is not None:
+                self._frames.move_to_end(frame_id)
+                self.hits += 1
+                return entry[0]
+
+        data = self.store.get(frame_id) if self.store else None
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def stats(self):
+        with self._lock:
+            return {"frames": len(self._frames), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+    def __len__(self):
+        return len(self._frames)
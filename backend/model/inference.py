@@ -0,0 +1,199 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+INPUT_SHAPE = (48, 48, 1)
+
+
+class InferenceBackend(ABC):
+    """
+    Common interface for the runtimes that can serve the emotion CNN.
+
+    Implementations take a (N, 48, 48, 1) float32 batch and return (N, 7) numpy scores.
+    """
+
+    name = None
+
+    @abstractmethod
+    def predict(self, batch):
+        """(N, 48, 48, 1) float32 batch -> (N, 7) scores"""
+
+    def warmup(self, batch_sizes=(1,)):
+        """Run dummy batches so graph tracing / allocation happens before the first request"""
+        for size in batch_sizes:
+            self.predict(np.zeros((size, *INPUT_SHAPE), dtype=np.float32))
+
+    def __call__(self, batch):
+        return self.predict(batch)
+
+
+class CompiledModel(InferenceBackend):
+    """
+    Keras model served through a traced tf.function instead of model.predict.
+
+    model.predict builds a data adapter, a tf.data pipeline and callbacks on every
+    call, which dominates latency for a handful of 48x48 inputs. Tracing the
+    forward pass once with a fixed (None, 48, 48, 1) signature gives a callable
+    that goes straight to the compiled graph.
+    """
+
+    name = "keras"
+
+    def __init__(self, model_path, jit_compile=False, num_threads=None):
+        # Imported here so lean TFLite/ONNX workers never load TensorFlow
+        import tensorflow as tf
+
+        if num_threads:
+            try:
+                tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+                tf.config.threading.set_inter_op_parallelism_threads(1)
+            except RuntimeError as e:
+                # Thread pools are fixed once the TF runtime has started
+                print(f"⚠️ Warning: Could not set TensorFlow thread counts: {e}")
+
+        self.model_path = model_path
+        self.model = tf.keras.models.load_model(model_path, compile=False)
+        self._forward = tf.function(
+            lambda x: self.model(x, training=False),
+            input_signature=[tf.TensorSpec(shape=(None, *INPUT_SHAPE), dtype=tf.float32)],
+            jit_compile=jit_compile,
+        )
+
+    def predict(self, batch):
+        """Run the compiled forward pass on a (N, 48, 48, 1) batch and return numpy scores"""
+        batch = np.asarray(batch, dtype=np.float32)
+        return self._forward(batch).numpy()
+
+
+def _tflite_interpreter_class():
+    """Prefer the standalone LiteRT / tflite-runtime interpreters over full TensorFlow"""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    import tensorflow as tf
+    return tf.lite.Interpreter
+
+
+class TFLiteBackend(InferenceBackend):
+    """
+    Serve a converted .tflite model with the TFLite interpreter.
+
+    Fully integer-quantized models (quantize_model.py) take int8 inputs and return
+    int8 scores; those are quantized and dequantized here with the tensors' scale
+    and zero point, so callers always pass and get float32.
+    """
+
+    name = "tflite"
+
+    def __init__(self, model_path, num_threads=None):
+        self.model_path = model_path
+        interpreter_class = _tflite_interpreter_class()
+        self.interpreter = interpreter_class(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input["shape"][0])
+        self.quantized = self._input["dtype"] != np.float32
+        # The interpreter holds mutable tensor buffers and is not thread-safe
+        self._lock = threading.Lock()
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        with self._lock:
+            if len(batch) != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input["index"], [len(batch), *INPUT_SHAPE])
+                self.interpreter.allocate_tensors()
+                self._batch_size = len(batch)
+            self.interpreter.set_tensor(self._input["index"], self._quantize(batch))
+            self.interpreter.invoke()
+            return self._dequantize(self.interpreter.get_tensor(self._output["index"]))
+
+    def _quantize(self, batch):
+        if not self.quantized:
+            return batch
+        scale, zero_point = self._input["quantization"]
+        info = np.iinfo(self._input["dtype"])
+        return np.clip(np.rint(batch / scale + zero_point), info.min, info.max).astype(self._input["dtype"])
+
+    def _dequantize(self, scores):
+        if scores.dtype == np.float32:
+            return scores.copy()
+        scale, zero_point = self._output["quantization"]
+        return (scores.astype(np.float32) - zero_point) * np.float32(scale)
+
+
+class OnnxBackend(InferenceBackend):
+    """Serve a converted .onnx model with ONNX Runtime on CPU"""
+
+    name = "onnx"
+
+    def __init__(self, model_path, num_threads=None):
+        import onnxruntime as ort
+
+        self.model_path = model_path
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        return self.session.run(None, {self._input_name: batch})[0]
+
+
+BACKENDS = {
+    "keras": CompiledModel,
+    "tflite": TFLiteBackend,
+    "tflite_int8": TFLiteBackend,
+    "onnx": OnnxBackend,
+}
+
+MODEL_EXTENSIONS = {
+    "keras": ".h5",
+    "tflite": ".tflite",
+    "tflite_int8": "_int8.tflite",
+    "onnx": ".onnx",
+}
+
+
+def backend_model_path(model_path, backend):
+    """Path of the artifact a backend serves, e.g. models/model.h5 -> models/model.tflite"""
+    extension = MODEL_EXTENSIONS[backend]
+    if model_path.endswith(extension):
+        return model_path
+    return os.path.splitext(model_path)[0] + extension
+
+
+def artifact_backend(model_path):
+    """Backend that serves an already converted file (e.g. models/model_int8.tflite), or None for .h5"""
+    for backend, extension in sorted(MODEL_EXTENSIONS.items(), key=lambda item: -len(item[1])):
+        if backend != "keras" and model_path.endswith(extension):
+            return backend
+    return None
+
+
+def load_backend(backend, model_path, **options):
+    """
+    Instantiate an inference backend by name.
+
+    Args:
+        backend: One of "keras", "tflite", "tflite_int8" or "onnx"
+        model_path: Path to the .h5 model; other backends load the converted file next to it
+        options: Backend specific keyword arguments (jit_compile, num_threads)
+
+    Returns:
+        An InferenceBackend instance
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+    return BACKENDS[backend](backend_model_path(model_path, backend), **options)
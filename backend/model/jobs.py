@@ -0,0 +1,445 @@
+#!/usr/bin/env python
+"""
+Local background jobs: a SQLite-backed queue and a pool of worker processes.
+
+Web processes submit jobs with JobQueue.submit() and read their status, progress
+and results back from the same SQLite file, so any worker of serve.py can answer
+for any job. Worker processes are plain subprocesses running this file:
+
+    python jobs.py --db /tmp/emotion-jobs/jobs.db --handler score_images=analysis_jobs:score_images
+
+Each one claims the oldest queued job, runs its handler and stores the result.
+They are started with a fresh interpreter rather than forked, so they never
+inherit a TensorFlow runtime or the web server's threads, and they exit on
+their own if the process that started them goes away.
+
+A handler is a "module:function" taking (params, job); it reports progress with
+job.progress(fraction, message), which raises JobCancelled once the job has
+been cancelled, and returns a JSON-serializable result. Files a job needs live
+in job.dir, which is removed together with the job.
+
+A job can be submitted with an access token; only its SHA-256 is stored, and
+check_token() tells whether a caller presented the right one.
+"""
+
+import argparse
+import atexit
+import hashlib
+import hmac
+import importlib
+import json
+import os
+import shutil
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler by job.progress() once the job is cancelled"""
+
+
+class _Interrupted(Exception):
+    """The worker is shutting down; the job goes back to the queue"""
+
+
+class JobStore:
+    """Job records, progress and results in a SQLite file shared by every process"""
+
+    def __init__(self, path, files_dir=None):
+        self.path = path
+        self.files_dir = files_dir or os.path.join(os.path.dirname(os.path.abspath(path)), "files")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT, status TEXT, params TEXT, progress REAL, message TEXT,"
+            "result TEXT, error TEXT, cancel INTEGER DEFAULT 0, worker INTEGER,"
+            "created REAL, started REAL, finished REAL, token TEXT)"
+        )
+        try:
+            # Stores created before jobs had access tokens
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN token TEXT")
+        except sqlite3.OperationalError:
+            pass
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+
+    def job_dir(self, job_id, create=True):
+        path = os.path.join(self.files_dir, job_id)
+        if create:
+            os.makedirs(path, exist_ok=True)
+        return path
+
+    @staticmethod
+    def _token_hash(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def submit(self, kind, params, job_id=None, token=None):
+        job_id = job_id or uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, params, progress, created, token) VALUES (?, ?, ?, ?, 0, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(params), time.time(), self._token_hash(token) if token else None),
+            )
+        return job_id
+
+    def check_token(self, job_id, token):
+        """True if the job exists and was submitted with this token"""
+        with self._lock:
+            row = self._conn.execute("SELECT token FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if not row or not row[0] or not token:
+            return False
+        return hmac.compare_digest(row[0], self._token_hash(token))
+
+    def get(self, job_id, with_result=False):
+        """Job record as a dict (the result only if with_result), or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, progress, message, error, cancel, created, started, finished, result "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._record(row, with_result) if row else None
+
+    def list(self, status=None, limit=50):
+        query = ("SELECT id, kind, status, progress, message, error, cancel, created, started, finished, NULL "
+                 "FROM jobs")
+        args = ()
+        if status:
+            query += " WHERE status = ?"
+            args = (status,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY created DESC LIMIT ?", (*args, limit)).fetchall()
+        return [self._record(row) for row in rows]
+
+    @staticmethod
+    def _record(row, with_result=False):
+        job_id, kind, status, progress, message, error, cancel, created, started, finished, result = row
+        record = {
+            "id": job_id,
+            "kind": kind,
+            "status": status,
+            "progress": round(progress or 0.0, 4),
+            "message": message,
+            "error": error,
+            "cancel_requested": bool(cancel) and status not in FINISHED,
+            "created": created,
+            "started": started,
+            "finished": finished,
+        }
+        if with_result:
+            record["result"] = json.loads(result) if result is not None else None
+        return record
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def claim(self, worker):
+        """Mark the oldest queued job as running for this worker and return (id, kind, params), or None"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, kind, params FROM jobs WHERE status = ? ORDER BY created LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, worker = ?, started = ? WHERE id = ?",
+                        (RUNNING, worker, time.time(), row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return (row[0], row[1], json.loads(row[2])) if row else None
+
+    def update_progress(self, job_id, progress, message=None):
+        """Store progress and return True if the job has been cancelled"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET progress = ?, message = COALESCE(?, message) WHERE id = ?",
+                (progress, message, job_id),
+            )
+            row = self._conn.execute("SELECT cancel FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def finish(self, job_id, status, result=None, error=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished = ?,"
+                " progress = CASE WHEN ? = ? THEN 1.0 ELSE progress END WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(),
+                 status, SUCCEEDED, job_id),
+            )
+
+    def requeue(self, job_id):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, started = NULL WHERE id = ? AND status = ?",
+                (QUEUED, job_id, RUNNING),
+            )
+
+    def cancel(self, job_id):
+        """
+        Cancel a job: a queued one immediately, a running one once its handler next
+        reports progress. Returns the job's status afterwards, or None if unknown.
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished = ?, cancel = 1 WHERE id = ? AND status = ?",
+                (CANCELLED, time.time(), job_id, QUEUED),
+            )
+            self._conn.execute("UPDATE jobs SET cancel = 1 WHERE id = ? AND status = ?", (job_id, RUNNING))
+            row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def delete(self, job_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        shutil.rmtree(self.job_dir(job_id, create=False), ignore_errors=True)
+
+    def fail_orphans(self, alive):
+        """Fail running jobs whose worker process is gone; `alive(pid)` says whether a worker still runs"""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, worker FROM jobs WHERE status = ?", (RUNNING,)).fetchall()
+        orphans = [job_id for job_id, worker in rows if worker is None or not alive(worker)]
+        for job_id in orphans:
+            self.finish(job_id, FAILED, error="Worker process exited while running the job")
+        return len(orphans)
+
+    def purge(self, retention, max_jobs):
+        """Drop finished jobs older than `retention` seconds, then the oldest beyond `max_jobs` finished ones"""
+        placeholders = ",".join("?" * len(FINISHED))
+        with self._lock:
+            expired = self._conn.execute(
+                f"SELECT id FROM jobs WHERE status IN ({placeholders}) AND finished < ?",
+                (*FINISHED, time.time() - retention),
+            ).fetchall()
+            excess = self._conn.execute(
+                f"SELECT id FROM jobs WHERE status IN ({placeholders}) ORDER BY finished DESC LIMIT -1 OFFSET ?",
+                (*FINISHED, max_jobs),
+            ).fetchall()
+        removed = {job_id for job_id, in expired + excess}
+        for job_id in removed:
+            self.delete(job_id)
+        return len(removed)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class Job:
+    """What a handler sees of its job: its id, its working directory and progress reporting"""
+
+    def __init__(self, store, job_id, stopping, min_interval=0.25):
+        self.id = job_id
+        self.dir = store.job_dir(job_id, create=False)
+        self._store = store
+        self._stopping = stopping
+        self._min_interval = min_interval
+        self._last_write = 0.0
+
+    def progress(self, fraction, message=None):
+        """Report progress (0-1). Raises JobCancelled if the job was cancelled"""
+        if self._stopping.is_set():
+            raise _Interrupted()
+        now = time.monotonic()
+        # Writes are throttled; the cancel flag is read with every write
+        if now - self._last_write < self._min_interval and fraction < 1.0:
+            return
+        self._last_write = now
+        if self._store.update_progress(self.id, min(max(float(fraction), 0.0), 1.0), message):
+            raise JobCancelled()
+
+
+def resolve_handler(spec):
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def run_worker(path, handlers, poll_interval=0.5, files_dir=None, parent=None):
+    """Worker process main loop: claim jobs and run their handlers until SIGTERM or the parent exits"""
+    store = JobStore(path, files_dir)
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    resolved = {}
+
+    while not stopping.is_set():
+        if parent and os.getppid() != parent:
+            break
+        claimed = store.claim(os.getpid())
+        if claimed is None:
+            stopping.wait(poll_interval)
+            continue
+        job_id, kind, params = claimed
+        job = Job(store, job_id, stopping)
+        try:
+            if kind not in resolved:
+                resolved[kind] = resolve_handler(handlers[kind])
+            result = resolved[kind](params, job)
+        except JobCancelled:
+            store.finish(job_id, CANCELLED)
+        except _Interrupted:
+            store.requeue(job_id)
+        except Exception as e:
+            store.finish(job_id, FAILED, error=f"{type(e).__name__}: {e}")
+        else:
+            store.finish(job_id, SUCCEEDED, result=result)
+    store.close()
+
+
+class JobQueue:
+    """
+    Submits jobs to a JobStore and keeps `workers` worker processes running for it.
+
+    Args:
+        path: SQLite file shared by every process submitting or running jobs
+        handlers: {kind: "module:function"} resolved inside the worker processes
+        retention: Seconds finished jobs and their files are kept
+        max_jobs: Most finished jobs kept; older ones are dropped first
+    """
+
+    def __init__(self, path, handlers, workers=1, retention=86400.0, max_jobs=1000, poll_interval=0.5,
+                 files_dir=None, extra_paths=()):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.store = JobStore(path, files_dir)
+        self.handlers = dict(handlers)
+        self.workers = workers
+        self.retention = retention
+        self.max_jobs = max_jobs
+        self.poll_interval = poll_interval
+        self.extra_paths = list(extra_paths)
+        self._processes = []
+        self._monitor = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def _spawn(self):
+        command = [sys.executable, os.path.abspath(__file__), "--db", self.store.path,
+                   "--files-dir", self.store.files_dir, "--poll-interval", str(self.poll_interval),
+                   "--parent", str(os.getpid())]
+        for kind, spec in self.handlers.items():
+            command += ["--handler", f"{kind}={spec}"]
+        env = dict(os.environ)
+        # Handler modules are imported the way this process imports them
+        env["PYTHONPATH"] = os.pathsep.join([*self.extra_paths, *filter(None, sys.path)])
+        return subprocess.Popen(command, env=env, stdin=subprocess.DEVNULL)
+
+    def start(self):
+        """Start the worker processes and a thread that replaces any that die"""
+        with self._lock:
+            if self._processes:
+                return
+            self._stopping.clear()
+            self.store.fail_orphans(_pid_alive)
+            self._processes = [self._spawn() for _ in range(self.workers)]
+            self._monitor = threading.Thread(target=self._watch, name="job-monitor", daemon=True)
+            self._monitor.start()
+
+    def _watch(self):
+        while not self._stopping.wait(max(self.poll_interval, 1.0)):
+            with self._lock:
+                for i, process in enumerate(self._processes):
+                    if process.poll() is not None and not self._stopping.is_set():
+                        print(f"⚠️ Warning: Job worker {process.pid} exited with {process.returncode}, restarting")
+                        self.store.fail_orphans(_pid_alive)
+                        self._processes[i] = self._spawn()
+            self.store.purge(self.retention, self.max_jobs)
+
+    def stop(self, timeout=10.0):
+        """Ask workers to stop; a running job is put back in the queue for the next worker"""
+        self._stopping.set()
+        with self._lock:
+            processes, self._processes = self._processes, []
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        if self._monitor:
+            self._monitor.join()
+            self._monitor = None
+
+    def restart(self):
+        """Reopen the store and start workers in a freshly forked process"""
+        self.store = JobStore(self.store.path, self.store.files_dir)
+        self.start()
+
+    def alive(self):
+        with self._lock:
+            return sum(process.poll() is None for process in self._processes)
+
+    def job_dir(self, job_id):
+        return self.store.job_dir(job_id)
+
+    def submit(self, kind, params=None, job_id=None, token=None):
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        self.store.purge(self.retention, self.max_jobs)
+        return self.store.submit(kind, params or {}, job_id, token)
+
+    def check_token(self, job_id, token):
+        return self.store.check_token(job_id, token)
+
+    def get(self, job_id, with_result=False):
+        return self.store.get(job_id, with_result)
+
+    def list(self, status=None, limit=50):
+        return self.store.list(status, limit)
+
+    def cancel(self, job_id):
+        return self.store.cancel(job_id)
+
+    def delete(self, job_id):
+        self.store.delete(job_id)
+
+    def stats(self):
+        return {"workers": self.alive(), "jobs": self.store.counts()}
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="Job store SQLite file")
+    parser.add_argument("--files-dir", help="Where job files live (default: files/ next to the store)")
+    parser.add_argument("--handler", action="append", default=[], metavar="KIND=MODULE:FUNCTION")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--parent", type=int, help="Exit when this process is no longer our parent")
+    args = parser.parse_args(argv)
+
+    handlers = dict(spec.split("=", 1) for spec in args.handler)
+    run_worker(args.db, handlers, args.poll_interval, args.files_dir, args.parent)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+import hashlib
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class ModelVersion:
+    """One loaded model: its inference backend, its own micro-batcher and serving stats"""
+
+    def __init__(self, name, path, model, batcher_factory, on_batch=None, latency_window=1024):
+        self.name = name
+        self.path = path
+        self.model = model
+        self.loaded_at = time.time()
+        # Changes whenever the file does, so a reloaded version never reuses cached predictions,
+        # while workers that loaded the same file still share their cache entries
+        try:
+            stamp = os.stat(path).st_mtime_ns
+        except OSError:
+            stamp = int(self.loaded_at * 1e9)
+        self.cache_prefix = f"{name}@{stamp}:"
+        self.batcher_factory = batcher_factory
+        self.on_batch = on_batch
+        self.batcher = None
+        self.requests = 0
+        self.batches = 0
+        self.inflight = 0
+        self.class_counts = {}
+        self._latencies = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.batcher = self.batcher_factory(self._forward)
+
+    def stop(self):
+        if self.batcher:
+            self.batcher.close()
+
+    def _forward(self, batch):
+        start = time.perf_counter()
+        scores = self.model.predict(batch)
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self.batches += 1
+            self._latencies.append(seconds * 1000.0)
+        if self.on_batch:
+            self.on_batch(self.name, len(batch), seconds)
+        return scores
+
+    def predict(self, batch):
+        """Score a (N, 48, 48, 1) batch through this version's micro-batcher"""
+        return self.batcher.predict(batch)
+
+    def record(self, scores):
+        """Count one served prediction towards the class distribution"""
+        top = int(np.argmax(scores))
+        with self._lock:
+            self.requests += 1
+            self.class_counts[top] = self.class_counts.get(top, 0) + 1
+
+    def stats(self, class_names=None):
+        with self._lock:
+            latencies = np.asarray(self._latencies)
+            counts = dict(self.class_counts)
+            requests, batches = self.requests, self.batches
+        total = sum(counts.values())
+        distribution = {
+            (class_names[i].lower() if class_names else str(i)): round(count / total, 4)
+            for i, count in sorted(counts.items())
+        } if total else {}
+        return {
+            "path": self.path,
+            "loaded_at": self.loaded_at,
+            "requests": requests,
+            "batches": batches,
+            "inference_p50_ms": round(float(np.percentile(latencies, 50)), 3) if latencies.size else None,
+            "inference_p95_ms": round(float(np.percentile(latencies, 95)), 3) if latencies.size else None,
+            "distribution": distribution,
+        }
+
+
+class ModelRegistry:
+    """
+    Named, independently loaded model versions with one active model and an
+    optional candidate that receives a percentage of traffic.
+
+    Requests take a version with use(), which pins it until the request is done.
+    promote() and set_candidate() only swap references under a lock, so a swap
+    never interrupts a request that already picked the old version. A version
+    that is replaced or unloaded is stopped once its in-flight requests finish.
+
+    The registry does not load files itself. loader(path) returns a warmed-up
+    InferenceBackend, and batcher_factory(predict_fn) returns a MicroBatcher.
+    """
+
+    def __init__(self, loader, batcher_factory, class_names=None, on_batch=None):
+        self.loader = loader
+        self.batcher_factory = batcher_factory
+        self.class_names = class_names
+        self.on_batch = on_batch
+        self.versions = {}
+        self.active = None
+        self.candidate = None
+        self.candidate_percent = 0.0
+        self._lock = threading.Lock()
+
+    def load(self, name, path, activate=False):
+        """Load a version (replacing any version with the same name) and optionally make it active"""
+        # Loading and warm-up run outside the lock; serving continues meanwhile
+        version = ModelVersion(name, path, self.loader(path), self.batcher_factory, self.on_batch)
+        version.start()
+        with self._lock:
+            replaced = self.versions.get(name)
+            self.versions[name] = version
+            if activate or self.active is None or self.active is replaced:
+                self.active = version
+            if self.candidate is replaced and replaced is not None:
+                self.candidate = version
+        if replaced:
+            self._retire(replaced)
+        return version
+
+    def promote(self, name):
+        """Atomically make a loaded version the active one; a promoted candidate stops being the candidate"""
+        with self._lock:
+            version = self._get(name)
+            self.active = version
+            if self.candidate is version:
+                self.candidate = None
+                self.candidate_percent = 0.0
+        return version
+
+    def set_candidate(self, name, percent):
+        """Route `percent` of traffic to a loaded version; name=None stops the experiment"""
+        if not 0 <= percent <= 100:
+            raise ValueError("percent must be between 0 and 100")
+        with self._lock:
+            if name is None:
+                self.candidate, self.candidate_percent = None, 0.0
+                return None
+            version = self._get(name)
+            if version is self.active:
+                raise ValueError(f"Model '{name}' is already active")
+            self.candidate, self.candidate_percent = version, float(percent)
+            return version
+
+    def unload(self, name):
+        """Drop a version that is neither active nor the candidate"""
+        with self._lock:
+            version = self._get(name)
+            if version is self.active or version is self.candidate:
+                raise ValueError(f"Model '{name}' is in use; promote or clear the candidate first")
+            del self.versions[name]
+        self._retire(version)
+
+    def _get(self, name):
+        if name not in self.versions:
+            raise KeyError(f"Unknown model '{name}'")
+        return self.versions[name]
+
+    def _pick(self, key):
+        if self.candidate is None or self.candidate_percent <= 0:
+            return self.active
+        if key:
+            # Sticky: the same session always lands on the same side of the split
+            bucket = int.from_bytes(hashlib.blake2b(str(key).encode(), digest_size=4).digest(), "big") % 10000 / 100.0
+        else:
+            bucket = random.uniform(0, 100)
+        return self.candidate if bucket < self.candidate_percent else self.active
+
+    @contextmanager
+    def use(self, key=None):
+        """Yield the version that should serve this request (None before anything is loaded)"""
+        with self._lock:
+            version = self._pick(key)
+            if version is not None:
+                version.inflight += 1
+        try:
+            yield version
+        finally:
+            if version is not None:
+                with self._lock:
+                    version.inflight -= 1
+
+    def _retire(self, version, timeout=30.0):
+        """Stop a version's batcher once no request holds it any more"""
+        def drain():
+            deadline = time.monotonic() + timeout
+            while version.inflight > 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            version.stop()
+
+        threading.Thread(target=drain, name=f"retire-{version.name}", daemon=True).start()
+
+    def stop(self):
+        """Stop every version's batcher thread (e.g. before forking)"""
+        for version in list(self.versions.values()):
+            version.stop()
+
+    def restart(self):
+        """Start fresh batcher threads for every version (e.g. in a forked worker)"""
+        for version in list(self.versions.values()):
+            version.start()
+
+    def queue_depth(self):
+        return sum(v.batcher.qsize() for v in list(self.versions.values()) if v.batcher)
+
+    def stats(self):
+        with self._lock:
+            versions = dict(self.versions)
+            active = self.active.name if self.active else None
+            candidate = self.candidate.name if self.candidate else None
+            percent = self.candidate_percent
+        return {
+            "active": active,
+            "candidate": candidate,
+            "candidate_percent": percent,
+            "models": {name: v.stats(self.class_names) for name, v in versions.items()},
+        }
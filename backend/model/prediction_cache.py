@@ -0,0 +1,139 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def tensor_key(tensor, bits=8):
+    """
+    Hash a preprocessed [0, 1] input tensor.
+
+    The tensor is quantized back to `bits` bits per pixel before hashing, so
+    re-encodes of the same picture that normalize to (almost) the same 48x48
+    input share a key. bits=8 matches exact pixel values.
+    """
+    pixels = np.rint(np.asarray(tensor, dtype=np.float32) * 255.0).astype(np.uint8)
+    if bits < 8:
+        pixels >>= 8 - bits
+    return hashlib.blake2b(pixels.tobytes(), digest_size=16).hexdigest()
+
+
+class SqlitePredictionStore:
+    """
+    File-backed store so several worker processes on one host share cached predictions.
+
+    Uses SQLite in WAL mode; each entry keeps the raw float32 scores and an absolute expiry.
+    """
+
+    def __init__(self, path, max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, scores BLOB, expires REAL)"
+        )
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT scores FROM predictions WHERE key = ? AND expires > ?", (key, time.time())
+            ).fetchone()
+        return np.frombuffer(row[0], dtype=np.float32).copy() if row else None
+
+    def put(self, key, scores, ttl):
+        blob = np.asarray(scores, dtype=np.float32).tobytes()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO predictions (key, scores, expires) VALUES (?, ?, ?)",
+                (key, blob, time.time() + ttl),
+            )
+            self._writes += 1
+            # Trim expired and overflow rows every so often rather than on every write
+            if self._writes % 1000 == 0:
+                self._conn.execute("DELETE FROM predictions WHERE expires <= ?", (time.time(),))
+                self._conn.execute(
+                    "DELETE FROM predictions WHERE key IN (SELECT key FROM predictions "
+                    "ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PredictionCache:
+    """
+    In-process LRU cache of model outputs with TTL expiry and hit/miss counters.
+
+    An optional shared store (e.g. SqlitePredictionStore) is consulted on local
+    misses and written through on puts, so identical frames hit across workers.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300.0, bits=8, store=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.bits = bits
+        self.store = store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, tensor):
+        return tensor_key(tensor, self.bits)
+
+    def get(self, key):
+        """Return cached scores for a key, or None on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, scores = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return scores
+                del self._entries[key]
+
+        scores = self.store.get(key) if self.store else None
+        with self._lock:
+            if scores is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._insert(key, scores, now)
+        return scores
+
+    def put(self, key, scores):
+        scores = np.array(scores, dtype=np.float32)
+        with self._lock:
+            self._insert(key, scores, time.monotonic())
+        if self.store:
+            self.store.put(key, scores, self.ttl)
+
+    def _insert(self, key, scores, now):
+        self._entries[key] = (now + self.ttl, scores)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
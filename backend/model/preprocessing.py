@@ -0,0 +1,75 @@
+import threading
+from contextlib import contextmanager
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+MODEL_SIZE = (48, 48)
+
+# JPEG DCT scaling only goes down to 1/8, so ask for a little headroom over the
+# model size and let the final resize do the rest
+DRAFT_SIZE = (MODEL_SIZE[0] * 2, MODEL_SIZE[1] * 2)
+
+
+def decode_grayscale(source):
+    """
+    Open an uploaded image (file object or bytes) as grayscale.
+
+    JPEGs are decoded in draft mode: libjpeg converts to luminance and downscales
+    by 1/2, 1/4 or 1/8 during the IDCT, so a 1280x720 webcam frame is never
+    materialised at full resolution or in RGB.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = BytesIO(source)
+    image = Image.open(source)
+    if image.format == "JPEG":
+        image.draft("L", DRAFT_SIZE)
+    return image.convert("L")
+
+
+def preprocess_into(image, out):
+    """Resize a PIL image to 48x48 grayscale and write it, scaled to [0, 1], into a (48, 48, 1) float32 view"""
+    if image.mode != "L":
+        image = image.convert("L")
+    if image.size != MODEL_SIZE:
+        image = image.resize(MODEL_SIZE)
+    np.divide(np.asarray(image, dtype=np.uint8), np.float32(255.0), out=out[..., 0])
+    return out
+
+
+def preprocess_batch(images, out=None):
+    """Fill a (N, 48, 48, 1) float32 array in place from a list of PIL images"""
+    if out is None:
+        out = np.empty((len(images), *MODEL_SIZE, 1), dtype=np.float32)
+    for i, image in enumerate(images):
+        preprocess_into(image, out[i])
+    return out
+
+
+class BufferPool:
+    """
+    Recycle preallocated (batch_size, 48, 48, 1) float32 input buffers.
+
+    Buffers are handed out with `borrow()` and returned when the with-block
+    exits; when the pool is empty a fresh buffer is allocated instead of waiting.
+    """
+
+    def __init__(self, batch_size=1, capacity=16):
+        self.shape = (batch_size, *MODEL_SIZE, 1)
+        self.capacity = capacity
+        self._free = [np.empty(self.shape, dtype=np.float32) for _ in range(capacity)]
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def borrow(self):
+        with self._lock:
+            buffer = self._free.pop() if self._free else None
+        if buffer is None:
+            buffer = np.empty(self.shape, dtype=np.float32)
+        try:
+            yield buffer
+        finally:
+            with self._lock:
+                if len(self._free) < self.capacity:
+                    self._free.append(buffer)
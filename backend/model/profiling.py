@@ -0,0 +1,261 @@
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+FORMATS = ("speedscope", "collapsed")
+
+
+def frame_label(code):
+    """Flame-graph label for a code object: function (file:first line)"""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _idle(frame):
+    """A helper thread parked waiting for work, which would only clutter the profile"""
+    code = frame.f_code
+    return code.co_name == "wait" and os.path.basename(code.co_filename) == "threading.py"
+
+
+class Profile:
+    """
+    Stack samples of one request: its own thread plus any `extra_threads`
+    ({ident: name}, e.g. the micro-batcher running its forward pass) while
+    they are busy. Extra threads work for every request, not just this one.
+
+    Samples are kept in time order with consecutive identical stacks merged,
+    so memory grows with how often the stack changes, not with duration.
+    """
+
+    def __init__(self, name, thread_id, extra_threads=None, max_depth=128):
+        self.name = name
+        self.request_thread = thread_id
+        self.threads = {thread_id: "request", **(extra_threads or {})}
+        self.max_depth = max_depth
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.ended = None
+        self.samples = 0
+        # [stack tuple, sample count, milliseconds]
+        self._runs = []
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def add(self, frames, now):
+        with self._lock:
+            self._add(frames, now)
+
+    def _add(self, frames, now):
+        for ident, thread_name in self.threads.items():
+            frame = frames.get(ident)
+            if frame is None or (ident != self.request_thread and _idle(frame)):
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(thread_name)
+            stack = tuple(reversed(stack))
+            elapsed = (now - self._last.get(ident, self.started)) * 1000.0
+            self._last[ident] = now
+            self.samples += 1
+            if self._runs and self._runs[-1][0] == stack:
+                self._runs[-1][1] += 1
+                self._runs[-1][2] += elapsed
+            else:
+                self._runs.append([stack, 1, elapsed])
+
+    @property
+    def duration_ms(self):
+        return ((self.ended or time.perf_counter()) - self.started) * 1000.0
+
+    def collapsed(self):
+        """Brendan Gregg's collapsed-stack format ("root;child;leaf count"), for flamegraph.pl and speedscope"""
+        counts = {}
+        with self._lock:
+            runs = list(self._runs)
+        for stack, count, _ in runs:
+            counts[stack] = counts.get(stack, 0) + count
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(counts.items()))
+
+    def speedscope(self):
+        """speedscope.app "sampled" profile, weighted by wall time between samples"""
+        frames, index = [], {}
+        samples, weights = [], []
+        with self._lock:
+            runs = list(self._runs)
+        for stack, _, elapsed in runs:
+            ids = []
+            for label in stack:
+                if label not in index:
+                    index[label] = len(frames)
+                    frames.append({"name": label})
+                ids.append(index[label])
+            samples.append(ids)
+            weights.append(round(elapsed, 3))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "activeProfileIndex": 0,
+            "exporter": "emotion-backend profiling",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(self.duration_ms, 3),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+class StackSampler:
+    """One background thread that samples the stacks of every active Profile every `interval` seconds"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.ticks = 0
+        self.busy_seconds = 0.0
+        self._profiles = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, profile):
+        with self._lock:
+            self._profiles.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+
+    def remove(self, profile):
+        with self._lock:
+            self._profiles.discard(profile)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._profiles:
+                    # Exit while idle; the next add() starts a new thread
+                    self._thread = None
+                    return
+                profiles = list(self._profiles)
+            start = time.perf_counter()
+            frames = sys._current_frames()
+            for profile in profiles:
+                profile.add(frames, start)
+            del frames
+            self.ticks += 1
+            self.busy_seconds += time.perf_counter() - start
+
+
+class Profiler:
+    """
+    Decides which requests to profile and writes their profiles to `directory`.
+
+    A request is profiled when it asks to be (the caller checks authorization),
+    while a window opened with enable_window() is running, or at random with
+    probability `sample_rate`. At most `max_active` requests are profiled at
+    once; the rest run unprofiled. Only the newest `max_files` profiles younger
+    than `retention` seconds are kept.
+    """
+
+    def __init__(self, directory, interval=0.005, sample_rate=0.0, max_active=2, max_files=100,
+                 retention=86400.0, output_format="speedscope", extra_threads=("micro-batcher",)):
+        if output_format not in FORMATS:
+            raise ValueError(f"Unknown profile format '{output_format}', expected one of {FORMATS}")
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_active = max_active
+        self.max_files = max_files
+        self.retention = retention
+        self.format = output_format
+        self.extra_threads = extra_threads
+        self.sampler = StackSampler(interval)
+        self.profiled = 0
+        self.skipped = 0
+        self._window_end = 0.0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def enable_window(self, seconds):
+        """Profile every request (up to max_active at a time) for the next `seconds`"""
+        self._window_end = time.monotonic() + max(0.0, seconds)
+
+    def window_remaining(self):
+        return max(0.0, self._window_end - time.monotonic())
+
+    def start(self, label, requested=False):
+        """Start profiling the calling thread if this request is selected; returns a Profile or None"""
+        if not (requested or self.window_remaining() > 0 or (self.sample_rate and random.random() < self.sample_rate)):
+            return None
+        with self._lock:
+            if self._active >= self.max_active:
+                self.skipped += 1
+                return None
+            self._active += 1
+            self.profiled += 1
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        name = f"{stamp}-{re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_')}-{os.urandom(3).hex()}"
+        extra = {thread.ident: thread.name for thread in threading.enumerate() if thread.name in self.extra_threads}
+        profile = Profile(name, threading.get_ident(), extra)
+        self.sampler.add(profile)
+        return profile
+
+    def stop(self, profile):
+        """Stop sampling, write the profile and return its path (None if it was already stopped)"""
+        if profile.ended is not None:
+            return None
+        profile.ended = time.perf_counter()
+        try:
+            self.sampler.remove(profile)
+        finally:
+            # Free the slot before writing, so a failed write cannot leak it
+            with self._lock:
+                self._active -= 1
+        os.makedirs(self.directory, exist_ok=True)
+        if self.format == "collapsed":
+            path = os.path.join(self.directory, profile.name + ".folded")
+            content = profile.collapsed()
+        else:
+            path = os.path.join(self.directory, profile.name + ".speedscope.json")
+            content = json.dumps(profile.speedscope())
+        with open(path, "w") as f:
+            f.write(content)
+        self.purge()
+        return path
+
+    def files(self):
+        """Saved profiles, newest first, as (name, bytes, mtime)"""
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.is_file()]
+        except FileNotFoundError:
+            return []
+        entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        return [(entry.name, entry.stat().st_size, entry.stat().st_mtime) for entry in entries]
+
+    def purge(self):
+        cutoff = time.time() - self.retention
+        for i, (name, _, mtime) in enumerate(self.files()):
+            if i >= self.max_files or mtime < cutoff:
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        ticks = self.sampler.ticks
+        return {
+            "window_remaining": round(self.window_remaining(), 1),
+            "sample_rate": self.sample_rate,
+            "active": self._active,
+            "profiled": self.profiled,
+            "skipped": self.skipped,
+            "interval_ms": self.sampler.interval * 1000.0,
+            "avg_tick_ms": round(self.sampler.busy_seconds / ticks * 1000.0, 4) if ticks else None,
+        }
@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+"""
+Post-training int8 quantization of the Keras .h5 emotion model, with a report
+comparing the int8 model against the float32 one.
+
+Usage:
+    python quantize_model.py models/model.h5 --calibration data/faces --report int8_report.json
+
+The calibration set is a directory of face images (searched recursively) or a
+.npy/.npz array of preprocessed (N, 48, 48, 1) inputs in [0, 1]. Images are
+preprocessed exactly like /predict uploads. If images sit in sub-directories
+named after the classes (angry/, happy/, ... as in FER2013), the report also
+includes accuracy against those labels.
+
+The quantized model is written next to the source as <name>_int8.tflite, which
+is where INFERENCE_BACKEND=tflite_int8 looks for it. It can also be loaded as an
+A/B candidate with MODEL_CANDIDATE_PATH=models/model_int8.tflite.
+
+The report covers top-1 agreement with the float model, per-class confidence
+drift, latency at batch sizes 1 and 32, and model size. By default it is measured
+on the calibration set; pass --eval for a held-out set.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp")
+
+
+def load_image_set(path, class_names, preprocess, limit=None):
+    """
+    Load a calibration / evaluation set.
+
+    Returns (inputs, labels): a (N, 48, 48, 1) float32 array, and an int array of
+    class indices taken from the parent directory names, or None when the images
+    are not sorted into class directories.
+    """
+    if path.endswith((".npy", ".npz")):
+        loaded = np.load(path)
+        labels = None
+        if isinstance(loaded, np.lib.npyio.NpzFile):
+            labels = loaded["labels"] if "labels" in loaded.files else None
+            loaded = loaded["images"]
+        inputs = np.asarray(loaded, dtype=np.float32).reshape(-1, 48, 48, 1)
+        if limit:
+            inputs = inputs[:limit]
+            labels = labels[:limit] if labels is not None else None
+        return inputs, labels
+
+    from PIL import Image
+
+    names = [name.lower() for name in class_names]
+    files = []
+    for root, _, filenames in os.walk(path):
+        for filename in sorted(filenames):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                files.append(os.path.join(root, filename))
+    files.sort()
+    if limit:
+        # Spread a limited sample over every class directory instead of taking the first one
+        files = [files[i] for i in np.linspace(0, len(files) - 1, min(limit, len(files)), dtype=int)]
+    if not files:
+        raise ValueError(f"No images found under {path}")
+
+    images = []
+    labels = []
+    for file_path in files:
+        with Image.open(file_path) as image:
+            images.append(image.convert("L"))
+        parent = os.path.basename(os.path.dirname(file_path)).lower()
+        labels.append(names.index(parent) if parent in names else -1)
+    labels = np.asarray(labels)
+    return preprocess(images), (labels if (labels >= 0).all() else None)
+
+
+def quantize(model, calibration, out_path, steps=None):
+    """
+    Write a fully integer-quantized (int8 weights, activations, input and output)
+    TFLite model for a loaded Keras model, calibrated on `calibration`.
+    """
+    import tensorflow as tf
+
+    steps = min(steps or len(calibration), len(calibration))
+
+    def representative_dataset():
+        for i in range(steps):
+            yield [calibration[i:i + 1]]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    with open(out_path, "wb") as f:
+        f.write(converter.convert())
+    return out_path
+
+
+def compare_predictions(reference, candidate, class_names, labels=None):
+    """
+    Agreement and confidence drift of candidate scores against reference scores,
+    both (N, classes) arrays of softmax outputs.
+    """
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    ref_top = reference.argmax(axis=1)
+    cand_top = candidate.argmax(axis=1)
+    drift = candidate - reference
+
+    per_class = {}
+    for i, name in enumerate(class_names):
+        predicted = ref_top == i
+        per_class[name.lower()] = {
+            # Float model's top-1 count for this class and how often int8 agrees on those inputs
+            "count": int(predicted.sum()),
+            "agreement": round(float((cand_top[predicted] == i).mean()), 4) if predicted.any() else None,
+            # Score drift of this class over every input, in percentage points
+            "mean_drift": round(float(drift[:, i].mean() * 100), 3),
+            "mean_abs_drift": round(float(np.abs(drift[:, i]).mean() * 100), 3),
+            "max_abs_drift": round(float(np.abs(drift[:, i]).max() * 100), 3),
+        }
+
+    rows = np.arange(len(reference))
+    report = {
+        "samples": int(len(reference)),
+        "top1_agreement": round(float((ref_top == cand_top).mean()), 4),
+        # Change in the confidence /predict reports for the float model's top class
+        "top1_confidence_drift": round(float(drift[rows, ref_top].mean() * 100), 3),
+        "max_abs_drift": round(float(np.abs(drift).max() * 100), 3),
+        "per_class": per_class,
+    }
+    if labels is not None:
+        report["accuracy"] = {
+            "float32": round(float((ref_top == labels).mean()), 4),
+            "int8": round(float((cand_top == labels).mean()), 4),
+        }
+    return report
+
+
+def measure_latency(backend, batch_sizes=(1, 32), repeats=50):
+    """Median and p95 wall time per forward pass for each batch size, in milliseconds"""
+    results = {}
+    for size in batch_sizes:
+        batch = np.random.RandomState(size).rand(size, 48, 48, 1).astype(np.float32)
+        backend.predict(batch)
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            backend.predict(batch)
+            timings.append((time.perf_counter() - start) * 1000.0)
+        p50 = float(np.percentile(timings, 50))
+        results[f"batch_{size}"] = {
+            "p50_ms": round(p50, 3),
+            "p95_ms": round(float(np.percentile(timings, 95)), 3),
+            "images_per_s": round(size / p50 * 1000.0, 1),
+        }
+    return results
+
+
+def build_report(h5_path, int8_path, calibration, evaluation, labels, class_names, repeats=50):
+    """Compare the int8 model against the float32 Keras model and its float32 TFLite export"""
+    from convert_models import convert_to_tflite
+    from inference import CompiledModel, TFLiteBackend
+
+    keras_model = CompiledModel(h5_path)
+    int8_model = TFLiteBackend(int8_path)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        float_path = convert_to_tflite(keras_model.model, os.path.join(tmp_dir, "float32.tflite"))
+        float_tflite = TFLiteBackend(float_path)
+        float_tflite_bytes = os.path.getsize(float_path)
+
+        report = {
+            "model": h5_path,
+            "quantized_model": int8_path,
+            "calibration_samples": int(len(calibration)),
+            "eval_samples": int(len(evaluation)),
+            **compare_predictions(keras_model.predict(evaluation), int8_model.predict(evaluation), class_names, labels),
+            "latency": {
+                "keras_float32": measure_latency(keras_model, repeats=repeats),
+                "tflite_float32": measure_latency(float_tflite, repeats=repeats),
+                "tflite_int8": measure_latency(int8_model, repeats=repeats),
+            },
+            "size_bytes": {
+                "keras_float32": os.path.getsize(h5_path),
+                "tflite_float32": float_tflite_bytes,
+                "tflite_int8": os.path.getsize(int8_path),
+            },
+        }
+    return report
+
+
+def print_report(report):
+    print(f"\nint8 vs float32 on {report['eval_samples']} samples")
+    print(f"  top-1 agreement:       {report['top1_agreement'] * 100:.2f}%")
+    print(f"  top-1 confidence drift: {report['top1_confidence_drift']:+.2f} pp (max |drift| {report['max_abs_drift']:.2f} pp)")
+    if "accuracy" in report:
+        print(f"  accuracy float32/int8: {report['accuracy']['float32'] * 100:.2f}% / {report['accuracy']['int8'] * 100:.2f}%")
+    print(f"\n  {'class':<10}{'count':>7}{'agree':>9}{'drift':>9}{'|drift|':>9}")
+    for name, row in report["per_class"].items():
+        agreement = f"{row['agreement'] * 100:.1f}%" if row["agreement"] is not None else "-"
+        print(f"  {name:<10}{row['count']:>7}{agreement:>9}{row['mean_drift']:>+9.2f}{row['mean_abs_drift']:>9.2f}")
+    print(f"\n  {'model':<16}{'size':>10}{'b1 p50':>10}{'b32 p50':>10}{'b32 img/s':>11}")
+    for name, latency in report["latency"].items():
+        size = report["size_bytes"][name] / 1024 / 1024
+        print(f"  {name:<16}{size:>8.2f}MB{latency['batch_1']['p50_ms']:>8.2f}ms"
+              f"{latency['batch_32']['p50_ms']:>8.2f}ms{latency['batch_32']['images_per_s']:>11.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model", help="Keras .h5 model to quantize")
+    parser.add_argument("--calibration", required=True, help="Directory of face images or a .npy/.npz array")
+    parser.add_argument("--calibration-size", type=int, default=500, help="Max calibration samples")
+    parser.add_argument("--eval", help="Held-out evaluation set (default: the calibration set)")
+    parser.add_argument("--eval-size", type=int, default=2000, help="Max evaluation samples")
+    parser.add_argument("--out", help="Output path (default: <model>_int8.tflite next to the source)")
+    parser.add_argument("--report", help="Also write the report as JSON to this file")
+    parser.add_argument("--repeats", type=int, default=50, help="Timed forward passes per latency measurement")
+    args = parser.parse_args(argv)
+
+    # Same class order and preprocessing as the running app
+    from emotions import CLASS_NAMES
+    from inference import backend_model_path
+    from preprocessing import preprocess_batch
+    import tensorflow as tf
+
+    calibration, labels = load_image_set(args.calibration, CLASS_NAMES, preprocess_batch, args.calibration_size)
+    if args.eval:
+        evaluation, labels = load_image_set(args.eval, CLASS_NAMES, preprocess_batch, args.eval_size)
+    else:
+        evaluation = calibration
+
+    out_path = args.out or backend_model_path(args.model, "tflite_int8")
+    model = tf.keras.models.load_model(args.model, compile=False)
+    quantize(model, calibration, out_path)
+    print(f"✅ {args.model} -> {out_path} (calibrated on {len(calibration)} samples)")
+
+    report = build_report(args.model, out_path, calibration, evaluation, labels, CLASS_NAMES, args.repeats)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
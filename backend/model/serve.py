@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+"""
+Production entry point: a pre-forking multi-worker server for app.py.
+
+    python serve.py --workers 4 --port 5000
+
+The parent binds the listening socket and, for the tflite, tflite_int8 and onnx
+backends, imports app.py (loading and warming the model) before forking, so every
+worker shares the weights copy-on-write and starts serving immediately.
+TensorFlow's runtime does not survive fork(), so with the keras backend each
+worker imports the app and loads its own model after forking instead.
+
+Each worker gets cores / workers intra-op threads for inference (override with
+--threads) so N workers don't oversubscribe the CPU, and as many background job
+worker processes unless JOB_WORKERS is set.
+
+Signals (to the parent):
+    SIGTERM / SIGINT  stop accepting, let in-flight requests finish, exit
+    SIGHUP            graceful rolling restart of the workers, one at a time; they
+                      are forked from this process, so they keep its environment
+                      and, when preloaded, its model (restart to change MODEL_PATH)
+
+Caches that must agree across workers go through SQLite files under --state-dir
+(chat histories, frame_ids, predictions, background jobs, emotion timelines) unless
+CHAT_SESSION_DB, FRAME_STORE_PATH, PREDICTION_CACHE_PATH, JOBS_DIR or TIMELINE_DIR are
+already set. /metrics is reported per worker.
+"""
+
+import argparse
+import os
+import select
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+FORK_SAFE_BACKENDS = ("tflite", "tflite_int8", "onnx")
+
+
+def configure_environment(workers, threads, state_dir):
+    """Set per-worker thread counts and shared state paths before the app is imported"""
+    os.environ["SERVE_WORKERS"] = str(workers)
+    for name in ("INFERENCE_THREADS", "OMP_NUM_THREADS", "TF_NUM_INTRAOP_THREADS", "OPENCV_FOR_THREADS_NUM"):
+        os.environ.setdefault(name, str(threads))
+    os.environ.setdefault("TF_NUM_INTEROP_THREADS", "1")
+    # Background job workers are only started by the server, never by a plain import of app.py
+    os.environ.setdefault("JOB_WORKERS", str(max(1, (os.cpu_count() or 1) // workers)))
+    if workers > 1:
+        os.makedirs(state_dir, exist_ok=True)
+        os.environ.setdefault("CHAT_SESSION_DB", os.path.join(state_dir, "sessions.db"))
+        os.environ.setdefault("FRAME_STORE_PATH", os.path.join(state_dir, "frames.db"))
+        os.environ.setdefault("PREDICTION_CACHE_PATH", os.path.join(state_dir, "predictions.db"))
+        os.environ.setdefault("JOBS_DIR", os.path.join(state_dir, "jobs"))
+        os.environ.setdefault("TIMELINE_DIR", os.path.join(state_dir, "timelines"))
+
+
+class InFlight:
+    """WSGI middleware counting requests that have not finished streaming their response"""
+
+    def __init__(self, app):
+        self.app = app
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _done(self):
+        with self._lock:
+            self.count -= 1
+
+    def __call__(self, environ, start_response):
+        from werkzeug.wsgi import ClosingIterator
+
+        with self._lock:
+            self.count += 1
+        try:
+            return ClosingIterator(self.app(environ, start_response), [self._done])
+        except BaseException:
+            self._done()
+            raise
+
+
+def run_worker(listener, preloaded, ready_fd, args):
+    """Body of a forked worker; never returns"""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    # Drop the parent's handlers; SIGTERM during a slow model load just kills the worker
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    if preloaded is not None:
+        preloaded.after_fork()
+        app_module = preloaded
+    else:
+        import app as app_module
+        # Only report ready once this worker's own model has loaded
+        app_module.startup.wait(args.startup_timeout)
+
+    class RequestHandler(WSGIRequestHandler):
+        def log_request(self, *log_args, **kwargs):
+            if args.access_log:
+                super().log_request(*log_args, **kwargs)
+
+    wsgi = InFlight(app_module.app)
+    server = make_server(
+        args.host, args.port, wsgi, threaded=True, request_handler=RequestHandler, fd=listener.fileno()
+    )
+
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever to return, so it can't run on this thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    os.write(ready_fd, b"1")
+    os.close(ready_fd)
+    server.serve_forever()
+
+    deadline = time.monotonic() + args.graceful_timeout
+    while wsgi.count > 0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    os._exit(0)
+
+
+class Arbiter:
+    """Keeps --workers children alive, restarts them on SIGHUP and drains them on SIGTERM"""
+
+    def __init__(self, listener, preloaded, args):
+        self.listener = listener
+        self.preloaded = preloaded
+        self.args = args
+        self.workers = {}
+        self._stopping = False
+        self._reload = False
+
+    def spawn(self):
+        """Fork one worker and wait until it is accepting connections"""
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            try:
+                run_worker(self.listener, self.preloaded, write_fd, self.args)
+            finally:
+                os._exit(1)
+        os.close(write_fd)
+        self.workers[pid] = time.monotonic()
+
+        # Keras workers load the model after forking, so allow for that
+        ready, _, _ = select.select([read_fd], [], [], self.args.startup_timeout)
+        started = bool(ready) and os.read(read_fd, 1) == b"1"
+        os.close(read_fd)
+        if not started:
+            self.kill(pid)
+            raise RuntimeError(f"Worker {pid} failed to start")
+        return pid
+
+    def kill(self, pid, sig=signal.SIGKILL):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def reap(self):
+        """Collect exited workers; returns their pids"""
+        exited = []
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            self.workers.pop(pid, None)
+            exited.append(pid)
+        return exited
+
+    def wait_for(self, pids, timeout):
+        deadline = time.monotonic() + timeout
+        while any(pid in self.workers for pid in pids) and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        for pid in pids:
+            if pid in self.workers:
+                self.kill(pid)
+        self.reap()
+
+    def rolling_restart(self):
+        """Replace each worker with a fresh one, starting the new one before draining the old"""
+        for pid in list(self.workers):
+            self.spawn()
+            self.kill(pid, signal.SIGTERM)
+            self.wait_for([pid], self.args.graceful_timeout + 5)
+        print(f"🔄 Restarted {len(self.workers)} workers", flush=True)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, "_stopping", True))
+        signal.signal(signal.SIGINT, lambda *_: setattr(self, "_stopping", True))
+        signal.signal(signal.SIGHUP, lambda *_: setattr(self, "_reload", True))
+
+        for _ in range(self.args.workers):
+            self.spawn()
+        print(f"✅ Serving on http://{self.args.host}:{self.args.port} with {len(self.workers)} workers", flush=True)
+
+        while not self._stopping:
+            if self._reload:
+                self._reload = False
+                self.rolling_restart()
+            for pid in self.reap():
+                if not self._stopping:
+                    print(f"⚠️ Worker {pid} exited unexpectedly, replacing it", flush=True)
+                    self.spawn()
+            time.sleep(0.2)
+
+        pids = list(self.workers)
+        for pid in pids:
+            self.kill(pid, signal.SIGTERM)
+        self.wait_for(pids, self.args.graceful_timeout + 5)
+        self.listener.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "5000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SERVE_WORKERS", "0")) or os.cpu_count() or 1)
+    parser.add_argument("--threads", type=int, help="Inference threads per worker (default: cores / workers)")
+    parser.add_argument("--graceful-timeout", type=float, default=30, help="Seconds to let in-flight requests finish")
+    parser.add_argument("--startup-timeout", type=float, default=300, help="Seconds a worker may take to start")
+    parser.add_argument("--state-dir", default=os.path.join(tempfile.gettempdir(), "emotion-serve"),
+                        help="Where shared SQLite state lives when running more than one worker")
+    parser.add_argument("--access-log", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    threads = args.threads or max(1, (os.cpu_count() or 1) // args.workers)
+    configure_environment(args.workers, threads, args.state_dir)
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((args.host, args.port))
+    listener.listen(1024)
+    listener.set_inheritable(True)
+
+    preloaded = None
+    backend = os.getenv("INFERENCE_BACKEND", "keras")
+    if backend in FORK_SAFE_BACKENDS:
+        import app as preloaded
+        preloaded.before_fork()
+        if not preloaded.startup.ready:
+            print(f"⚠️ Warning: Starting workers without a ready app: {preloaded.startup.status()}", flush=True)
+    else:
+        print(f"⚠️ {backend} backend is not fork-safe; each worker loads its own model", flush=True)
+
+    Arbiter(listener, preloaded, args).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+from collections import deque
+
+import numpy as np
+from PIL import Image
+
+SIGNATURE_SIZE = (32, 32)
+
+
+def frame_signature(image):
+    """
+    Cheap fingerprint of a grayscale PIL frame for change detection: a 32x32
+    box-filtered thumbnail in [0, 1] with its mean removed, so auto-exposure
+    brightness shifts don't count as motion.
+    """
+    thumb = np.asarray(image.convert("L").resize(SIGNATURE_SIZE, Image.BOX), dtype=np.float32) / 255.0
+    return thumb - thumb.mean()
+
+
+def signature_distance(a, b):
+    """Mean absolute per-pixel difference between two signatures (0 = identical)"""
+    return float(np.abs(a - b).mean())
+
+
+class StreamSmoother:
+    """
+    Per-stream state for live detection.
+
+    changed() compares each frame's signature with the frame that was last sent
+    to the model; below change_threshold the caller reuses last_result instead of
+    running inference. At most max_reuse frames in a row are skipped, so slow
+    drift and stale results still get refreshed.
+
+    smooth() blends each new score vector with the recent ones: an exponential
+    moving average ("ema", weight alpha on the newest frame) or the mean of the
+    last `window` vectors ("window"). "none" passes scores through.
+    """
+
+    METHODS = ("ema", "window", "none")
+
+    def __init__(self, change_threshold=0.01, method="ema", alpha=0.5, window=5, max_reuse=10):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown smoothing method '{method}' (expected one of {', '.join(self.METHODS)})")
+        self.change_threshold = change_threshold
+        self.method = method
+        self.alpha = alpha
+        self.max_reuse = max_reuse
+        self.last_result = None
+        self.inferred = 0
+        self.reused = 0
+        self._reference = None
+        self._pending = None
+        self._reused_in_row = 0
+        self._history = deque(maxlen=max(1, window))
+        self._smoothed = None
+
+    def changed(self, image):
+        """True if the frame needs a model pass; False means reuse last_result"""
+        signature = frame_signature(image)
+        if (
+            self.last_result is not None
+            and self._reference is not None
+            and self._reused_in_row < self.max_reuse
+            and signature_distance(signature, self._reference) < self.change_threshold
+        ):
+            self._reused_in_row += 1
+            self.reused += 1
+            return False
+        self._pending = signature
+        return True
+
+    def smooth(self, scores):
+        """Fold the scores of a freshly inferred frame into the stream and return the smoothed vector"""
+        self._reference, self._pending = self._pending, None
+        self._reused_in_row = 0
+        self.inferred += 1
+
+        scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        if self.method == "ema":
+            self._smoothed = scores if self._smoothed is None else self.alpha * scores + (1 - self.alpha) * self._smoothed
+        elif self.method == "window":
+            self._history.append(scores)
+            self._smoothed = np.mean(self._history, axis=0)
+        else:
+            self._smoothed = scores
+        return self._smoothed
+
+    def stats(self):
+        total = self.inferred + self.reused
+        return {"inferred": self.inferred, "reused": self.reused, "reuse_ratio": self.reused / total if total else 0.0}
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class _Component:
+    __slots__ = ("name", "loader", "required", "state", "error", "seconds", "thread")
+
+    def __init__(self, name, loader, required):
+        self.name = name
+        self.loader = loader
+        self.required = required
+        self.state = PENDING
+        self.error = None
+        self.seconds = None
+        self.thread = None
+
+
+class Startup:
+    """
+    Loads the app's heavy components (model, face detector, chat client) off the
+    import path, each in its own thread so they load in parallel.
+
+    The app is ready once every required component has loaded; optional ones
+    only show up in status(). A loader signals failure by raising.
+    """
+
+    def __init__(self):
+        self._components = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, name, loader, required=True):
+        with self._lock:
+            self._components[name] = _Component(name, loader, required)
+
+    def _run(self, component):
+        start = time.perf_counter()
+        try:
+            component.loader()
+            component.state = READY
+        except Exception as e:
+            component.error = f"{type(e).__name__}: {e}"
+            component.state = FAILED
+            print(f"⚠️ Warning: Startup of {component.name} failed: {component.error}")
+        finally:
+            component.seconds = round(time.perf_counter() - start, 3)
+
+    def start(self, background=True):
+        """Start loading every pending component; with background=False, load them inline in order"""
+        with self._lock:
+            pending = [c for c in self._components.values() if c.state == PENDING]
+            for component in pending:
+                component.state = LOADING
+        for component in pending:
+            if background:
+                component.thread = threading.Thread(
+                    target=self._run, args=(component,), name=f"startup-{component.name}", daemon=True
+                )
+                component.thread.start()
+            else:
+                self._run(component)
+
+    def wait(self, timeout=None, name=None):
+        """Block until the named component (or all of them) finished loading; returns whether it is ready"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        components = [self._components[name]] if name else list(self._components.values())
+        for component in components:
+            if component.thread is not None:
+                component.thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return self.state(name) == READY if name else self.ready
+
+    def state(self, name):
+        return self._components[name].state
+
+    @property
+    def ready(self):
+        return all(c.state == READY for c in self._components.values() if c.required)
+
+    def status(self):
+        return {
+            c.name: {"state": c.state, "required": c.required, "seconds": c.seconds, "error": c.error}
+            for c in self._components.values()
+        }
@@ -0,0 +1,102 @@
+import json
+import threading
+import time
+
+
+class LatestFrameSlot:
+    """
+    Single-slot mailbox between the socket reader and the inference worker.
+
+    A frame that arrives while the previous one is still waiting replaces it
+    (latest-frame-wins), so a slow model never builds a backlog of stale frames.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._closed = False
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, frame):
+        """Store a frame, replacing any unprocessed one. Returns True if a frame was dropped"""
+        with self._cond:
+            self.received += 1
+            replaced = self._frame is not None
+            if replaced:
+                self.dropped += 1
+            self._frame = (self.received, frame)
+            self._cond.notify()
+            return replaced
+
+    def get(self, timeout=None):
+        """Wait for the newest frame; returns (sequence, frame) or None once closed"""
+        with self._cond:
+            while self._frame is None and not self._closed:
+                if not self._cond.wait(timeout):
+                    return None
+            item, self._frame = self._frame, None
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class FrameStreamSession:
+    """
+    Serve one streaming client.
+
+    The calling thread reads binary frames with `receive` and drops them into a
+    LatestFrameSlot; a worker thread runs `process_frame(bytes) -> dict` on the
+    newest frame and pushes the JSON result back with `send` as soon as it is ready.
+    """
+
+    def __init__(self, receive, send, process_frame):
+        self.receive = receive
+        self.send = send
+        self.process_frame = process_frame
+        self.slot = LatestFrameSlot()
+        self._worker = threading.Thread(target=self._infer_loop, name="frame-stream", daemon=True)
+
+    def run(self):
+        """Block until the client disconnects"""
+        self._worker.start()
+        try:
+            while True:
+                message = self.receive()
+                if message is None:
+                    break
+                if isinstance(message, str):
+                    # Only binary JPEG frames are accepted; text messages are ignored
+                    continue
+                self.slot.put(message)
+        finally:
+            self.slot.close()
+            self._worker.join()
+
+    def _infer_loop(self):
+        while True:
+            item = self.slot.get()
+            if item is None:
+                return
+            sequence, frame = item
+
+            start = time.perf_counter()
+            try:
+                result = self.process_frame(frame)
+            except Exception as e:
+                result = {"error": str(e)}
+            result.update({
+                "frame": sequence,
+                "dropped": self.slot.dropped,
+                "latency_ms": round((time.perf_counter() - start) * 1000.0, 2),
+            })
+
+            try:
+                self.send(json.dumps(result))
+            except Exception:
+                # Client went away mid-send; the reader loop will notice and stop
+                self.slot.close()
+                return
@@ -0,0 +1,308 @@
+import fcntl
+import glob
+import hashlib
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+SCORE_DTYPES = ("uint8", "float16")
+# Time offsets within a chunk are uint32 milliseconds, so one chunk spans at most ~49 days
+MAX_OFFSET_MS = 2 ** 32 - 1
+SESSION_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+# Streams are locked within a process by one of this many stripes
+LOCK_STRIPES = 64
+
+
+class TimelineStore:
+    """
+    Append-only per-session emotion timelines in compact columnar files.
+
+    Each (user, session) stream is a directory of chunks of up to `chunk_rows`
+    frames. A chunk is two files named after its index and base time:
+
+        000000-<base ms>.time    uint32 milliseconds since the base, one per frame
+        000000-<base ms>.scores  one row of len(class_names) scores per frame,
+                                 uint8 (score * 255) or float16
+
+    That is 11 bytes per frame with uint8 scores, instead of a JSON object. Rows
+    are only ever appended, under a per-stream file lock so several server
+    processes can share a directory; the row count is derived from the file
+    sizes. Reads memory-map whole chunks and binary-search the time column, and
+    aggregates are computed chunk by chunk with vectorized numpy, so a query's
+    memory use is bounded by the chunk size rather than the range.
+
+    User ids are hashed into directory names; session ids are used as given and
+    must be 1-64 letters, digits, "-" or "_" (anything else raises ValueError).
+    With `retention` set, sessions with no frames for that many seconds are
+    deleted, checked on append at most every `purge_interval` seconds.
+    """
+
+    def __init__(self, root, class_names, score_dtype="uint8", chunk_rows=65536, retention=None,
+                 purge_interval=3600.0):
+        if score_dtype not in SCORE_DTYPES:
+            raise ValueError(f"Unknown score dtype '{score_dtype}', expected one of {SCORE_DTYPES}")
+        self.root = root
+        self.class_names = [name.lower() for name in class_names]
+        self.width = len(class_names)
+        self.score_dtype = np.dtype(score_dtype)
+        self.chunk_rows = chunk_rows
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+        # Striped rather than one lock per stream, so memory does not grow with every session ever written
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._purge_lock = threading.Lock()
+
+    @staticmethod
+    def user_key(user):
+        return hashlib.blake2b(str(user).encode(), digest_size=8).hexdigest()
+
+    @staticmethod
+    def session_key(session):
+        session = str(session)
+        if not SESSION_ID.fullmatch(session):
+            raise ValueError("Session ids must be 1-64 letters, digits, '-' or '_'")
+        return session
+
+    def stream_dir(self, user, session=None):
+        path = os.path.join(self.root, self.user_key(user))
+        return path if session is None else os.path.join(path, self.session_key(session))
+
+    def _chunks(self, directory):
+        """[(prefix, base_ms, rows)] in append order"""
+        chunks = []
+        for time_path in sorted(glob.glob(os.path.join(directory, "*.time"))):
+            prefix = time_path[:-len(".time")]
+            base_ms = int(os.path.basename(prefix).split("-")[1])
+            try:
+                rows = min(
+                    os.path.getsize(time_path) // 4,
+                    os.path.getsize(prefix + ".scores") // (self.width * self.score_dtype.itemsize),
+                )
+            except OSError:
+                rows = 0
+            chunks.append((prefix, base_ms, rows))
+        return chunks
+
+    def _thread_lock(self, directory):
+        # Streams sharing a stripe just serialize; no code path holds two stream locks
+        return self._locks[hash(directory) % len(self._locks)]
+
+    def _encode(self, scores):
+        scores = np.asarray(scores, dtype=np.float32).reshape(-1, self.width)
+        if self.score_dtype == np.uint8:
+            return np.clip(np.rint(scores * 255.0), 0, 255).astype(np.uint8)
+        return scores.astype(np.float16)
+
+    def _decode(self, scores):
+        scores = np.asarray(scores, dtype=np.float32)
+        return scores / 255.0 if self.score_dtype == np.uint8 else scores
+
+    def append(self, user, session, timestamps, scores):
+        """
+        Append frames to a stream: unix timestamps in seconds (a scalar or an array)
+        and a matching (n, classes) array of 0-1 scores. Timestamps earlier than the
+        stream's last one are clamped to it, so each chunk stays sorted.
+        """
+        times_ms = np.atleast_1d(np.asarray(timestamps, dtype=np.float64) * 1000.0).astype(np.int64)
+        encoded = self._encode(scores)
+        if len(times_ms) != len(encoded):
+            raise ValueError("timestamps and scores must have the same number of rows")
+        if not len(times_ms):
+            return
+        self._maybe_purge()
+        directory = self.stream_dir(user, session)
+        with self._stream_lock(directory):
+            chunks = self._chunks(directory)
+            index, base_ms, rows, last_ms = -1, 0, self.chunk_rows, None
+            if chunks:
+                prefix, base_ms, rows = chunks[-1]
+                index = len(chunks) - 1
+                # Drop the tail of a write that was interrupted between the two files
+                os.truncate(prefix + ".scores", rows * self.width * self.score_dtype.itemsize)
+                os.truncate(prefix + ".time", rows * 4)
+                if rows:
+                    last_ms = base_ms + int(np.fromfile(prefix + ".time", dtype=np.uint32, count=1, offset=(rows - 1) * 4)[0])
+            times_ms = np.maximum.accumulate(times_ms)
+            if last_ms is not None:
+                times_ms = np.maximum(times_ms, last_ms)
+
+            start = 0
+            while start < len(times_ms):
+                if rows >= self.chunk_rows or times_ms[start] - base_ms > MAX_OFFSET_MS:
+                    index, base_ms, rows = index + 1, int(times_ms[start]), 0
+                # Rows that fit this chunk by count and by time span
+                end = min(len(times_ms), start + self.chunk_rows - rows)
+                end = start + int(np.searchsorted(times_ms[start:end], base_ms + MAX_OFFSET_MS, side="right"))
+                prefix = os.path.join(directory, f"{index:06d}-{base_ms}")
+                with open(prefix + ".scores", "ab") as f:
+                    f.write(encoded[start:end].tobytes())
+                # Time last: readers only count rows present in both files
+                with open(prefix + ".time", "ab") as f:
+                    f.write((times_ms[start:end] - base_ms).astype(np.uint32).tobytes())
+                rows += end - start
+                start = end
+
+    @contextmanager
+    def _stream_lock(self, directory):
+        """Exclusive access to one stream, across threads and processes"""
+        os.makedirs(directory, exist_ok=True)
+        with self._thread_lock(directory), open(os.path.join(directory, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # A purge may have removed the directory while we waited for the lock
+            os.makedirs(directory, exist_ok=True)
+            yield
+
+    def _slices(self, user, session, start=None, end=None):
+        """Yield (unix seconds, encoded scores) per chunk for frames with start <= time <= end"""
+        start_ms = None if start is None else int(start * 1000)
+        end_ms = None if end is None else int(end * 1000)
+        for prefix, base_ms, rows in self._chunks(self.stream_dir(user, session)):
+            if not rows or (end_ms is not None and base_ms > end_ms):
+                continue
+            offsets = np.memmap(prefix + ".time", dtype=np.uint32, mode="r", shape=(rows,))
+            if start_ms is not None and base_ms + int(offsets[-1]) < start_ms:
+                continue
+            lo = 0 if start_ms is None else int(np.searchsorted(offsets, max(start_ms - base_ms, 0), side="left"))
+            hi = rows if end_ms is None else int(np.searchsorted(offsets, end_ms - base_ms, side="right"))
+            if hi <= lo:
+                continue
+            scores = np.memmap(prefix + ".scores", dtype=self.score_dtype, mode="r", shape=(rows, self.width))
+            yield (base_ms + offsets[lo:hi].astype(np.float64)) / 1000.0, scores[lo:hi]
+
+    def read(self, user, session, start=None, end=None):
+        """(unix seconds, 0-1 float32 scores) for every frame in the range"""
+        times, scores = [], []
+        for chunk_times, chunk_scores in self._slices(user, session, start, end):
+            times.append(chunk_times)
+            scores.append(self._decode(chunk_scores))
+        if not times:
+            return np.empty(0), np.empty((0, self.width), dtype=np.float32)
+        return np.concatenate(times), np.concatenate(scores)
+
+    def aggregate(self, user, session, bucket=60.0, start=None, end=None, max_buckets=100000):
+        """
+        Per-bucket means and dominant emotions over a time range, plus the
+        dominant-emotion histogram of the whole range. Buckets are aligned to
+        multiples of `bucket` seconds and empty ones are left out. Values are
+        columnar lists: {"start": [...], "count": [...], "mean": {emotion: [...]},
+        "dominant": [...], "histogram": {emotion: frames}, "frames": total}
+        """
+        if bucket <= 0:
+            raise ValueError("bucket must be positive")
+        parts = list(self._slices(user, session, start, end))
+        result = {"bucket_seconds": bucket, "frames": 0, "start": [], "count": [],
+                  "mean": {name: [] for name in self.class_names}, "dominant": [],
+                  "histogram": dict.fromkeys(self.class_names, 0)}
+        if not parts:
+            return result
+        origin = math.floor(parts[0][0][0] / bucket) * bucket
+        buckets = int((parts[-1][0][-1] - origin) // bucket) + 1
+        if buckets > max_buckets:
+            raise ValueError(f"Range needs {buckets} buckets (max {max_buckets}); use a larger bucket")
+
+        counts = np.zeros(buckets, dtype=np.int64)
+        sums = np.zeros((buckets, self.width), dtype=np.float64)
+        dominant = np.zeros(buckets * self.width, dtype=np.int64)
+        for times, encoded in parts:
+            ids = ((times - origin) // bucket).astype(np.int64)
+            scores = self._decode(encoded)
+            counts += np.bincount(ids, minlength=buckets)
+            for column in range(self.width):
+                sums[:, column] += np.bincount(ids, weights=scores[:, column], minlength=buckets)
+            dominant += np.bincount(ids * self.width + scores.argmax(axis=1), minlength=buckets * self.width)
+        dominant = dominant.reshape(buckets, self.width)
+
+        present = np.flatnonzero(counts)
+        means = sums[present] / counts[present, None] * 100.0
+        result["frames"] = int(counts.sum())
+        result["start"] = [round(origin + i * bucket, 3) for i in present]
+        result["count"] = counts[present].tolist()
+        for column, name in enumerate(self.class_names):
+            result["mean"][name] = np.round(means[:, column], 2).tolist()
+            result["histogram"][name] = int(dominant[:, column].sum())
+        result["dominant"] = [self.class_names[i] for i in dominant[present].argmax(axis=1)]
+        return result
+
+    def downsample(self, user, session, points=300, start=None, end=None):
+        """aggregate() with the bucket size chosen so the range fits in about `points` buckets"""
+        first = last = None
+        for times, _ in self._slices(user, session, start, end):
+            first = times[0] if first is None else first
+            last = times[-1]
+        if first is None:
+            return self.aggregate(user, session, 1.0, start, end)
+        bucket = max((last - first) / max(points, 1), 0.001)
+        # Round up to whole milliseconds so bucket starts stay readable
+        return self.aggregate(user, session, math.ceil(bucket * 1000.0) / 1000.0, start, end)
+
+    def sessions(self, user):
+        """A user's sessions with their time span and frame count, newest first"""
+        directory = self.stream_dir(user)
+        found = []
+        if not os.path.isdir(directory):
+            return found
+        for entry in os.scandir(directory):
+            if not entry.is_dir():
+                continue
+            chunks = [chunk for chunk in self._chunks(entry.path) if chunk[2]]
+            if not chunks:
+                continue
+            first_prefix, first_base, _ = chunks[0]
+            last_prefix, last_base, last_rows = chunks[-1]
+            first = np.fromfile(first_prefix + ".time", dtype=np.uint32, count=1)[0]
+            last = np.fromfile(last_prefix + ".time", dtype=np.uint32, count=1, offset=(last_rows - 1) * 4)[0]
+            found.append({
+                "session": entry.name,
+                "start": (first_base + int(first)) / 1000.0,
+                "end": (last_base + int(last)) / 1000.0,
+                "frames": sum(rows for _, _, rows in chunks),
+            })
+        found.sort(key=lambda session: session["start"], reverse=True)
+        return found
+
+    def delete(self, user, session):
+        shutil.rmtree(self.stream_dir(user, session), ignore_errors=True)
+
+    def _maybe_purge(self):
+        if self.retention is None:
+            return
+        now = time.monotonic()
+        with self._purge_lock:
+            if now < self._next_purge:
+                return
+            self._next_purge = now + self.purge_interval
+        self.purge(time.time() - self.retention)
+
+    def purge(self, older_than):
+        """Delete every session whose last frame was written before older_than (unix time); returns how many"""
+        removed = 0
+        try:
+            users = [entry.path for entry in os.scandir(self.root) if entry.is_dir()]
+        except FileNotFoundError:
+            return removed
+        for user_dir in users:
+            for entry in os.scandir(user_dir):
+                if not entry.is_dir() or self._last_write(entry.path) >= older_than:
+                    continue
+                with self._stream_lock(entry.path):
+                    # Re-check under the lock in case a frame arrived meanwhile
+                    if self._last_write(entry.path) < older_than:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                        removed += 1
+            try:
+                os.rmdir(user_dir)
+            except OSError:
+                pass
+        return removed
+
+    @staticmethod
+    def _last_write(directory):
+        times = [os.path.getmtime(path) for path in glob.glob(os.path.join(directory, "*.time"))]
+        return max(times, default=0.0)
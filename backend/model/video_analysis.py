@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+"""
+Emotion timeline for a recorded video.
+
+Usage:
+    python video_analysis.py recording.mp4 --sample-fps 2 --timeline timeline.csv
+
+Frames are decoded one at a time with OpenCV, sampled at --sample-fps, scored in
+batches of --batch-size and written to the timeline as they are produced, so
+memory use does not grow with the length of the video. The summary printed at
+the end includes "max_emotions", the same per-emotion peak confidence that
+LiveDetection.jsx saves after a webcam session.
+"""
+
+import argparse
+import csv
+import json
+import sys
+
+import numpy as np
+
+# Frames are box-shrunk to this size before the model resize, like the JPEG draft
+# decode /predict uploads go through
+PRESHRINK_SIZE = (96, 96)
+
+
+def iter_sampled_frames(path, sample_fps=2.0, max_frames=None):
+    """
+    Yield (frame_index, seconds, grayscale ndarray) for frames sampled at
+    `sample_fps` (<= 0 keeps every frame). Skipped frames are only grabbed, not
+    converted, and only the current frame is held in memory.
+    """
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video {path}")
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+        interval = 1.0 / sample_fps if sample_fps > 0 else 0.0
+        next_time = 0.0
+        index = -1
+        sampled = 0
+        while max_frames is None or sampled < max_frames:
+            if not capture.grab():
+                break
+            index += 1
+            seconds = index / fps if fps > 0 else capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            if interval and seconds + 1e-6 < next_time:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                continue
+            while interval and next_time <= seconds + 1e-6:
+                next_time += interval
+            if frame.ndim == 3:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            if frame.shape[1] > PRESHRINK_SIZE[0] and frame.shape[0] > PRESHRINK_SIZE[1]:
+                frame = cv2.resize(frame, PRESHRINK_SIZE, interpolation=cv2.INTER_AREA)
+            sampled += 1
+            yield index, seconds, frame
+    finally:
+        capture.release()
+
+
+class VideoSummary:
+    """Running aggregates over a video's timeline, in constant memory"""
+
+    def __init__(self, class_names):
+        self.class_names = [name.lower() for name in class_names]
+        self.frames = 0
+        self.duration = 0.0
+        self.changes = 0
+        self._last_top = None
+        self._counts = np.zeros(len(class_names), dtype=np.int64)
+        self._score_sums = np.zeros(len(class_names), dtype=np.float64)
+        self._max_top = np.zeros(len(class_names), dtype=np.float64)
+
+    def add(self, seconds, scores):
+        scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+        top = int(np.argmax(scores))
+        self.frames += 1
+        self.duration = max(self.duration, seconds)
+        self._counts[top] += 1
+        self._score_sums += scores
+        # Same rule as maxEmotionsRef: peak confidence of each emotion while it was the top one
+        self._max_top[top] = max(self._max_top[top], scores[top] * 100)
+        if self._last_top is not None and top != self._last_top:
+            self.changes += 1
+        self._last_top = top
+
+    def result(self):
+        frames = max(self.frames, 1)
+        return {
+            "frames": self.frames,
+            "duration": round(self.duration, 3),
+            "dominant": self.class_names[int(np.argmax(self._counts))] if self.frames else None,
+            "changes": self.changes,
+            "max_emotions": {
+                name: round(float(value), 3) for name, value in zip(self.class_names, self._max_top) if value > 0
+            },
+            "share": {name: round(int(count) / frames, 4) for name, count in zip(self.class_names, self._counts)},
+            "mean_emotions": {
+                name: round(float(total) / frames * 100, 3) for name, total in zip(self.class_names, self._score_sums)
+            },
+        }
+
+
+def analyze_video(path, predict, preprocess, format_scores, summary, sample_fps=2.0, batch_size=32, max_frames=None):
+    """
+    Score sampled frames of a video and yield one timeline entry per frame.
+
+    Args:
+        predict: Callable scoring a (N, 48, 48, 1) float32 batch
+        preprocess: preprocess_batch(images, out), filling a batch from PIL images
+        format_scores: format_prediction, turning one score row into a result dict
+        summary: VideoSummary updated as entries are produced
+
+    Only one batch of frames is held at a time; the input buffer is reused.
+    """
+    from PIL import Image
+
+    buffer = np.empty((batch_size, 48, 48, 1), dtype=np.float32)
+    pending = []
+
+    def flush():
+        inputs = preprocess([Image.fromarray(frame) for _, _, frame in pending], buffer[:len(pending)])
+        scores = predict(inputs)
+        for (index, seconds, _), row in zip(pending, scores):
+            summary.add(seconds, row)
+            yield {"time": round(seconds, 3), "frame": index, **format_scores(row)}
+        pending.clear()
+
+    for item in iter_sampled_frames(path, sample_fps, max_frames):
+        pending.append(item)
+        if len(pending) == batch_size:
+            yield from flush()
+    if pending:
+        yield from flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", help="Video file to analyze")
+    parser.add_argument("--model", default="models/model.h5", help="Model file (.h5 or a converted .tflite/.onnx)")
+    parser.add_argument("--backend", default="keras", help="Backend for a .h5 model: keras, tflite, tflite_int8 or onnx")
+    parser.add_argument("--sample-fps", type=float, default=2.0, help="Frames per second to score (0 = every frame)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-frames", type=int, help="Stop after this many sampled frames")
+    parser.add_argument("--timeline", help="Write the timeline to this .csv or .jsonl file")
+    args = parser.parse_args(argv)
+
+    from emotions import CLASS_NAMES, format_prediction
+    from inference import artifact_backend, load_backend
+    from preprocessing import preprocess_batch
+
+    model = load_backend(artifact_backend(args.model) or args.backend, args.model)
+    summary = VideoSummary(CLASS_NAMES)
+    entries = analyze_video(
+        args.video, model.predict, preprocess_batch, format_prediction, summary,
+        sample_fps=args.sample_fps, batch_size=args.batch_size, max_frames=args.max_frames,
+    )
+
+    if not args.timeline:
+        for _ in entries:
+            pass
+    elif args.timeline.endswith(".csv"):
+        names = [name.lower() for name in CLASS_NAMES]
+        with open(args.timeline, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["time", "frame", "prediction", "confidence", *names])
+            for entry in entries:
+                writer.writerow([
+                    entry["time"], entry["frame"], entry["prediction"], round(entry["confidence"], 4),
+                    *(round(entry["all_emotions"][name], 3) for name in names),
+                ])
+    else:
+        with open(args.timeline, "w") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+
+    print(json.dumps(summary.result(), indent=2))
+    if args.timeline:
+        print(f"✅ Timeline of {summary.frames} frames written to {args.timeline}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,9 +10,12 @@ const Chatbot = ({ emotionData }) => {
     const [showImagePreview, setShowImagePreview] = useState(false);
     const messagesEndRef = useRef(null);
     const fileInputRef = useRef(null);
+    const abortRef = useRef(null);
+    // Server-side conversation key for this chat window
+    const sessionIdRef = useRef(crypto.randomUUID());
     const [currentEmotion, setCurrentEmotion] = useState(null);
     const [currentConfidence, setCurrentConfidence] = useState(null);
-    const [currentImage, setCurrentImage] = useState(null);
+    const [currentFrameId, setCurrentFrameId] = useState(null);
     const [useLiveDetection, setUseLiveDetection] = useState(true);
     const [showPredefinedQueries, setShowPredefinedQueries] = useState(true);
 
@@ -24,6 +27,51 @@ const Chatbot = ({ emotionData }) => {
         scrollToBottom();
     }, [messages]);
 
+    // Cancel any in-flight streamed reply when the chat unmounts
+    useEffect(() => {
+        return () => abortRef.current?.abort();
+    }, []);
+
+    // Read server-sent events from /chat/stream, growing the last bot message token by token
+    const readChatStream = async (response) => {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let started = false;
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+            for (const rawEvent of events) {
+                const dataLine = rawEvent.split('\n').find(line => line.startsWith('data: '));
+                if (!dataLine) continue;
+                const event = JSON.parse(dataLine.slice(6));
+
+                if (event.type === 'error') {
+                    throw new Error(event.error);
+                }
+                if (event.type !== 'token') continue;
+
+                if (!started) {
+                    started = true;
+                    setIsLoading(false);
+                    setMessages(prev => [...prev, { text: event.content, sender: 'bot' }]);
+                } else {
+                    setMessages(prev => {
+                        const updated = [...prev];
+                        const last = updated[updated.length - 1];
+                        updated[updated.length - 1] = { ...last, text: last.text + event.content };
+                        return updated;
+                    });
+                }
+            }
+        }
+    };
+
     useEffect(() => {
         if (emotionData) {
             // console.log("Received emotionData:", emotionData);
@@ -31,10 +79,9 @@ const Chatbot = ({ emotionData }) => {
             // Only update states if emotionData contains valid data
             if (emotionData.emotion) setCurrentEmotion(emotionData.emotion);
             if (emotionData.confidence) setCurrentConfidence(emotionData.confidence);
-            if (emotionData.image) {
-                // console.log("Image data received, length:", emotionData.image.length);
-                setCurrentImage(emotionData.image);
-                
+            if (emotionData.frameId) {
+                setCurrentFrameId(emotionData.frameId);
+
                 // If we receive new emotion data and useLiveDetection is true,
                 // we can optionally auto-update the preview
                 if (useLiveDetection) {
@@ -47,27 +94,13 @@ const Chatbot = ({ emotionData }) => {
 
     // Determine which image to use for the API request
     const getImageForRequest = () => {
-        // Priority: manually selected image > camera captured image (if live detection enabled)
+        // Priority: manually selected image > last live detection frame (if live detection enabled)
         if (selectedImage) {
-            console.log("Using manually selected image");
-            return selectedImage;
-        } else if (useLiveDetection && currentImage) {
-            console.log("Using live detection image");
-            console.log("Current image type:", typeof currentImage);
-            
-            // Check if currentImage is a full data URL or just the base64 part
-            if (typeof currentImage === 'string') {
-                if (currentImage.startsWith && currentImage.startsWith('data:image')) {
-                    // Extract base64 part from data URL
-                    return currentImage.split(',')[1];
-                }
-                return currentImage;
-            } else {
-                console.error("Current image is not a string:", currentImage);
-                return null;
-            }
+            return { image: selectedImage };
+        } else if (useLiveDetection && currentFrameId) {
+            // The backend still holds the frame it scored, so only its ID is sent
+            return { frame_id: currentFrameId };
         }
-        console.log("No image available to send");
         return null;
     };
 
@@ -110,7 +143,7 @@ const Chatbot = ({ emotionData }) => {
         
         console.log("Image to send:", imageToSend ? "Image data available" : "No image data");
         console.log("Live detection:", useLiveDetection);
-        console.log("Current image available:", currentImage ? "Yes" : "No");
+        console.log("Current frame available:", currentFrameId ? "Yes" : "No");
         
         // Check if there's an input message or an image to process
         if (!inputMessage.trim() && !imageToSend) return;
@@ -131,18 +164,24 @@ const Chatbot = ({ emotionData }) => {
         setInputMessage('');
         setIsLoading(true);
 
+        abortRef.current?.abort();
+        const controller = new AbortController();
+        abortRef.current = controller;
+
         try {
-            const response = await fetch('http://localhost:5000/chat', {
+            const response = await fetch('http://localhost:5000/chat/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({ 
+                    session_id: sessionIdRef.current,
                     message: messageText,
-                    image: imageToSend,
+                    ...imageToSend,
                     emotion: imageToSend ? currentEmotion : null,
                     confidence: imageToSend ? currentConfidence : null
                 }),
+                signal: controller.signal,
             });
 
             if (!response.ok) {
@@ -150,11 +189,10 @@ const Chatbot = ({ emotionData }) => {
                 throw new Error(errorData.error || `Server error: ${response.status}`);
             }
 
-            const data = await response.json();
-            const botMessage = { text: data.response, sender: 'bot' };
-            setMessages(prev => [...prev, botMessage]);
+            await readChatStream(response);
             
         } catch (error) {
+            if (error.name === 'AbortError') return;
             console.error('Error details:', error);
             let errorMessage = 'Sorry, I encountered an error. ';
             
@@ -179,11 +217,12 @@ const Chatbot = ({ emotionData }) => {
             if (fileInputRef.current) {
                 fileInputRef.current.value = '';
             }
-            // Don't clear currentImage as it comes from props
+            // Don't clear currentFrameId as it comes from props
         }
     };
 
     const handleNewChat = async () => {
+        abortRef.current?.abort();
         setIsLoading(true);
         try {
             const response = await fetch('http://localhost:5000/chat', {
@@ -191,7 +230,7 @@ const Chatbot = ({ emotionData }) => {
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({ new_chat: true }),
+                body: JSON.stringify({ new_chat: true, session_id: sessionIdRef.current }),
             });
             
             if (!response.ok) {
@@ -360,7 +399,7 @@ const Chatbot = ({ emotionData }) => {
               <button 
                 type="submit" 
                 className="p-2 bg-indigo-600/20 hover:bg-indigo-600/30 rounded-lg text-indigo-200 transition-colors disabled:opacity-50"
-                disabled={isLoading || (!inputMessage.trim() && !selectedImage && !(useLiveDetection && currentImage))}
+                disabled={isLoading || (!inputMessage.trim() && !selectedImage && !(useLiveDetection && currentFrameId))}
               >
                 <FaPaperPlane className="w-5 h-5" />
               </button>
@@ -112,6 +112,9 @@ const ImageDetection = () => {
         if (user?.email) {
           await saveAnalysisHistory(result);
         }
+      } else if (response.status === 429) {
+        const retryAfter = response.headers.get("Retry-After") || "a few";
+        setPrediction({ error: `The server is busy, please try again in ${retryAfter} seconds.` });
       } else {
         setPrediction({ error: "Failed to analyze the file." });
       }
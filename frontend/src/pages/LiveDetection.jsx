@@ -25,6 +25,7 @@ const LiveDetection = () => {
   const [showTooltip, setShowTooltip] = useState(false);
   const [allEmotions, setAllEmotions] = useState({});
   const intervalRef = useRef(null);
+  const socketRef = useRef(null);
   const [emotionData, setEmotionData] = useState(null);
   const [isSaving, setIsSaving] = useState(false);
   const [saveSuccess, setSaveSuccess] = useState(false);
@@ -33,6 +34,9 @@ const LiveDetection = () => {
   const [showExitConfirm, setShowExitConfirm] = useState(false);
   const navigatingTo = useRef(null);
 
+  // Predictions are recorded under this id as the session's emotion timeline (when the server has TIMELINE_ENABLED)
+  const sessionIdRef = useRef(crypto.randomUUID());
+
   // Store max emotion values during the session
   const maxEmotionsRef = useRef({
     happy: 0,
@@ -96,6 +100,32 @@ const LiveDetection = () => {
     };
   }, []);
 
+  // Open the streaming prediction socket; frames fall back to HTTP POST while it is unavailable
+  useEffect(() => {
+    const params = new URLSearchParams({ timeline: sessionIdRef.current, user: user?._id || '' });
+    const socket = new WebSocket(`ws://127.0.0.1:5000/predict/stream?${params}`);
+    socket.onmessage = (event) => {
+      const data = JSON.parse(event.data);
+      // The server shed this frame under load; the next one will be scored
+      if (data.busy) return;
+      if (data.error) {
+        console.error('Stream prediction error:', data.error);
+        setError('Analysis failed - server error');
+        return;
+      }
+      handlePrediction(data);
+    };
+    socket.onerror = () => {
+      console.warn('Prediction stream unavailable, using HTTP uploads');
+    };
+    socketRef.current = socket;
+
+    return () => {
+      socketRef.current = null;
+      socket.close();
+    };
+  }, [user?._id]);
+
   // Handle FPS changes
   useEffect(() => {
     if (intervalRef.current) clearInterval(intervalRef.current);
@@ -167,6 +197,41 @@ const LiveDetection = () => {
     };
   }, []);
 
+  const handlePrediction = (data) => {
+    if (!data.prediction) return null;
+
+    const result = {
+      emotion: data.prediction,
+      confidence: (data.confidence * 100).toFixed(3),
+      // The backend keeps the frame it scored; the chatbot refers to it by ID
+      frameId: data.frame_id
+    };
+
+    setEmotion(result.emotion);
+    setConfidence(result.confidence);
+
+    // Update all emotions display
+    if (data.all_emotions) {
+      setAllEmotions(data.all_emotions);
+    } else {
+      const emotionsObj = {};
+      emotionsObj[result.emotion.toLowerCase()] = parseFloat(result.confidence);
+      setAllEmotions(emotionsObj);
+    }
+
+    setEmotionData(result);
+    setError('');
+
+    // Update max emotions
+    const emotionKey = result.emotion.toLowerCase();
+    maxEmotionsRef.current[emotionKey] = Math.max(
+      maxEmotionsRef.current[emotionKey],
+      parseFloat(result.confidence)
+    );
+
+    return result;
+  };
+
   const captureAndSendFrame = async () => {
     const canvas = canvasRef.current;
     const video = videoRef.current;
@@ -191,8 +256,6 @@ const LiveDetection = () => {
       const ctx = canvas.getContext('2d');
       ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
 
-      const base64Image = canvas.toDataURL('image/jpeg', 0.1).split(',')[1];
-
       return new Promise((resolve) => {
         canvas.toBlob(async (blob) => {
           if (!blob) {
@@ -203,6 +266,17 @@ const LiveDetection = () => {
             return;
           }
 
+          // Stream the frame when the socket is up; predictions arrive in socket.onmessage
+          const socket = socketRef.current;
+          if (socket && socket.readyState === WebSocket.OPEN) {
+            // Skip this tick if the previous frame is still in the send buffer
+            if (socket.bufferedAmount === 0) {
+              socket.send(blob);
+            }
+            resolve(null);
+            return;
+          }
+
           const formData = new FormData();
           formData.append('image', blob, 'frame.jpg');
 
@@ -210,41 +284,26 @@ const LiveDetection = () => {
             const response = await axios.post(
               'http://127.0.0.1:5000/predict',
               formData,
-              { headers: { 'Content-Type': 'multipart/form-data' } }
-            );
-
-            if (response.data.prediction) {
-              const result = {
-                emotion: response.data.prediction,
-                confidence: (response.data.confidence * 100).toFixed(3),
-                image: base64Image
-              };
-
-              setEmotion(result.emotion);
-              setConfidence(result.confidence);
-
-              // Update all emotions display
-              if (response.data.all_emotions) {
-                setAllEmotions(response.data.all_emotions);
-              } else {
-                const emotionsObj = {};
-                emotionsObj[result.emotion.toLowerCase()] = parseFloat(result.confidence);
-                setAllEmotions(emotionsObj);
+              {
+                headers: {
+                  'Content-Type': 'multipart/form-data',
+                  'X-Priority': 'live',
+                  'X-Timeline-Session': sessionIdRef.current,
+                  'X-User-ID': user?._id || '',
+                },
               }
+            );
 
-              setEmotionData(result);
-              setError('');
-
-              // Update max emotions
-              const emotionKey = result.emotion.toLowerCase();
-              maxEmotionsRef.current[emotionKey] = Math.max(
-                maxEmotionsRef.current[emotionKey],
-                parseFloat(result.confidence)
-              );
-
+            const result = handlePrediction(response.data);
+            if (result) {
               resolve(result);
             }
           } catch (error) {
+            // 429: the server is shedding load, skip this frame quietly
+            if (error.response?.status === 429) {
+              resolve(null);
+              return;
+            }
             console.error('Error sending image to server:', error);
             setError('Analysis failed - server error');
             resolve(null);
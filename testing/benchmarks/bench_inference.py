@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+Compare single-request inference latency of keras model.predict against the
+compiled direct-call path used by the backend (CompiledModel).
+
+Usage:
+    python bench_inference.py [--model PATH] [--iterations 500] [--batch-size 1] [--xla] [--json]
+
+Without --model, a dummy CNN from mock_model.py is created in a temp directory.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.model.inference import CompiledModel, INPUT_SHAPE
+
+
+def measure(fn, batch, iterations, warmup=10):
+    """Return per-call latencies in milliseconds"""
+    for _ in range(warmup):
+        fn(batch)
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(batch)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return np.array(latencies)
+
+
+def summarize(name, latencies):
+    return {
+        "name": name,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "mean_ms": round(float(latencies.mean()), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="Path to a .h5 model (defaults to a mock model)")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--xla", action="store_true", help="Also benchmark the XLA-compiled variant")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results only")
+    args = parser.parse_args()
+
+    model_path = args.model
+    if not model_path:
+        from mock_model import create_dummy_model
+        model_path = os.path.join(tempfile.mkdtemp(), "mock_model.h5")
+        create_dummy_model(model_path)
+
+    batch = np.random.rand(args.batch_size, *INPUT_SHAPE).astype(np.float32)
+
+    compiled = CompiledModel(model_path)
+    compiled.warmup(batch_sizes=(args.batch_size,))
+    variants = [
+        ("model.predict", lambda x: compiled.model.predict(x, verbose=0)),
+        ("compiled", compiled.predict),
+    ]
+    if args.xla:
+        compiled_xla = CompiledModel(model_path, jit_compile=True)
+        compiled_xla.warmup(batch_sizes=(args.batch_size,))
+        variants.append(("compiled+xla", compiled_xla.predict))
+
+    results = [summarize(name, measure(fn, batch, args.iterations)) for name, fn in variants]
+
+    if args.json:
+        print(json.dumps({"batch_size": args.batch_size, "iterations": args.iterations, "results": results}))
+        return
+
+    print(f"\nbatch_size={args.batch_size} iterations={args.iterations}")
+    print(f"{'variant':<16}{'p50 (ms)':>12}{'p99 (ms)':>12}{'mean (ms)':>12}")
+    for r in results:
+        print(f"{r['name']:<16}{r['p50_ms']:>12}{r['p99_ms']:>12}{r['mean_ms']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+Microbenchmark of /predict preprocessing: the original PIL pipeline
+(RGB decode -> convert("L") -> resize -> np.array / 255 -> expand_dims x2)
+against draft-mode grayscale decoding into pooled float32 buffers.
+
+Usage:
+    python bench_preprocess.py [--iterations 200] [--batch-size 32] [--json]
+
+Frames are synthetic webcam-like JPEGs (640x480 and 1280x720, quality 92).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from backend.model.preprocessing import BufferPool, decode_grayscale, preprocess_batch, preprocess_into
+
+
+def webcam_jpeg(width, height, seed=0):
+    """Blurred noise over a gradient: compresses roughly like a real camera frame"""
+    rng = np.random.RandomState(seed)
+    noise = rng.randint(0, 255, (height // 8, width // 8, 3), dtype=np.uint8)
+    image = Image.fromarray(noise, 'RGB').resize((width, height), Image.Resampling.BICUBIC)
+    image = image.filter(ImageFilter.GaussianBlur(2))
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=92)
+    return buffer.getvalue()
+
+
+def legacy_preprocess(data):
+    """The original predict() + preprocess_image path"""
+    image = Image.open(BytesIO(data)).convert("RGB")
+    image = image.convert("L")
+    image = image.resize((48, 48))
+    image = np.array(image, dtype=np.float32) / 255.0
+    image = np.expand_dims(image, axis=-1)
+    image = np.expand_dims(image, axis=0)
+    return image
+
+
+def pipeline_preprocess(data, pool):
+    with pool.borrow() as buffer:
+        preprocess_into(decode_grayscale(data), buffer[0])
+        return buffer
+
+
+def timed(fn, iterations):
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results only")
+    args = parser.parse_args()
+
+    pool = BufferPool(batch_size=1)
+    batch_out = np.empty((args.batch_size, 48, 48, 1), dtype=np.float32)
+    results = []
+
+    for width, height in [(640, 480), (1280, 720)]:
+        frame = webcam_jpeg(width, height)
+        frames = [webcam_jpeg(width, height, seed=i) for i in range(args.batch_size)]
+
+        variants = [
+            ("legacy", lambda: legacy_preprocess(frame), 1),
+            ("pipeline", lambda: pipeline_preprocess(frame, pool), 1),
+            ("legacy-batch", lambda: np.concatenate([legacy_preprocess(f) for f in frames]), args.batch_size),
+            ("pipeline-batch", lambda: preprocess_batch([decode_grayscale(f) for f in frames], out=batch_out), args.batch_size),
+        ]
+        for name, fn, per_call in variants:
+            fn()
+            latencies = timed(fn, args.iterations if per_call == 1 else max(1, args.iterations // 10)) / per_call
+            results.append({
+                "frame": f"{width}x{height}",
+                "variant": name,
+                "jpeg_kb": round(len(frame) / 1024, 1),
+                "p50_us_per_frame": round(float(np.percentile(latencies, 50)), 1),
+                "p99_us_per_frame": round(float(np.percentile(latencies, 99)), 1),
+            })
+
+    if args.json:
+        print(json.dumps({"iterations": args.iterations, "batch_size": args.batch_size, "results": results}))
+        return
+
+    print(f"{'frame':<11}{'variant':<16}{'p50 us/frame':>14}{'p99 us/frame':>14}")
+    for r in results:
+        print(f"{r['frame']:<11}{r['variant']:<16}{r['p50_us_per_frame']:>14}{r['p99_us_per_frame']:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+Benchmark EmotionAgent.process_image (the /chat vision payload preparation)
+against the original decode -> LANCZOS thumbnail -> JPEG q95 -> base64 path.
+
+Usage:
+    python bench_process_image.py [--corpus DIR] [--repeat 3] [--json]
+
+--corpus points at a directory of phone-camera photos. Without it, a synthetic
+corpus of 12MP landscape/portrait shots, 1080p screenshots and small webcam
+frames is generated.
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from io import BytesIO
+from unittest.mock import patch
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from backend.model.emotion_agent import EmotionAgent
+
+
+def legacy_process_image(image_data, target_resolution=(1024, 1024)):
+    """The original process_image body"""
+    image_bytes = base64.b64decode(image_data)
+    img = Image.open(BytesIO(image_bytes))
+    img.thumbnail(target_resolution, Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    img.save(buffer, format="JPEG", quality=95)
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def synthetic_photo(width, height, seed):
+    rng = np.random.RandomState(seed)
+    noise = rng.randint(0, 255, (max(1, height // 16), max(1, width // 16), 3), dtype=np.uint8)
+    image = Image.fromarray(noise, 'RGB').resize((width, height), Image.Resampling.BICUBIC)
+    image = image.filter(ImageFilter.GaussianBlur(3))
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def load_corpus(directory):
+    if directory:
+        names = sorted(n for n in os.listdir(directory) if n.lower().endswith(('.jpg', '.jpeg', '.png')))
+        return [(n, open(os.path.join(directory, n), 'rb').read()) for n in names]
+    sizes = [("12mp-landscape", 4032, 3024), ("12mp-portrait", 3024, 4032),
+             ("1080p", 1920, 1080), ("webcam", 640, 480)]
+    return [(f"{name}-{i}", synthetic_photo(w, h, seed=i)) for i, (name, w, h) in enumerate(sizes * 2)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Directory of sample photos")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the corpus (later passes hit the cache)")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results only")
+    args = parser.parse_args()
+
+    corpus = [(name, base64.b64encode(data).decode('utf-8')) for name, data in load_corpus(args.corpus)]
+    with patch.dict(os.environ, {"GROQ_API_KEY": ""}):
+        agent = EmotionAgent()
+
+    def run(fn):
+        per_pass = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for _, payload in corpus:
+                fn(payload)
+            per_pass.append((time.perf_counter() - start) * 1000.0 / len(corpus))
+        return per_pass
+
+    legacy = run(legacy_process_image)
+    agent.image_cache_size = 0
+    uncached = run(agent.process_image)
+    agent.image_cache_size = 64
+    cached = run(agent.process_image)
+
+    results = {
+        "images": len(corpus),
+        "legacy_ms_per_image": round(float(np.mean(legacy)), 2),
+        "fast_path_ms_per_image": round(float(np.mean(uncached)), 2),
+        "fast_path_cached_ms_per_image": round(float(np.mean(cached[1:] or cached)), 3),
+    }
+
+    if args.json:
+        print(json.dumps(results))
+        return
+    for key, value in results.items():
+        print(f"{key:<32}{value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,430 @@
+#!/usr/bin/env python
+"""
+Load test for the Flask backend that mimics LiveDetection.jsx: each simulated
+camera sends webcam-sized JPEG frames at a fixed FPS, either as HTTP uploads to
+/predict or as binary frames over the /predict/stream WebSocket. Optional chat
+clients stream /chat/stream replies that reference a live frame by frame_id.
+
+The app runs in a subprocess with the dummy CNN from mock_model.py, and chat
+goes to a local FakeLLMServer, so the whole run is offline.
+
+Usage:
+    python load_test.py [--clients 8] [--fps 10] [--frame-size 640x480] [--duration 30]
+                        [--transport http|ws] [--chat-clients 0] [--env KEY=VALUE ...]
+                        [--workers N | --scaling] [--output results.json]
+                        [--compare baseline.json] [--json]
+
+Results (requests/s, p50/p95/p99 latency, errors, server peak RSS and the git
+commit) are written as JSON, so runs on different commits can be compared with
+--compare.
+
+--workers N serves through serve.py with N pre-forked workers instead of a
+single process. --scaling repeats the run for 1, 2, 4, ... up to all cores and
+adds a "scaling" table; use --fps 0 so the clients saturate the server.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from io import BytesIO
+
+import httpx
+import numpy as np
+from PIL import Image, ImageFilter
+
+TESTING_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MODEL_DIR = os.path.abspath(os.path.join(TESTING_DIR, '..', 'backend', 'model'))
+sys.path.insert(0, TESTING_DIR)
+
+from fake_llm_server import FakeLLMServer
+
+# Serve the app without the debug reloader so the measured PID is the one doing the work
+SERVER_RUNNER = (
+    "import sys; sys.path.insert(0, sys.argv[1]); import app; "
+    "app.app.run(host=sys.argv[2], port=int(sys.argv[3]), threaded=True)"
+)
+
+
+class Recorder:
+    """Thread-safe collection of latencies and status codes for one kind of request"""
+
+    def __init__(self):
+        self.latencies = []
+        self.first_token = []
+        self.statuses = Counter()
+        self.recording = False
+        self._lock = threading.Lock()
+
+    def add(self, status, latency_ms=None, first_token_ms=None):
+        if not self.recording:
+            return
+        with self._lock:
+            self.statuses[str(status)] += 1
+            if latency_ms is not None:
+                self.latencies.append(latency_ms)
+            if first_token_ms is not None:
+                self.first_token.append(first_token_ms)
+
+    def summary(self, duration):
+        ok = len(self.latencies)
+        result = {
+            "requests": sum(self.statuses.values()),
+            "errors": sum(self.statuses.values()) - ok,
+            "rps": round(ok / duration, 2) if duration else 0.0,
+            "statuses": dict(self.statuses),
+        }
+        result.update(percentiles(self.latencies))
+        if self.first_token:
+            result.update(percentiles(self.first_token, prefix="ttft_"))
+        return result
+
+
+def percentiles(values, prefix=""):
+    if not values:
+        return {}
+    values = np.asarray(values)
+    return {
+        f"{prefix}p50_ms": round(float(np.percentile(values, 50)), 2),
+        f"{prefix}p95_ms": round(float(np.percentile(values, 95)), 2),
+        f"{prefix}p99_ms": round(float(np.percentile(values, 99)), 2),
+        f"{prefix}mean_ms": round(float(values.mean()), 2),
+    }
+
+
+def synthetic_frames(width, height, count, quality=92):
+    """Distinct webcam-like JPEG frames (canvas.toBlob encodes at quality 0.92)"""
+    frames = []
+    for seed in range(count):
+        rng = np.random.RandomState(seed)
+        noise = rng.randint(0, 255, (max(1, height // 16), max(1, width // 16), 3), dtype=np.uint8)
+        image = Image.fromarray(noise, 'RGB').resize((width, height), Image.Resampling.BICUBIC)
+        image = image.filter(ImageFilter.GaussianBlur(2))
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', quality=quality)
+        frames.append(buffer.getvalue())
+    return frames
+
+
+def memory_kb(pid, field, source="status"):
+    """A /proc/<pid>/status (VmHWM, VmRSS) or smaps_rollup (Pss) field in kB, or None where unavailable"""
+    try:
+        with open(f"/proc/{pid}/{source}") as status:
+            for line in status:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def process_tree(pid):
+    """The server process and its pre-forked workers"""
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as children:
+            return [pid] + [int(child) for child in children.read().split()]
+    except OSError:
+        return [pid]
+
+
+def server_memory(pid):
+    """
+    Memory of the server's process tree in MB. Summed peak RSS counts weights
+    shared copy-on-write once per worker; PSS splits shared pages between them.
+    """
+    pids = process_tree(pid)
+    totals = {}
+    for name, field, source in (("peak_rss_mb", "VmHWM", "status"), ("rss_mb", "VmRSS", "status"),
+                                ("pss_mb", "Pss", "smaps_rollup")):
+        values = [memory_kb(p, field, source) for p in pids]
+        known = [v for v in values if v is not None]
+        totals[name] = round(sum(known) / 1024.0, 1) if known else None
+    totals["processes"] = len(pids)
+    return totals
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=TESTING_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_server(model_path, host, port, env_overrides, log_path, workers=None):
+    """Run app.py (or serve.py with `workers`) against model_path in a subprocess and wait until it is ready"""
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+
+    if workers:
+        command = [sys.executable, os.path.join(MODEL_DIR, "serve.py"), "--workers", str(workers),
+                   "--host", host, "--port", str(port), "--state-dir", os.path.join(workdir, "state")]
+    else:
+        command = [sys.executable, "-c", SERVER_RUNNER, MODEL_DIR, host, str(port)]
+
+    env = dict(os.environ, MODEL_PATH=os.path.abspath(model_path))
+    env.update(env_overrides)
+    log = open(log_path, "w")
+    process = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    url = f"http://{host}:{port}"
+    deadline = time.time() + 180
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}, see {log_path}")
+        try:
+            if httpx.get(url + "/readyz", timeout=1).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    process.kill()
+    raise RuntimeError(f"Server did not start within 180s, see {log_path}")
+
+
+def paced(fps, stop_at):
+    """Yield once per frame interval, like setInterval(captureAndSendFrame, 1000 / fps)"""
+    interval = 1.0 / fps if fps > 0 else 0.0
+    next_tick = time.perf_counter()
+    while time.perf_counter() < stop_at:
+        yield
+        next_tick += interval
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # Running behind: send immediately but don't burst to catch up
+            next_tick = time.perf_counter()
+
+
+def http_camera(url, frames, fps, stop_at, recorder, offset):
+    with httpx.Client(timeout=30) as client:
+        for i, _ in enumerate(paced(fps, stop_at)):
+            frame = frames[(offset + i) % len(frames)]
+            start = time.perf_counter()
+            try:
+                response = client.post(url + "/predict", files={"image": ("frame.jpg", frame, "image/jpeg")})
+                latency = (time.perf_counter() - start) * 1000.0
+                recorder.add(response.status_code, latency if response.status_code == 200 else None)
+            except httpx.HTTPError as e:
+                recorder.add(type(e).__name__)
+
+
+def ws_camera(url, frames, fps, stop_at, recorder, offset, drops):
+    import simple_websocket
+
+    ws = simple_websocket.Client.connect(url.replace("http://", "ws://") + "/predict/stream")
+    sent_at = {}
+
+    def receive():
+        while True:
+            try:
+                message = ws.receive(timeout=1)
+            except Exception:
+                return
+            if message is None:
+                if time.perf_counter() > stop_at + 1:
+                    return
+                continue
+            result = json.loads(message)
+            start = sent_at.pop(result.get("frame"), None)
+            if "error" in result or start is None:
+                recorder.add("error")
+                continue
+            recorder.add(200, (time.perf_counter() - start) * 1000.0)
+            drops[threading.get_ident()] = result.get("dropped", 0)
+
+    receiver = threading.Thread(target=receive, daemon=True)
+    receiver.start()
+    for i, _ in enumerate(paced(fps, stop_at)):
+        # The server numbers frames from 1 in arrival order
+        sent_at[i + 1] = time.perf_counter()
+        ws.send(frames[(offset + i) % len(frames)])
+    receiver.join(timeout=5)
+    ws.close()
+
+
+def chat_client(url, frame, interval, stop_at, recorder):
+    with httpx.Client(timeout=60) as client:
+        frame_id = client.post(url + "/predict", files={"image": ("frame.jpg", frame, "image/jpeg")}).json().get("frame_id")
+        session_id = uuid.uuid4().hex
+        while time.perf_counter() < stop_at:
+            body = {"session_id": session_id, "message": "How do I look?", "frame_id": frame_id,
+                    "emotion": "Neutral", "confidence": 80.0}
+            start = time.perf_counter()
+            first_token = None
+            status = "incomplete"
+            try:
+                with client.stream("POST", url + "/chat/stream", json=body) as response:
+                    status = response.status_code
+                    for line in response.iter_lines():
+                        if line == "event: token" and first_token is None:
+                            first_token = (time.perf_counter() - start) * 1000.0
+                        elif line == "event: error":
+                            status = "error"
+                        elif line == "event: done":
+                            status = 200
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            total = (time.perf_counter() - start) * 1000.0
+            recorder.add(status, total if status == 200 else None, first_token if status == 200 else None)
+            time.sleep(interval)
+
+
+def compare(results, baseline):
+    """Percent change of the headline numbers against a previous run"""
+    changes = {}
+    for kind in ("predict", "chat"):
+        for metric in ("rps", "p50_ms", "p95_ms", "p99_ms", "ttft_p50_ms"):
+            new = results.get(kind, {}).get(metric)
+            old = baseline.get(kind, {}).get(metric)
+            if new is not None and old:
+                changes[f"{kind}.{metric}"] = round((new - old) / old * 100.0, 1)
+    for metric in ("peak_rss_mb", "pss_mb"):
+        old = baseline.get("server", {}).get(metric)
+        new = results.get("server", {}).get(metric)
+        if old and new is not None:
+            changes[f"server.{metric}"] = round((new - old) / old * 100.0, 1)
+    return {"baseline_commit": baseline.get("commit"), "percent_change": changes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="Path to a .h5 model (defaults to a mock model)")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent camera clients")
+    parser.add_argument("--fps", type=float, default=10, help="Frames per second per client (0 = as fast as possible)")
+    parser.add_argument("--frame-size", default="640x480", help="WIDTHxHEIGHT of the webcam frames")
+    parser.add_argument("--distinct-frames", type=int, default=64, help="Frames cycled through by each client")
+    parser.add_argument("--transport", choices=("http", "ws"), default="http")
+    parser.add_argument("--chat-clients", type=int, default=0, help="Concurrent /chat/stream clients")
+    parser.add_argument("--chat-interval", type=float, default=1.0, help="Seconds between chats per client")
+    parser.add_argument("--llm-first-token-ms", type=float, default=200)
+    parser.add_argument("--llm-token-ms", type=float, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="Unmeasured seconds of load before measuring")
+    parser.add_argument("--workers", type=int, help="Serve with serve.py and this many workers")
+    parser.add_argument("--scaling", action="store_true", help="Repeat the run from 1 worker up to all cores")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra server environment")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results only")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.frame_size.lower().split("x"))
+    frames = synthetic_frames(width, height, args.distinct_frames)
+    server_env = dict(item.split("=", 1) for item in args.env)
+
+    model_path = args.model
+    if not model_path:
+        from mock_model import create_dummy_model
+        model_path = os.path.join(tempfile.mkdtemp(), "mock_model.h5")
+        # Keep stdout clean for --json
+        with contextlib.redirect_stdout(sys.stderr):
+            create_dummy_model(model_path)
+            backend = server_env.get("INFERENCE_BACKEND", "keras")
+            if backend != "keras":
+                subprocess.run([sys.executable, os.path.join(MODEL_DIR, "convert_models.py"), model_path,
+                                "--formats", backend], check=True, stdout=sys.stderr)
+
+    if args.scaling:
+        cores = os.cpu_count() or 1
+        counts = sorted({1, cores} | {2 ** i for i in range(cores.bit_length()) if 2 ** i <= cores})
+        runs = [run_once(args, frames, model_path, server_env, workers) for workers in counts]
+        results = dict(runs[-1])
+        results["scaling"] = [{
+            "workers": run["config"]["workers"],
+            "rps": run["predict"].get("rps"),
+            "p50_ms": run["predict"].get("p50_ms"),
+            "p95_ms": run["predict"].get("p95_ms"),
+            "p99_ms": run["predict"].get("p99_ms"),
+            "pss_mb": run["server"]["pss_mb"],
+            "speedup": round(run["predict"]["rps"] / runs[0]["predict"]["rps"], 2) if runs[0]["predict"]["rps"] else None,
+        } for run in runs]
+        results["cpu_count"] = cores
+    else:
+        results = run_once(args, frames, model_path, server_env, args.workers)
+
+    if args.compare:
+        with open(args.compare) as f:
+            results["comparison"] = compare(results, json.load(f))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results))
+        return
+    print(json.dumps(results, indent=2))
+
+
+def run_once(args, frames, model_path, server_env, workers):
+    """Start a server, apply the configured load and return the results dict"""
+    llm = FakeLLMServer(first_token_ms=args.llm_first_token_ms, token_ms=args.llm_token_ms).start()
+    env = {"GROQ_API_KEY": "fake-key", "GROQ_BASE_URL": llm.url}
+    env.update(server_env)
+    log_path = os.path.join(tempfile.gettempdir(), f"load_test_server_{args.port}.log")
+    try:
+        server, url = start_server(model_path, "127.0.0.1", args.port, env, log_path, workers)
+    except Exception:
+        llm.stop()
+        raise
+
+    predict, chat = Recorder(), Recorder()
+    drops = {}
+    stop_at = time.perf_counter() + args.warmup + args.duration
+    threads = []
+    for i in range(args.clients):
+        offset = i * len(frames) // max(1, args.clients)
+        if args.transport == "ws":
+            target, extra = ws_camera, (drops,)
+        else:
+            target, extra = http_camera, ()
+        threads.append(threading.Thread(target=target, args=(url, frames, args.fps, stop_at, predict, offset) + extra))
+    for _ in range(args.chat_clients):
+        threads.append(threading.Thread(target=chat_client, args=(url, frames[0], args.chat_interval, stop_at, chat)))
+
+    try:
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        time.sleep(args.warmup)
+        predict.recording = chat.recording = True
+        measure_start = time.perf_counter()
+        for thread in threads:
+            thread.join(timeout=max(0.0, stop_at - time.perf_counter()) + 10)
+        predict.recording = chat.recording = False
+        duration = min(time.perf_counter(), stop_at) - measure_start
+        memory = server_memory(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+        llm.stop()
+
+    results = {
+        "commit": git_commit(),
+        "config": {
+            "clients": args.clients, "fps": args.fps, "frame_size": "x".join(map(str, Image.open(BytesIO(frames[0])).size)),
+            "transport": args.transport, "chat_clients": args.chat_clients, "workers": workers or 1,
+            "duration_s": args.duration, "env": server_env,
+        },
+        "predict": predict.summary(duration),
+        "server": memory,
+    }
+    if args.transport == "ws":
+        results["predict"]["server_dropped_frames"] = sum(drops.values())
+    if args.chat_clients:
+        results["chat"] = chat.summary(duration)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+"""
+A local stand-in for the Groq chat completions API, so chat tests and
+benchmarks run offline with predictable latency.
+
+Point the backend at it with:
+    GROQ_API_KEY=fake GROQ_BASE_URL=http://127.0.0.1:8089 python app.py
+
+Run standalone:
+    python fake_llm_server.py --port 8089 --first-token-ms 200 --token-ms 20
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "It sounds like you're going through a lot right now. Take a slow breath, "
+    "step outside for a short walk, and be kind to yourself today."
+)
+
+
+class FakeLLMServer:
+    """OpenAI-compatible /openai/v1/chat/completions endpoint with streaming support"""
+
+    def __init__(self, host="127.0.0.1", port=0, reply=DEFAULT_REPLY, first_token_ms=0, token_ms=0):
+        self.reply = reply
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+        self.requests = 0
+        self.completed = 0
+        self.disconnects = 0
+        self.last_request = None
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self, field):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                fake._count("requests")
+                fake.last_request = body
+                time.sleep(fake.first_token_ms / 1000.0)
+                if body.get("stream"):
+                    self._stream(body)
+                else:
+                    self._complete(body)
+
+            def _complete(self, body):
+                time.sleep(fake.token_ms * len(fake.reply.split()) / 1000.0)
+                payload = json.dumps({
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": fake.reply},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": 20, "total_tokens": 30},
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                fake._count("completed")
+
+            def _stream(self, body):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                words = fake.reply.split(" ")
+                try:
+                    for i, word in enumerate(words):
+                        if i:
+                            time.sleep(fake.token_ms / 1000.0)
+                        self._send_event({
+                            "id": "chatcmpl-fake",
+                            "object": "chat.completion.chunk",
+                            "created": int(time.time()),
+                            "model": body.get("model", "fake"),
+                            "choices": [{
+                                "index": 0,
+                                "delta": {"content": word if i == 0 else " " + word},
+                                "finish_reason": None,
+                            }],
+                        })
+                    self._send_chunk(b"data: [DONE]\n\n")
+                    self._send_chunk(b"")
+                    fake._count("completed")
+                except (BrokenPipeError, ConnectionResetError):
+                    fake._count("disconnects")
+                    self.close_connection = True
+
+            def _send_event(self, event):
+                self._send_chunk(f"data: {json.dumps(event)}\n\n".encode())
+
+            def _send_chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--first-token-ms", type=float, default=200)
+    parser.add_argument("--token-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(port=args.port, first_token_ms=args.first_token_ms, token_ms=args.token_ms).start()
+    print(f"Fake LLM server listening on {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
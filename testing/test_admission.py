@@ -0,0 +1,153 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.model.admission import AdmissionController, Overloaded
+
+class Waiting(threading.Thread):
+    """Acquire a slot in the background and record whether it was granted or shed"""
+
+    def __init__(self, controller, client, priority, order):
+        super().__init__(daemon=True)
+        self.controller = controller
+        self.client = client
+        self.priority = priority
+        self.order = order
+        self.shed = None
+
+    def run(self):
+        try:
+            self.controller.acquire(self.client, self.priority)
+        except Overloaded as e:
+            self.shed = e.reason
+            return
+        self.order.append(self.client)
+        self.controller.release()
+
+def wait_queued(controller, count):
+    deadline = time.monotonic() + 2
+    while controller.queued() < count and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+class TestAdmissionController(unittest.TestCase):
+    def test_admits_up_to_limit(self):
+        controller = AdmissionController(max_concurrent=2, max_queue=0)
+        controller.acquire("a")
+        controller.acquire("b")
+        with self.assertRaises(Overloaded) as ctx:
+            controller.acquire("c")
+        self.assertEqual(ctx.exception.reason, "queue_full")
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+        controller.release()
+        controller.acquire("c")
+        self.assertEqual(controller.stats()["in_flight"], 2)
+
+    def test_priority_order(self):
+        """Interactive requests are served before live frames queued earlier"""
+        controller = AdmissionController(max_concurrent=1, max_queue=10, max_wait=5)
+        controller.acquire("holder")
+        order = []
+        threads = [Waiting(controller, "live-1", "live", order), Waiting(controller, "live-2", "live", order)]
+        threads.append(Waiting(controller, "upload", "interactive", order))
+        for i, thread in enumerate(threads):
+            thread.start()
+            wait_queued(controller, i + 1)
+        controller.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, ["upload", "live-1", "live-2"])
+
+    def test_round_robin_between_clients(self):
+        """A client with many queued requests does not starve one with a single request"""
+        controller = AdmissionController(max_concurrent=1, max_queue=10, max_wait=5)
+        controller.acquire("holder")
+        order = []
+        clients = ["busy", "busy", "busy", "quiet"]
+        threads = [Waiting(controller, client, "live", order) for client in clients]
+        for i, thread in enumerate(threads):
+            thread.start()
+            wait_queued(controller, i + 1)
+        controller.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, ["busy", "quiet", "busy", "busy"])
+
+    def test_per_client_limit(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=10, max_per_client=1, max_wait=5)
+        controller.acquire("holder")
+        first = Waiting(controller, "a", "live", [])
+        first.start()
+        wait_queued(controller, 1)
+        with self.assertRaises(Overloaded) as ctx:
+            controller.acquire("a", "live")
+        self.assertEqual(ctx.exception.reason, "client")
+        controller.release()
+        first.join()
+
+    def test_full_queue_preempts_lower_priority(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=1, max_wait=5)
+        controller.acquire("holder")
+        order = []
+        live = Waiting(controller, "camera", "live", order)
+        live.start()
+        wait_queued(controller, 1)
+        upload = Waiting(controller, "upload", "interactive", order)
+        upload.start()
+        live.join(2)
+        self.assertEqual(live.shed, "preempted")
+        wait_queued(controller, 1)
+        controller.release()
+        upload.join()
+        self.assertEqual(order, ["upload"])
+        self.assertEqual(controller.stats()["shed"]["live"], {"preempted": 1})
+
+    def test_wait_timeout(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=10, max_wait=0.05)
+        controller.acquire("holder")
+        start = time.perf_counter()
+        with self.assertRaises(Overloaded) as ctx:
+            controller.acquire("late")
+        self.assertEqual(ctx.exception.reason, "timeout")
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(controller.queued(), 0)
+
+    def test_sheds_fast_when_wait_would_be_too_long(self):
+        """Once slot hold times are known, a request that could not make max_wait is shed without waiting"""
+        controller = AdmissionController(max_concurrent=1, max_queue=10, max_wait=0.5)
+        controller.acquire("a")
+        controller.release(seconds=1.0)
+        controller.acquire("a")
+        start = time.perf_counter()
+        with self.assertRaises(Overloaded) as ctx:
+            controller.acquire("b")
+        self.assertEqual(ctx.exception.reason, "wait")
+        self.assertLess(time.perf_counter() - start, 0.1)
+        self.assertEqual(ctx.exception.retry_after, 1)
+
+    def test_slot_context_and_callbacks(self):
+        events = []
+        controller = AdmissionController(
+            max_concurrent=1, max_queue=0,
+            on_admit=lambda priority, seconds: events.append(("admit", priority)),
+            on_shed=lambda priority, reason: events.append(("shed", priority, reason)),
+        )
+        with controller.slot("a", "bulk"):
+            with self.assertRaises(Overloaded):
+                controller.acquire("b", "bulk")
+        self.assertEqual(events, [("admit", "bulk"), ("shed", "bulk", "queue_full")])
+        stats = controller.stats()
+        self.assertEqual(stats["in_flight"], 0)
+        self.assertEqual(stats["admitted"]["bulk"], 1)
+        self.assertIsNotNone(stats["avg_service_ms"])
+
+    def test_unknown_priority(self):
+        with self.assertRaises(ValueError):
+            AdmissionController().acquire("a", "urgent")
+
+if __name__ == '__main__':
+    unittest.main()
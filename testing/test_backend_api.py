@@ -20,6 +20,12 @@ except Exception as e:
 
 @unittest.skipIf(app is None, f"Skipping tests because app import failed: {app_import_error}")
 class TestBackendAPI(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # The model loads in the background by default; don't race the loader
+        from backend.model import app as app_module
+        app_module.startup.wait(timeout=120)
+
     def setUp(self):
         self.app = app.test_client()
         self.app.testing = True
@@ -31,6 +37,164 @@ class TestBackendAPI(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(data['message'], 'Flask backend is running!')
 
+    def test_health_endpoints(self):
+        """/healthz answers at once; /readyz reports every startup component"""
+        self.assertEqual(self.app.get('/healthz').status_code, 200)
+        response = self.app.get('/readyz')
+        self.assertIn(response.status_code, [200, 503])
+        data = json.loads(response.data)
+        self.assertEqual(data['ready'], response.status_code == 200)
+        self.assertIn('model', data['components'])
+
+    def test_metrics_endpoint(self):
+        """Request counters show up on /metrics in the Prometheus text format"""
+        self.app.get('/')
+        response = self.app.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        text = response.data.decode()
+        self.assertIn('# TYPE http_requests_total counter', text)
+        self.assertIn('http_requests_total{endpoint="/",method="GET",status="200"}', text)
+
+    def test_models_endpoint(self):
+        """/models lists the registry and rejects unknown versions"""
+        response = self.app.get('/models')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('active', json.loads(response.data))
+        response = self.app.post('/models/promote', json={'name': 'no-such-model'})
+        self.assertEqual(response.status_code, 404)
+        response = self.app.get('/models', environ_base={'REMOTE_ADDR': '203.0.113.7'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_predict_overloaded(self):
+        """A shed request gets a 429 with Retry-After instead of waiting"""
+        from unittest.mock import patch
+        from backend.model import app as app_module
+        img_io = BytesIO()
+        Image.new('L', (48, 48), color=128).save(img_io, 'JPEG')
+        # The app's own AdmissionController, so it raises the Overloaded the app catches
+        full = app_module.AdmissionController(max_concurrent=1, max_queue=0)
+        full.acquire('someone-else')
+        with patch.object(app_module, 'admission', full):
+            response = self.app.post(
+                '/predict',
+                data={'image': (BytesIO(img_io.getvalue()), 'test.jpg')},
+                content_type='multipart/form-data'
+            )
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response.headers)
+
+    def test_analyze_video_too_large(self):
+        """Uploads over VIDEO_MAX_BYTES are refused before the body is parsed"""
+        from unittest.mock import patch
+        from backend.model import app as app_module
+        with patch.object(app_module, 'VIDEO_MAX_BYTES', 1000):
+            response = self.app.post('/analyze/video', data={'video': (BytesIO(b'x' * 5000), 'clip.mp4')})
+        self.assertEqual(response.status_code, 413)
+        self.assertIn('error', json.loads(response.data))
+
+    def test_chat_stream_store_error(self):
+        """A failing conversation store gives a JSON error instead of an HTML 500 page"""
+        from unittest.mock import patch
+        from backend.model import app as app_module
+        with patch.object(app_module.conversations, 'history', side_effect=RuntimeError('database is locked')):
+            response = self.app.post('/chat/stream', json={'message': 'hi', 'session_id': 's1'})
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(json.loads(response.data), {'error': 'Internal server error'})
+
+    def test_jobs_endpoints(self):
+        """Jobs are only visible to the holder of their token; listing them all is an admin call"""
+        import tempfile
+        import zipfile
+        from unittest.mock import patch
+        from backend.model import app as app_module
+        img_io = BytesIO()
+        Image.new('L', (48, 48), color=128).save(img_io, 'JPEG')
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('a.jpg', img_io.getvalue())
+            zf.writestr('b.jpg', img_io.getvalue())
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Never started, so jobs stay queued
+            queue = app_module.JobQueue(os.path.join(tmp_dir, 'jobs.db'), app_module.JOB_HANDLERS, workers=0)
+            with patch.object(app_module, 'jobs', queue):
+                response = self.app.post('/jobs', json={'kind': 'nope'})
+                self.assertEqual(response.status_code, 400)
+                response = self.app.post('/jobs', data={
+                    'kind': 'score_images', 'archive': (BytesIO(archive.getvalue()), 'frames.zip')
+                })
+                self.assertEqual(response.status_code, 202)
+                job = json.loads(response.data)
+                self.assertEqual(len(os.listdir(queue.job_dir(job['id']))), 2)
+
+                self.assertEqual(self.app.get(f"/jobs/{job['id']}").status_code, 404)
+                self.assertEqual(self.app.get(f"/jobs/{job['id']}/result", headers={'X-Job-Token': 'guess'}).status_code, 404)
+                self.assertEqual(self.app.delete(f"/jobs/{job['id']}").status_code, 404)
+                response = self.app.get(f"/jobs/{job['id']}", headers={'X-Job-Token': job['token']})
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('token', json.loads(response.data))
+
+                self.assertEqual(self.app.get('/jobs', environ_base={'REMOTE_ADDR': '203.0.113.7'}).status_code, 403)
+                response = self.app.get('/jobs')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual([j['id'] for j in json.loads(response.data)['jobs']], [job['id']])
+
+                self.assertEqual(self.app.post('/jobs', json={'kind': 'summarize_session', 'session_id': 's1'}).status_code, 400)
+                session_id = 'c0ffee00-0000-4000-8000-000000000000'
+                self.assertEqual(
+                    self.app.post('/jobs', json={'kind': 'summarize_session', 'session_id': session_id}).status_code, 404
+                )
+
+                response = self.app.delete(f"/jobs/{job['id']}", headers={'X-Job-Token': job['token']})
+                self.assertEqual(response.status_code, 202)
+            queue.store.close()
+
+    def test_profiling_header(self):
+        """X-Profile from localhost profiles the request and names the saved profile"""
+        response = self.app.get('/', headers={'X-Profile': '1'})
+        response.close()
+        self.assertIn('X-Profile-Id', response.headers)
+        from backend.model import app as app_module
+        self.assertEqual(app_module.profiler.stats()['active'], 0)
+        response = self.app.get('/profiling', environ_base={'REMOTE_ADDR': '203.0.113.7'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_timeline_endpoints(self):
+        """Only X-Timeline-Session opts a prediction into the timeline, which only localhost may read"""
+        import tempfile
+        from unittest.mock import patch
+        from backend.model import app as app_module
+        img_io = BytesIO()
+        Image.new('L', (48, 48), color=128).save(img_io, 'JPEG')
+
+        def post(headers, remote_addr='127.0.0.1'):
+            return self.app.post('/predict', data={'image': (BytesIO(img_io.getvalue()), 'frame.jpg')}, headers=headers,
+                                 environ_base={'REMOTE_ADDR': remote_addr})
+
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                patch.object(app_module, 'timelines', app_module.TimelineStore(tmp_dir, app_module.CLASS_NAMES)):
+            self.assertEqual(post({'X-Session-ID': 'routing-only', 'X-User-ID': 'tester'}).status_code, 200)
+            self.assertEqual(post({'X-Timeline-Session': 'timeline-test', 'X-User-ID': 'tester'}).status_code, 200)
+            self.assertEqual(post({'X-Timeline-Session': '../bad'}).status_code, 400)
+            # A caller who may not read timelines cannot write under someone else's name
+            self.assertEqual(post({'X-Timeline-Session': 'spoofed', 'X-User-ID': 'tester'}, '203.0.113.7').status_code, 200)
+            response = self.app.get('/timeline/anonymous/sessions')
+            self.assertEqual([s['session'] for s in json.loads(response.data)['sessions']], ['spoofed'])
+            response = self.app.get('/timeline/tester/sessions')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([s['session'] for s in json.loads(response.data)['sessions']], ['timeline-test'])
+            response = self.app.get('/timeline/tester/timeline-test?bucket=60')
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.data)
+            self.assertEqual(data['frames'], 1)
+            self.assertEqual(sum(data['histogram'].values()), 1)
+            self.assertEqual(self.app.get('/timeline/tester/timeline-test?bucket=0').status_code, 400)
+            response = self.app.delete('/timeline/tester/timeline-test', environ_base={'REMOTE_ADDR': '203.0.113.7'})
+            self.assertEqual(response.status_code, 403)
+            self.assertEqual(self.app.delete('/timeline/tester/timeline-test').status_code, 200)
+            self.assertEqual(self.app.get('/timeline/tester/timeline-test').status_code, 404)
+
     def test_predict_endpoint_no_image(self):
         """Test predict endpoint with missing image"""
         response = self.app.post('/predict')
@@ -59,10 +223,83 @@ class TestBackendAPI(unittest.TestCase):
             data = json.loads(response.data)
             self.assertIn('prediction', data)
             self.assertIn('confidence', data)
+            self.assertIn('frame_id', data)
+            self.assertIn('model', data)
         elif response.status_code == 503:
             data = json.loads(response.data)
             self.assertIn('Model not loaded', data.get('error', ''))
 
+    def test_predict_batch_no_images(self):
+        """Test batch predict endpoint with nothing uploaded"""
+        response = self.app.post('/predict/batch')
+        self.assertIn(response.status_code, [400, 503])
+        self.assertIn('error', json.loads(response.data))
+
+    def test_predict_batch_with_images(self):
+        """Test batch predict endpoint with a multipart list of images"""
+        files = []
+        for i in range(3):
+            img_io = BytesIO()
+            Image.new('RGB', (64, 64), color=(40 * i, 80, 120)).save(img_io, 'JPEG')
+            img_io.seek(0)
+            files.append((img_io, f'frame_{i}.jpg'))
+        files.append((BytesIO(b'not an image'), 'broken.jpg'))
+
+        response = self.app.post('/predict/batch', data={'images': files})
+        self.assertIn(response.status_code, [200, 503])
+
+        if response.status_code == 200:
+            data = json.loads(response.data)
+            self.assertEqual(data['count'], 4)
+            self.assertEqual([r['filename'] for r in data['results']],
+                             ['frame_0.jpg', 'frame_1.jpg', 'frame_2.jpg', 'broken.jpg'])
+            for result in data['results'][:3]:
+                self.assertIn('prediction', result)
+                self.assertEqual(len(result['all_emotions']), 7)
+            self.assertIn('error', data['results'][3])
+
+    def test_predict_batch_with_zip_archive(self):
+        """Test batch predict endpoint with a zip archive of images"""
+        import zipfile
+        archive_io = BytesIO()
+        with zipfile.ZipFile(archive_io, 'w') as archive:
+            for i in range(2):
+                img_io = BytesIO()
+                Image.new('L', (48, 48), color=60 * i).save(img_io, 'PNG')
+                archive.writestr(f'session/frame_{i}.png', img_io.getvalue())
+        archive_io.seek(0)
+
+        response = self.app.post('/predict/batch', data={'archive': (archive_io, 'frames.zip')})
+        self.assertIn(response.status_code, [200, 503])
+
+        if response.status_code == 200:
+            data = json.loads(response.data)
+            self.assertEqual(data['count'], 2)
+            self.assertTrue(all('prediction' in r for r in data['results']))
+
+    def test_predict_faces_endpoint(self):
+        """Test face detection endpoint returns a list of boxed predictions"""
+        team_photo = os.path.join(os.path.dirname(__file__), '../frontend/src/assets/team/utkarsh.jpeg')
+        with open(team_photo, 'rb') as f:
+            img_io = BytesIO(f.read())
+
+        response = self.app.post('/predict/faces', data={'image': (img_io, 'frame.jpg')})
+        self.assertIn(response.status_code, [200, 503])
+
+        if response.status_code == 200:
+            data = json.loads(response.data)
+            self.assertEqual(data['count'], len(data['faces']))
+            self.assertGreaterEqual(data['count'], 1)
+            for face in data['faces']:
+                self.assertEqual(set(face['box']), {'x', 'y', 'width', 'height'})
+                self.assertIn('prediction', face)
+                self.assertEqual(len(face['all_emotions']), 7)
+
+    def test_predict_faces_no_image(self):
+        """Test face detection endpoint with missing image"""
+        response = self.app.post('/predict/faces')
+        self.assertIn(response.status_code, [400, 503])
+
     def test_chat_endpoint_no_message_no_image(self):
         """Test chat endpoint with no message and no image"""
         response = self.app.post(
@@ -117,6 +354,15 @@ class TestBackendAPI(unittest.TestCase):
             data = json.loads(response.data)
             self.assertIn('error', data)
 
+    def test_chat_request_resolves_frame_id(self):
+        """A frame_id from /predict stands in for the base64 image"""
+        from backend.model.app import frame_store, parse_chat_request
+        frame_id = frame_store.put(b'jpeg bytes')
+        _, image_data, _ = parse_chat_request({'message': 'Hi', 'frame_id': frame_id})
+        self.assertEqual(image_data, b'jpeg bytes')
+        _, image_data, _ = parse_chat_request({'message': 'Hi', 'frame_id': 'expired'})
+        self.assertIsNone(image_data)
+
     def test_chat_api_key_validation(self):
         """Test that the chat endpoint validates the API key"""
         # This test assumes the Groq API client is initialized with error handling
@@ -0,0 +1,94 @@
+import unittest
+import sys
+import os
+import threading
+import time
+import numpy as np
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from backend.model.batching import MicroBatcher
+    import_error = None
+except Exception as e:
+    import_error = str(e)
+    MicroBatcher = None
+
+@unittest.skipIf(MicroBatcher is None, f"Skipping tests because import failed: {import_error}")
+class TestMicroBatcher(unittest.TestCase):
+    def setUp(self):
+        self.batch_sizes = []
+
+    def tearDown(self):
+        self.batcher.close(timeout=2)
+
+    def _predict(self, batch):
+        self.batch_sizes.append(len(batch))
+        # Echo the mean pixel value so each caller can recognise its own row
+        return batch.reshape(len(batch), -1).mean(axis=1, keepdims=True)
+
+    def test_single_request(self):
+        """A lone request is served after the wait window"""
+        self.batcher = MicroBatcher(self._predict, max_batch_size=8, max_wait_ms=1)
+        result = self.batcher.predict(np.full((1, 48, 48, 1), 0.5, dtype=np.float32), timeout=2)
+        self.assertEqual(result.shape, (1, 1))
+        self.assertAlmostEqual(float(result[0, 0]), 0.5, places=5)
+
+    def test_concurrent_requests_share_a_batch(self):
+        """Concurrent requests are coalesced and each gets its own result back"""
+        self.batcher = MicroBatcher(self._predict, max_batch_size=16, max_wait_ms=200)
+        results = {}
+
+        def worker(i):
+            x = np.full((1, 48, 48, 1), i / 10.0, dtype=np.float32)
+            results[i] = float(self.batcher.predict(x, timeout=5)[0, 0])
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        for i in range(8):
+            self.assertAlmostEqual(results[i], i / 10.0, places=5)
+        self.assertLess(len(self.batch_sizes), 8, "Requests should have been batched together")
+        self.assertEqual(sum(self.batch_sizes), 8)
+
+    def test_max_batch_size_respected(self):
+        """No forward pass exceeds max_batch_size rows"""
+        self.batcher = MicroBatcher(self._predict, max_batch_size=4, max_wait_ms=50)
+        futures = [self.batcher.submit(np.zeros((1, 48, 48, 1), dtype=np.float32)) for _ in range(10)]
+        for f in futures:
+            f.result(timeout=5)
+        self.assertTrue(all(size <= 4 for size in self.batch_sizes))
+        self.assertEqual(sum(self.batch_sizes), 10)
+
+    def test_multi_row_submission(self):
+        """Submissions with several rows get back the same number of rows"""
+        self.batcher = MicroBatcher(self._predict, max_batch_size=8, max_wait_ms=20)
+        first = self.batcher.submit(np.ones((3, 48, 48, 1), dtype=np.float32))
+        second = self.batcher.submit(np.zeros((2, 48, 48, 1), dtype=np.float32))
+        self.assertEqual(first.result(timeout=2).shape, (3, 1))
+        self.assertEqual(second.result(timeout=2).shape, (2, 1))
+        self.assertTrue(np.allclose(first.result(), 1.0))
+        self.assertTrue(np.allclose(second.result(), 0.0))
+
+    def test_errors_propagate_to_callers(self):
+        """An exception in the forward pass is raised in every waiting request"""
+        def failing(batch):
+            raise ValueError("boom")
+
+        self.batcher = MicroBatcher(failing, max_batch_size=8, max_wait_ms=1)
+        with self.assertRaises(ValueError):
+            self.batcher.predict(np.zeros((1, 48, 48, 1), dtype=np.float32), timeout=2)
+
+    def test_submit_after_close(self):
+        """A closed batcher refuses new work"""
+        self.batcher = MicroBatcher(self._predict)
+        self.batcher.close(timeout=2)
+        with self.assertRaises(RuntimeError):
+            self.batcher.submit(np.zeros((1, 48, 48, 1), dtype=np.float32))
+
+if __name__ == '__main__':
+    unittest.main()
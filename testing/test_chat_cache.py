@@ -0,0 +1,137 @@
+import unittest
+import sys
+import os
+import threading
+import time
+from unittest.mock import patch
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from fake_llm_server import FakeLLMServer, DEFAULT_REPLY
+from backend.model.chat_cache import ChatResponseCache, bucket_confidence, normalize_message
+
+try:
+    from backend.model.emotion_agent import EmotionAgent
+    import_error = None
+except Exception as e:
+    import_error = str(e)
+    EmotionAgent = None
+
+class TestNormalization(unittest.TestCase):
+    def test_bucket_confidence(self):
+        self.assertEqual(bucket_confidence(62.3), 65)
+        self.assertEqual(bucket_confidence(60.0), 65)
+        self.assertEqual(bucket_confidence(100.0), 105)
+        self.assertEqual(bucket_confidence(3.0, width=5), 2)
+
+    def test_normalize_message(self):
+        """Case, whitespace and confidences in the same bucket do not change the key"""
+        a = normalize_message("I'm feeling  Sad with about 62.3% intensity")
+        b = normalize_message("i'm feeling sad with about 68% intensity ")
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, normalize_message("I'm feeling sad with about 72% intensity"))
+
+    def test_key(self):
+        cache = ChatResponseCache()
+        self.assertEqual(cache.key("Hi", "sad", 61.0, "m"), cache.key("hi ", "Sad", 69.0, "m"))
+        self.assertNotEqual(cache.key("Hi", "sad", 61.0, "m"), cache.key("Hi", "happy", 61.0, "m"))
+        self.assertNotEqual(cache.key("Hi", "sad", 61.0, "m"), cache.key("Hi", "sad", 61.0, "other"))
+
+class TestChatResponseCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = ChatResponseCache(max_entries=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "1")
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        cache = ChatResponseCache(ttl=0.05)
+        cache.put("a", "1")
+        self.assertEqual(cache.get("a"), "1")
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("a"))
+
+    def test_hit_after_miss(self):
+        cache = ChatResponseCache()
+        calls = []
+        compute = lambda: calls.append(1) or ("reply", None)
+        self.assertEqual(cache.get_or_compute("k", compute), ("reply", None, "miss"))
+        self.assertEqual(cache.get_or_compute("k", compute), ("reply", None, "hit"))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats()["upstream_calls_saved"], 1)
+
+    def test_errors_not_cached(self):
+        cache = ChatResponseCache()
+        self.assertEqual(cache.get_or_compute("k", lambda: (None, "boom")), (None, "boom", "miss"))
+        self.assertEqual(cache.get_or_compute("k", lambda: ("ok", None)), ("ok", None, "miss"))
+
+    def test_single_flight(self):
+        """Concurrent identical requests make one upstream call and share its reply"""
+        cache = ChatResponseCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return "reply", None
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(outcome for _, _, outcome in results), ["coalesced"] * 7 + ["miss"])
+        self.assertTrue(all(reply == "reply" for reply, _, _ in results))
+
+@unittest.skipIf(EmotionAgent is None, f"Skipping tests because import failed: {import_error}")
+class TestChatCacheAgainstFakeServer(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeLLMServer(first_token_ms=200, token_ms=0).start()
+        env = {"GROQ_API_KEY": "fake-key", "GROQ_BASE_URL": self.server.url, "CHAT_TIMEOUT": "5"}
+        with patch.dict(os.environ, env):
+            self.agent = EmotionAgent()
+        self.cache = ChatResponseCache()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def ask(self, message, confidence):
+        emotions = [{"emotion": "sad", "confidence": confidence}]
+        key = self.cache.key(message, "sad", confidence, "test-model")
+        return self.cache.get_or_compute(key, lambda: self.agent.chat(message, None, emotions))
+
+    def test_concurrent_users_share_one_call(self):
+        """A burst of users with the same emotion costs one upstream request"""
+        results = []
+        threads = [
+            threading.Thread(target=lambda c=c: results.append(self.ask(f"I feel sad at {c}%", c)))
+            for c in (61.0, 63.5, 66.0, 68.9)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.ask("I feel sad at 64%", 64.0)
+
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(len({reply for reply, _, _ in results}), 1)
+        self.assertIn(DEFAULT_REPLY, results[0][0])
+        stats = self.cache.stats()
+        self.assertEqual(stats["upstream_calls"], 1)
+        self.assertEqual(stats["upstream_calls_saved"], 4)
+        self.assertLess(stats["avg_hit_ms"], stats["avg_upstream_ms"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import sys
+import os
+import time
+from unittest.mock import patch
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from fake_llm_server import FakeLLMServer, DEFAULT_REPLY
+
+try:
+    from backend.model.emotion_agent import EmotionAgent
+    import_error = None
+except Exception as e:
+    import_error = str(e)
+    EmotionAgent = None
+
+@unittest.skipIf(EmotionAgent is None, f"Skipping tests because import failed: {import_error}")
+class TestChatAgainstFakeServer(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeLLMServer(first_token_ms=100, token_ms=20).start()
+        env = {"GROQ_API_KEY": "fake-key", "GROQ_BASE_URL": self.server.url, "CHAT_TIMEOUT": "5"}
+        with patch.dict(os.environ, env):
+            self.agent = EmotionAgent()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_blocking_chat(self):
+        """The non-streaming path still returns the full reply"""
+        response, error = self.agent.chat("Hello there", None, None)
+        self.assertIsNone(error)
+        self.assertEqual(response, DEFAULT_REPLY)
+
+    def test_history_sent_upstream(self):
+        """Earlier turns are replayed between the system prompt and the new message"""
+        history = [
+            {"role": "user", "content": "I failed my exam"},
+            {"role": "assistant", "content": "That must be hard"},
+        ]
+        response, error = self.agent.chat("What should I do now?", None, None, history)
+        self.assertIsNone(error)
+        messages = self.server.last_request['messages']
+        self.assertEqual([m['role'] for m in messages], ['system', 'user', 'assistant', 'user'])
+        self.assertEqual(messages[1]['content'], 'I failed my exam')
+        self.assertEqual(messages[-1]['content'], 'What should I do now?')
+
+    def test_stream_yields_tokens_then_done(self):
+        """Streaming yields the reply piece by piece and reports time-to-first-token"""
+        events = list(self.agent.chat_stream("Hello there", None, None))
+        tokens = [e['content'] for e in events if e['type'] == 'token']
+        self.assertGreater(len(tokens), 1)
+        self.assertEqual(''.join(tokens), DEFAULT_REPLY)
+
+        done = events[-1]
+        self.assertEqual(done['type'], 'done')
+        self.assertGreaterEqual(done['ttft_ms'], 100)
+        self.assertLess(done['ttft_ms'], done['total_ms'])
+
+    def test_first_token_before_completion(self):
+        """The first token arrives well before the whole reply is generated"""
+        start = time.perf_counter()
+        stream = self.agent.chat_stream("Hello there", None, None)
+        first = next(stream)
+        first_at = time.perf_counter() - start
+        list(stream)
+        total = time.perf_counter() - start
+        self.assertEqual(first['type'], 'token')
+        self.assertLess(first_at, total / 2)
+
+    def test_stage_timings_reported(self):
+        """on_timing receives the upstream latency of blocking and streamed calls"""
+        timings = []
+        self.agent.on_timing = lambda stage, seconds: timings.append((stage, seconds))
+        self.agent.chat("Hello there", None, None)
+        list(self.agent.chat_stream("Hello there", None, None))
+        stages = [stage for stage, _ in timings]
+        self.assertEqual(stages, ['chat_upstream', 'chat_first_token', 'chat_upstream'])
+        self.assertTrue(all(seconds >= 0.1 for _, seconds in timings))
+
+    def test_closing_stream_cancels_upstream(self):
+        """Abandoning the generator closes the upstream response"""
+        stream = self.agent.chat_stream("Hello there", None, None)
+        next(stream)
+        stream.close()
+        # The fake server notices the broken pipe on its next write
+        deadline = time.time() + 3
+        while self.server.disconnects == 0 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self.server.disconnects, 1)
+        self.assertEqual(self.server.completed, 0)
+
+    def test_stream_reports_upstream_errors(self):
+        """Connection failures become a single error event"""
+        self.server.stop()
+        with patch.dict(os.environ, {"GROQ_API_KEY": "fake-key", "GROQ_BASE_URL": "http://127.0.0.1:9", "CHAT_TIMEOUT": "1"}):
+            agent = EmotionAgent()
+        agent.client = agent.client.with_options(max_retries=0)
+        events = list(agent.chat_stream("Hello", None, None))
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]['type'], 'error')
+        self.assertIn('API Error', events[0]['error'])
+        # Restart so tearDown can stop it again
+        self.server = FakeLLMServer().start()
+
+    def test_stream_without_client(self):
+        """A missing API key is reported as an error event"""
+        self.agent.client = None
+        events = list(self.agent.chat_stream("Hello", None, None))
+        self.assertEqual(events, [{"type": "error", "error": "API Error: Groq client not initialized"}])
+
+if __name__ == '__main__':
+    unittest.main()
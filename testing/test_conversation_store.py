@@ -0,0 +1,135 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from backend.model.conversation_store import ConversationStore, SqliteConversationBackend
+    import_error = None
+except Exception as e:
+    import_error = str(e)
+    ConversationStore = None
+
+def turn(user, assistant):
+    return {"role": "user", "content": user}, {"role": "assistant", "content": assistant}
+
+@unittest.skipIf(ConversationStore is None, f"Skipping tests because import failed: {import_error}")
+class TestConversationStore(unittest.TestCase):
+    def test_sessions_are_isolated(self):
+        """Each session keeps its own history and clearing one leaves the others"""
+        store = ConversationStore()
+        store.append('alice', *turn('I feel sad', 'Sorry to hear that'))
+        store.append('bob', *turn('I feel happy', 'Great!'))
+        store.clear('alice')
+        self.assertEqual(store.history('alice'), [])
+        self.assertEqual([m['content'] for m in store.history('bob')], ['I feel happy', 'Great!'])
+
+    def test_history_is_a_copy(self):
+        """Callers cannot mutate the stored history"""
+        store = ConversationStore()
+        store.append('s', *turn('hi', 'hello'))
+        store.history('s').append({"role": "user", "content": "injected"})
+        self.assertEqual(len(store.history('s')), 2)
+
+    def test_token_budget_trims_oldest_turns(self):
+        """Old turns are dropped once the token budget is exceeded"""
+        store = ConversationStore(max_tokens=60)
+        for i in range(10):
+            store.append('s', *turn(f'message {i} ' + 'x' * 40, f'reply {i}'))
+        history = store.history('s')
+        self.assertLess(len(history), 20)
+        self.assertEqual(history[0]['role'], 'user')
+        self.assertIn('reply 9', history[-1]['content'])
+
+    def test_message_cap(self):
+        """No more than max_messages are kept"""
+        store = ConversationStore(max_messages=4, max_tokens=10000)
+        for i in range(5):
+            store.append('s', *turn(f'u{i}', f'a{i}'))
+        self.assertEqual([m['content'] for m in store.history('s')], ['u3', 'a3', 'u4', 'a4'])
+
+    def test_lru_eviction(self):
+        """The least recently used session is evicted when the store is full"""
+        store = ConversationStore(max_sessions=2)
+        store.append('a', *turn('1', '1'))
+        store.append('b', *turn('2', '2'))
+        store.history('a')
+        store.append('c', *turn('3', '3'))
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.history('b'), [])
+        self.assertEqual(len(store.history('a')), 2)
+
+    def test_ttl_expiry(self):
+        """Idle sessions expire"""
+        store = ConversationStore(ttl=0.05)
+        store.append('s', *turn('hi', 'hello'))
+        time.sleep(0.1)
+        self.assertEqual(store.history('s'), [])
+
+    def test_concurrent_appends(self):
+        """Concurrent appends to different sessions do not interfere"""
+        store = ConversationStore(max_tokens=100000, max_messages=1000)
+
+        def worker(name):
+            for i in range(50):
+                store.append(name, *turn(f'{name}-{i}', 'ok'))
+
+        threads = [threading.Thread(target=worker, args=(f'user{n}',)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for n in range(8):
+            self.assertEqual(len(store.history(f'user{n}')), 100)
+
+@unittest.skipIf(ConversationStore is None, f"Skipping tests because import failed: {import_error}")
+class TestSqliteConversationBackend(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'conversations.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_history_survives_restart(self):
+        """A new store on the same file sees earlier conversations"""
+        first = ConversationStore(backend=SqliteConversationBackend(self.path))
+        first.append('s', *turn('remember me', 'I will'))
+        first.backend.close()
+
+        second = ConversationStore(backend=SqliteConversationBackend(self.path))
+        self.assertEqual([m['content'] for m in second.history('s')], ['remember me', 'I will'])
+        second.clear('s')
+        self.assertIsNone(second.backend.load('s'))
+        second.backend.close()
+
+    def test_ttl_expiry_with_backend(self):
+        """Expired sessions are not reloaded from the backend and get purged from it"""
+        store = ConversationStore(ttl=0.05, backend=SqliteConversationBackend(self.path), purge_interval=0)
+        store.append('s', *turn('hi', 'hello'))
+        time.sleep(0.1)
+        self.assertEqual(store.history('s'), [])
+        self.assertIsNone(store.backend.load('s'))
+        store.backend.close()
+
+    def test_shared_stores_see_each_others_turns(self):
+        """With shared=True, a worker picks up turns appended by another worker"""
+        first = ConversationStore(backend=SqliteConversationBackend(self.path), shared=True)
+        second = ConversationStore(backend=SqliteConversationBackend(self.path), shared=True)
+        first.append('s', *turn('hello', 'hi'))
+        self.assertEqual(len(second.history('s')), 2)
+        second.append('s', *turn('how are you', 'fine'))
+        self.assertEqual([m['content'] for m in first.history('s')], ['hello', 'hi', 'how are you', 'fine'])
+        second.clear('s')
+        self.assertEqual(first.history('s'), [])
+        first.backend.close()
+        second.backend.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import time
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.model.frame_store import FrameStore, SqliteFrameStore
+
+class TestFrameStore(unittest.TestCase):
+    def test_put_then_get(self):
+        """Stored frames come back byte for byte under their ID"""
+        store = FrameStore()
+        frame_id = store.put(b'\xff\xd8frame')
+        self.assertEqual(store.get(frame_id), b'\xff\xd8frame')
+        self.assertIsNone(store.get('unknown'))
+        self.assertEqual(store.stats()['hits'], 1)
+        self.assertEqual(store.stats()['misses'], 1)
+
+    def test_ids_are_unique(self):
+        """The same bytes uploaded twice get two IDs"""
+        store = FrameStore()
+        self.assertNotEqual(store.put(b'same'), store.put(b'same'))
+
+    def test_frame_count_bounded(self):
+        """The least recently used frame is evicted first"""
+        store = FrameStore(max_frames=2)
+        first = store.put(b'1')
+        second = store.put(b'2')
+        store.get(first)
+        store.put(b'3')
+        self.assertEqual(len(store), 2)
+        self.assertIsNone(store.get(second))
+        self.assertEqual(store.get(first), b'1')
+
+    def test_total_bytes_bounded(self):
+        """Frames are evicted to stay within the byte budget"""
+        store = FrameStore(max_bytes=10)
+        first = store.put(b'x' * 6)
+        store.put(b'y' * 6)
+        self.assertIsNone(store.get(first))
+        self.assertEqual(store.stats()['bytes'], 6)
+        self.assertIsNone(store.put(b'z' * 11))
+
+    def test_expired_frames_dropped(self):
+        """Frames older than the TTL are no longer returned"""
+        store = FrameStore(ttl=0.05)
+        frame_id = store.put(b'old')
+        time.sleep(0.1)
+        self.assertIsNone(store.get(frame_id))
+        self.assertEqual(store.stats()['bytes'], 0)
+
+class TestSqliteFrameStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'frames.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_frame_id_resolves_across_stores(self):
+        """A frame stored by one worker is found by another sharing the file"""
+        first = FrameStore(store=SqliteFrameStore(self.path))
+        second = FrameStore(store=SqliteFrameStore(self.path))
+        frame_id = first.put(b'\xff\xd8shared')
+        self.assertEqual(second.get(frame_id), b'\xff\xd8shared')
+        self.assertIsNone(second.get('unknown'))
+        first.store.close()
+        second.store.close()
+
+    def test_expired_rows_ignored(self):
+        """Shared entries past their TTL are not returned"""
+        store = SqliteFrameStore(self.path)
+        store.put('old', b'data', ttl=-1)
+        self.assertIsNone(store.get('old'))
+        store.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.model.jobs import JobQueue, JobStore
+
+MODEL_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend', 'model'))
+TFLITE_MODEL = os.path.join(MODEL_DIR, 'models', 'model.tflite')
+
+# Handlers run in the worker processes, which import them from this module
+def count_job(params, job):
+    for i in range(params["steps"]):
+        time.sleep(params.get("delay", 0))
+        job.progress((i + 1) / params["steps"], f"step {i + 1}")
+    return {"total": params["steps"]}
+
+def failing_job(params, job):
+    raise RuntimeError("boom")
+
+HANDLERS = {
+    "count": "testing.test_jobs:count_job",
+    "fail": "testing.test_jobs:failing_job",
+    "score_images": "analysis_jobs:score_images",
+}
+
+def wait_for(queue, job_id, statuses=("succeeded", "failed", "cancelled"), timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} still {queue.get(job_id)['status']}")
+
+class TestJobStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = JobStore(os.path.join(self.tmp_dir, "jobs.db"))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_claim_in_order_once(self):
+        first = self.store.submit("count", {"n": 1})
+        time.sleep(0.01)
+        second = self.store.submit("count", {"n": 2})
+        self.assertEqual(self.store.claim(1), (first, "count", {"n": 1}))
+        self.assertEqual(self.store.claim(2)[0], second)
+        self.assertIsNone(self.store.claim(3))
+        self.assertEqual(self.store.get(first)["status"], "running")
+
+    def test_cancel(self):
+        """A queued job is cancelled at once; a running one is flagged for its handler"""
+        queued = self.store.submit("count", {})
+        self.assertEqual(self.store.cancel(queued), "cancelled")
+        running = self.store.submit("count", {})
+        self.store.claim(1)
+        self.assertEqual(self.store.cancel(running), "running")
+        self.assertTrue(self.store.update_progress(running, 0.5))
+        self.assertTrue(self.store.get(running)["cancel_requested"])
+        self.assertIsNone(self.store.cancel("missing"))
+
+    def test_access_token(self):
+        """Only the token a job was submitted with grants access to it, and it is stored hashed"""
+        job_id = self.store.submit("count", {}, token="secret-token")
+        self.assertTrue(self.store.check_token(job_id, "secret-token"))
+        self.assertFalse(self.store.check_token(job_id, "guess"))
+        self.assertFalse(self.store.check_token(job_id, None))
+        self.assertFalse(self.store.check_token("missing", "secret-token"))
+        self.assertFalse(self.store.check_token(self.store.submit("count", {}), ""))
+        with open(self.store.path, "rb") as f:
+            self.assertNotIn(b"secret-token", f.read())
+
+    def test_orphaned_jobs_fail(self):
+        job_id = self.store.submit("count", {})
+        self.store.claim(12345)
+        self.assertEqual(self.store.fail_orphans(lambda pid: False), 1)
+        self.assertEqual(self.store.get(job_id)["status"], "failed")
+
+    def test_retention(self):
+        """Finished jobs beyond max_jobs or older than retention are removed with their files"""
+        ids = []
+        for i in range(3):
+            job_id = self.store.submit("count", {})
+            self.store.job_dir(job_id)
+            self.store.claim(1)
+            self.store.finish(job_id, "succeeded", result={"i": i})
+            ids.append(job_id)
+            time.sleep(0.01)
+        pending = self.store.submit("count", {})
+        self.assertEqual(self.store.purge(retention=3600, max_jobs=1), 2)
+        self.assertIsNone(self.store.get(ids[0]))
+        self.assertFalse(os.path.exists(self.store.job_dir(ids[0], create=False)))
+        self.assertEqual(self.store.get(ids[2], with_result=True)["result"], {"i": 2})
+        self.assertEqual(self.store.purge(retention=0, max_jobs=10), 1)
+        self.assertEqual(self.store.get(pending)["status"], "queued")
+
+class TestJobQueue(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.queue = JobQueue(
+            os.path.join(cls.tmp_dir, "jobs.db"), HANDLERS, workers=2, poll_interval=0.05, extra_paths=[MODEL_DIR]
+        )
+        cls.queue.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.queue.stop()
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+
+    def test_runs_job_with_progress(self):
+        job_id = self.queue.submit("count", {"steps": 3})
+        job = wait_for(self.queue, job_id)
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["progress"], 1.0)
+        self.assertEqual(self.queue.get(job_id, with_result=True)["result"], {"total": 3})
+
+    def test_failure_is_recorded(self):
+        job = wait_for(self.queue, self.queue.submit("fail"))
+        self.assertEqual(job["status"], "failed")
+        self.assertIn("boom", job["error"])
+
+    def test_cancel_running_job(self):
+        job_id = self.queue.submit("count", {"steps": 200, "delay": 0.05})
+        wait_for(self.queue, job_id, statuses=("running",))
+        self.queue.cancel(job_id)
+        job = wait_for(self.queue, job_id)
+        self.assertEqual(job["status"], "cancelled")
+        self.assertLess(job["progress"], 1.0)
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            self.queue.submit("mine_bitcoin")
+
+    def test_jobs_run_in_parallel(self):
+        """Two workers take two jobs at once"""
+        start = time.monotonic()
+        ids = [self.queue.submit("count", {"steps": 10, "delay": 0.1}) for _ in range(2)]
+        for job_id in ids:
+            wait_for(self.queue, job_id)
+        self.assertLess(time.monotonic() - start, 1.9)
+
+    @unittest.skipUnless(os.path.exists(TFLITE_MODEL), "models/model.tflite not available")
+    def test_score_images(self):
+        job_id = "score-test"
+        job_dir = self.queue.job_dir(job_id)
+        for i in range(3):
+            buffer = BytesIO()
+            Image.fromarray(np.random.RandomState(i).randint(0, 255, (48, 48)).astype(np.uint8)).save(buffer, "JPEG")
+            with open(os.path.join(job_dir, f"{i:06d}"), "wb") as f:
+                f.write(buffer.getvalue())
+        with open(os.path.join(job_dir, "000003"), "wb") as f:
+            f.write(b"not an image")
+        params = {
+            "model": "model", "model_path": TFLITE_MODEL, "backend": "tflite", "batch_size": 2,
+            "files": [f"{i:06d}" for i in range(4)], "names": ["a.jpg", "b.jpg", "c.jpg", "bad.jpg"],
+        }
+        self.queue.submit("score_images", params, job_id)
+        job = wait_for(self.queue, job_id, timeout=120)
+        self.assertEqual(job["status"], "succeeded", job["error"])
+        result = self.queue.get(job_id, with_result=True)["result"]
+        self.assertEqual([r["filename"] for r in result["results"]], ["a.jpg", "b.jpg", "c.jpg", "bad.jpg"])
+        self.assertIn("prediction", result["results"][0])
+        self.assertIn("error", result["results"][3])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import sys
+import os
+import time
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.model.metrics import Registry, Counter, Gauge, Histogram
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_by_labels(self):
+        """Counters are tracked separately per label set"""
+        counter = Counter("requests_total", "Requests", ("status",), registry=self.registry)
+        counter.inc(status=200)
+        counter.inc(status=200)
+        counter.inc(status=500)
+        self.assertEqual(counter.value(status=200), 2)
+        text = self.registry.render()
+        self.assertIn('# TYPE requests_total counter', text)
+        self.assertIn('requests_total{status="200"} 2.0', text)
+        self.assertIn('requests_total{status="500"} 1.0', text)
+
+    def test_wrong_labels_rejected(self):
+        """Missing or unexpected labels raise ValueError"""
+        counter = Counter("c_total", "C", ("status",), registry=self.registry)
+        with self.assertRaises(ValueError):
+            counter.inc()
+        with self.assertRaises(ValueError):
+            counter.inc(status=200, route="/")
+
+    def test_duplicate_names_rejected(self):
+        """Two metrics cannot share a name in one registry"""
+        Counter("dup_total", "A", registry=self.registry)
+        with self.assertRaises(ValueError):
+            Gauge("dup_total", "B", registry=self.registry)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Bucket counts include every smaller bucket, and +Inf equals the count"""
+        histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0), registry=self.registry)
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+        text = self.registry.render()
+        self.assertIn('latency_seconds_bucket{le="0.1"} 2', text)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 3', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_count 4', text)
+        self.assertIn('latency_seconds_sum 3.65', text)
+
+    def test_histogram_timer(self):
+        """time() observes the duration of the with-block"""
+        histogram = Histogram("stage_seconds", "Stage", ("stage",), registry=self.registry)
+        with histogram.time(stage="decode"):
+            time.sleep(0.01)
+        self.assertEqual(histogram.count(stage="decode"), 1)
+        self.assertGreaterEqual(histogram._values[("decode",)][1], 0.01)
+
+    def test_gauge_callback_evaluated_at_scrape(self):
+        """Callback gauges read the live value, and failing callbacks are skipped"""
+        depth = [3]
+        gauge = Gauge("queue_depth", "Depth", registry=self.registry)
+        gauge.set_function(lambda: depth[0])
+        depth[0] = 5
+        self.assertIn('queue_depth 5.0', self.registry.render())
+
+        broken = Gauge("broken", "Broken", registry=self.registry)
+        broken.set_function(lambda: 1 / 0)
+        self.assertIn('# TYPE broken gauge', self.registry.render())
+
+    def test_label_values_escaped(self):
+        """Quotes and backslashes in label values do not break the format"""
+        counter = Counter("paths_total", "Paths", ("path",), registry=self.registry)
+        counter.inc(path='a"b\\c')
+        self.assertIn('paths_total{path="a\\"b\\\\c"} 1.0', self.registry.render())
+
+if __name__ == '__main__':
+    unittest.main()
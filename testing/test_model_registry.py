@@ -0,0 +1,178 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+import numpy as np
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.model.batching import MicroBatcher
+from backend.model.model_registry import ModelRegistry
+
+class FakeModel:
+    """Always predicts the class given by the last character of its path, optionally slowly"""
+    def __init__(self, path, delay=0.0):
+        self.label = int(path[-1])
+        self.delay = delay
+
+    def predict(self, batch):
+        time.sleep(self.delay)
+        scores = np.zeros((len(batch), 7), dtype=np.float32)
+        scores[:, self.label] = 1.0
+        return scores
+
+def make_registry(delay=0.0):
+    return ModelRegistry(
+        lambda path: FakeModel(path, delay),
+        lambda predict_fn: MicroBatcher(predict_fn, max_batch_size=8, max_wait_ms=1),
+        class_names=['Angry', 'Disgust', 'Fear', 'Happy', 'Neutral', 'Sad', 'Surprise'],
+    )
+
+def top_class(registry, key=None):
+    with registry.use(key) as version:
+        return version.name, int(np.argmax(version.predict(np.zeros((1, 48, 48, 1), np.float32))[0]))
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = make_registry()
+
+    def tearDown(self):
+        self.registry.stop()
+
+    def test_first_load_becomes_active(self):
+        """The first loaded version serves traffic; later loads wait to be promoted"""
+        self.assertIsNone(self.registry.active)
+        self.registry.load("v1", "model-3")
+        self.registry.load("v2", "model-4")
+        self.assertEqual(top_class(self.registry), ("v1", 3))
+
+    def test_promote_swaps_active(self):
+        """promote() switches which version new requests use"""
+        self.registry.load("v1", "model-3")
+        self.registry.load("v2", "model-4")
+        self.registry.promote("v2")
+        self.assertEqual(top_class(self.registry), ("v2", 4))
+        with self.assertRaises(KeyError):
+            self.registry.promote("v3")
+
+    def test_candidate_gets_its_share_of_traffic(self):
+        """Roughly candidate_percent of keys land on the candidate"""
+        self.registry.load("v1", "model-3")
+        self.registry.load("v2", "model-4")
+        self.registry.set_candidate("v2", 25)
+        picks = []
+        for i in range(2000):
+            with self.registry.use(f"session-{i}") as version:
+                picks.append(version.name)
+        share = picks.count("v2") / len(picks)
+        self.assertGreater(share, 0.2)
+        self.assertLess(share, 0.3)
+
+    def test_routing_is_sticky_per_key(self):
+        """The same key always maps to the same side of the split"""
+        self.registry.load("v1", "model-3")
+        self.registry.load("v2", "model-4")
+        self.registry.set_candidate("v2", 50)
+        for i in range(50):
+            first = top_class(self.registry, f"user-{i}")
+            for _ in range(3):
+                self.assertEqual(top_class(self.registry, f"user-{i}"), first)
+
+    def test_candidate_validation(self):
+        """Percent must be 0-100 and the active version cannot also be the candidate"""
+        self.registry.load("v1", "model-3")
+        self.registry.load("v2", "model-4")
+        with self.assertRaises(ValueError):
+            self.registry.set_candidate("v2", 120)
+        with self.assertRaises(ValueError):
+            self.registry.set_candidate("v1", 10)
+        self.registry.set_candidate("v2", 10)
+        self.registry.set_candidate(None, 0)
+        self.assertIsNone(self.registry.candidate)
+
+    def test_promoting_candidate_ends_experiment(self):
+        """A promoted candidate takes all traffic"""
+        self.registry.load("v1", "model-3")
+        self.registry.load("v2", "model-4")
+        self.registry.set_candidate("v2", 10)
+        self.registry.promote("v2")
+        self.assertIsNone(self.registry.candidate)
+        self.assertEqual({top_class(self.registry, f"k{i}")[0] for i in range(20)}, {"v2"})
+
+    def test_unload_refuses_serving_versions(self):
+        """Active and candidate versions must be replaced before they can be unloaded"""
+        self.registry.load("v1", "model-3")
+        self.registry.load("v2", "model-4")
+        self.registry.set_candidate("v2", 10)
+        with self.assertRaises(ValueError):
+            self.registry.unload("v1")
+        with self.assertRaises(ValueError):
+            self.registry.unload("v2")
+        self.registry.set_candidate(None, 0)
+        self.registry.unload("v2")
+        self.assertNotIn("v2", self.registry.versions)
+
+    def test_reload_replaces_active_version(self):
+        """Loading a name that is active swaps the new weights in under the same name"""
+        self.registry.load("v1", "model-3")
+        old = self.registry.active
+        self.registry.load("v1", "model-5")
+        self.assertIsNot(self.registry.active, old)
+        self.assertEqual(top_class(self.registry), ("v1", 5))
+        self.assertNotEqual(self.registry.active.cache_prefix, "")
+
+    def test_swap_does_not_drop_in_flight_requests(self):
+        """Requests that picked the old version finish on it while new ones use the new version"""
+        registry = make_registry(delay=0.05)
+        self.addCleanup(registry.stop)
+        registry.load("v1", "model-3")
+        registry.load("v2", "model-4")
+        results, errors = [], []
+
+        def client():
+            try:
+                for _ in range(10):
+                    results.append(top_class(registry))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=client) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        registry.promote("v2")
+        # Replace the retired name too, which stops v1's old batcher once drained
+        registry.load("v1", "model-6")
+        for thread in threads:
+            thread.join(timeout=10)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), 40)
+        self.assertIn(("v1", 3), results)
+        self.assertEqual(results[-1], ("v2", 4))
+
+    def test_stats_report_latency_and_distribution(self):
+        """Per-version stats cover forward-pass latency and the recorded class distribution"""
+        self.registry.load("v1", "model-3")
+        with self.registry.use() as version:
+            for _ in range(4):
+                version.record(version.predict(np.zeros((1, 48, 48, 1), np.float32))[0])
+        stats = self.registry.stats()
+        self.assertEqual(stats["active"], "v1")
+        model = stats["models"]["v1"]
+        self.assertEqual(model["requests"], 4)
+        self.assertEqual(model["distribution"], {"happy": 1.0})
+        self.assertIsNotNone(model["inference_p95_ms"])
+
+    def test_restart_after_stop(self):
+        """stop()/restart() recreate the batcher threads, as around a fork"""
+        self.registry.load("v1", "model-3")
+        self.registry.stop()
+        self.registry.restart()
+        self.assertEqual(top_class(self.registry), ("v1", 3))
+
+if __name__ == '__main__':
+    unittest.main()
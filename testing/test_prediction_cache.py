@@ -0,0 +1,96 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from backend.model.prediction_cache import PredictionCache, SqlitePredictionStore, tensor_key
+    import_error = None
+except Exception as e:
+    import_error = str(e)
+    PredictionCache = None
+
+SCORES = np.array([0.1, 0.0, 0.0, 0.7, 0.1, 0.1, 0.0], dtype=np.float32)
+
+@unittest.skipIf(PredictionCache is None, f"Skipping tests because import failed: {import_error}")
+class TestTensorKey(unittest.TestCase):
+    def test_same_pixels_same_key(self):
+        """Tensors that normalize to the same pixels share a key"""
+        pixels = np.random.RandomState(0).randint(0, 256, (48, 48, 1))
+        a = (pixels / 255.0).astype(np.float32)
+        b = (pixels.astype(np.float64) / 255.0)
+        self.assertEqual(tensor_key(a), tensor_key(b))
+
+    def test_reduced_bits_absorb_small_noise(self):
+        """With fewer bits, a one-level pixel change inside a bucket keeps the key"""
+        pixels = np.full((48, 48, 1), 64, dtype=np.float32)
+        noisy = pixels.copy()
+        noisy[0, 0, 0] = 65
+        self.assertNotEqual(tensor_key(pixels / 255.0), tensor_key(noisy / 255.0))
+        self.assertEqual(tensor_key(pixels / 255.0, bits=6), tensor_key(noisy / 255.0, bits=6))
+
+@unittest.skipIf(PredictionCache is None, f"Skipping tests because import failed: {import_error}")
+class TestPredictionCache(unittest.TestCase):
+    def test_hit_and_miss_counters(self):
+        """Lookups are counted as hits or misses"""
+        cache = PredictionCache(max_entries=4)
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', SCORES)
+        np.testing.assert_array_equal(cache.get('a'), SCORES)
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 1, 1))
+        self.assertAlmostEqual(stats['hit_ratio'], 0.5)
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted first"""
+        cache = PredictionCache(max_entries=2)
+        cache.put('a', SCORES)
+        cache.put('b', SCORES)
+        cache.get('a')
+        cache.put('c', SCORES)
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_ttl_expiry(self):
+        """Entries expire after the TTL"""
+        cache = PredictionCache(ttl=0.05)
+        cache.put('a', SCORES)
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+@unittest.skipIf(PredictionCache is None, f"Skipping tests because import failed: {import_error}")
+class TestSqlitePredictionStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'predictions.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_shared_between_caches(self):
+        """A second cache (another worker) sees entries written by the first"""
+        first = PredictionCache(store=SqlitePredictionStore(self.path))
+        second = PredictionCache(store=SqlitePredictionStore(self.path))
+        first.put('frame', SCORES)
+        np.testing.assert_allclose(second.get('frame'), SCORES)
+        self.assertEqual(second.stats()['hits'], 1)
+        first.store.close()
+        second.store.close()
+
+    def test_expired_entries_not_returned(self):
+        """Stored entries respect the TTL"""
+        store = SqlitePredictionStore(self.path)
+        store.put('frame', SCORES, ttl=-1)
+        self.assertIsNone(store.get('frame'))
+        store.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import sys
+import os
+import numpy as np
+from io import BytesIO
+from PIL import Image
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from backend.model.preprocessing import BufferPool, decode_grayscale, preprocess_batch, preprocess_into
+    import_error = None
+except Exception as e:
+    import_error = str(e)
+    decode_grayscale = None
+
+def encode(image, fmt='JPEG'):
+    buffer = BytesIO()
+    image.save(buffer, fmt)
+    return buffer.getvalue()
+
+def webcam_frame(width=1280, height=720):
+    """Smooth gradient frame that compresses like a real webcam image"""
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    rgb = np.stack([(x + y) / 2, np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width))], axis=-1)
+    return Image.fromarray(rgb.astype(np.uint8), 'RGB')
+
+@unittest.skipIf(decode_grayscale is None, f"Skipping tests because import failed: {import_error}")
+class TestPreprocessing(unittest.TestCase):
+    def test_jpeg_decoded_in_draft_mode(self):
+        """Large JPEGs are decoded straight to reduced-size grayscale"""
+        image = decode_grayscale(encode(webcam_frame()))
+        self.assertEqual(image.mode, 'L')
+        self.assertLess(image.width, 1280)
+        self.assertGreaterEqual(min(image.size), 48)
+
+    def test_png_decoded_at_full_size(self):
+        """Non-JPEG formats are converted without draft scaling"""
+        image = decode_grayscale(BytesIO(encode(webcam_frame(200, 100), 'PNG')))
+        self.assertEqual(image.mode, 'L')
+        self.assertEqual(image.size, (200, 100))
+
+    def test_preprocess_into_matches_reference(self):
+        """Writing into a buffer gives the same values as the original resize and divide"""
+        image = webcam_frame(320, 240)
+        reference = np.array(image.convert('L').resize((48, 48)), dtype=np.float32) / 255.0
+
+        out = np.zeros((48, 48, 1), dtype=np.float32)
+        result = preprocess_into(image, out)
+        self.assertIs(result, out)
+        np.testing.assert_allclose(out[..., 0], reference, atol=1e-6)
+
+    def test_draft_decode_close_to_full_decode(self):
+        """Draft-mode decoding stays close to decoding at full resolution"""
+        data = encode(webcam_frame())
+        full = preprocess_into(Image.open(BytesIO(data)).convert('L'), np.empty((48, 48, 1), np.float32))
+        draft = preprocess_into(decode_grayscale(data), np.empty((48, 48, 1), np.float32))
+        self.assertLess(float(np.abs(full - draft).mean()), 0.02)
+
+    def test_preprocess_batch_in_place(self):
+        """The batched variant fills a caller-provided (N, 48, 48, 1) array"""
+        images = [Image.new('L', (64, 64), color=c) for c in (0, 128, 255)]
+        out = np.full((3, 48, 48, 1), -1.0, dtype=np.float32)
+        result = preprocess_batch(images, out=out)
+        self.assertIs(result, out)
+        self.assertTrue(np.allclose(out[0], 0.0))
+        self.assertTrue(np.allclose(out[1], 128 / 255.0))
+        self.assertTrue(np.allclose(out[2], 1.0))
+        self.assertEqual(preprocess_batch(images).shape, (3, 48, 48, 1))
+
+    def test_buffer_pool_reuses_buffers(self):
+        """Returned buffers are handed out again instead of reallocated"""
+        pool = BufferPool(batch_size=1, capacity=1)
+        with pool.borrow() as first:
+            self.assertEqual(first.shape, (1, 48, 48, 1))
+            with pool.borrow() as overflow:
+                self.assertIsNot(overflow, first)
+        with pool.borrow() as again:
+            self.assertTrue(again is first or again is overflow)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import sys
+import os
+import base64
+from io import BytesIO
+from unittest.mock import patch
+from PIL import Image
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from backend.model.emotion_agent import EmotionAgent
+    import_error = None
+except Exception as e:
+    import_error = str(e)
+    EmotionAgent = None
+
+def encoded(size, fmt='JPEG', mode='RGB'):
+    buffer = BytesIO()
+    Image.new(mode, size, color=(90, 120, 150, 255)[:len(mode)]).save(buffer, fmt)
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+def decoded(image_b64):
+    return Image.open(BytesIO(base64.b64decode(image_b64)))
+
+@unittest.skipIf(EmotionAgent is None, f"Skipping tests because import failed: {import_error}")
+class TestProcessImage(unittest.TestCase):
+    def setUp(self):
+        with patch.dict(os.environ, {"GROQ_API_KEY": ""}):
+            self.agent = EmotionAgent()
+
+    def test_small_jpeg_passes_through(self):
+        """JPEGs already within the target size are returned untouched"""
+        original = encoded((640, 480))
+        self.assertIs(self.agent.process_image(original), original)
+
+    def test_small_jpeg_bytes_passthrough(self):
+        """Raw JPEG bytes are base64 encoded without re-encoding the image"""
+        original = encoded((320, 240))
+        self.assertEqual(self.agent.process_image(base64.b64decode(original)), original)
+
+    def test_large_jpeg_downscaled(self):
+        """Phone-camera sized JPEGs are shrunk to fit the target with aspect ratio kept"""
+        result = decoded(self.agent.process_image(encoded((4032, 3024))))
+        self.assertEqual(result.format, 'JPEG')
+        self.assertEqual(result.size, (1024, 768))
+
+    def test_portrait_jpeg_downscaled(self):
+        """Portrait images fit the target height"""
+        result = decoded(self.agent.process_image(encoded((3024, 4032))))
+        self.assertEqual(result.size, (768, 1024))
+
+    def test_png_with_alpha_converted_to_jpeg(self):
+        """Non-JPEG uploads, including RGBA, are re-encoded as JPEG"""
+        result = decoded(self.agent.process_image(encoded((200, 100), fmt='PNG', mode='RGBA')))
+        self.assertEqual(result.format, 'JPEG')
+        self.assertEqual(result.size, (200, 100))
+
+    def test_processed_payload_cached(self):
+        """A repeated upload is served from the content-hash cache"""
+        original = encoded((2000, 1500))
+        first = self.agent.process_image(original)
+        with patch.object(self.agent, '_process_image_bytes', side_effect=AssertionError("not cached")):
+            self.assertEqual(self.agent.process_image(original), first)
+
+    def test_cache_is_bounded(self):
+        """The cache never grows past its configured size"""
+        self.agent.image_cache_size = 2
+        for width in (1100, 1200, 1300):
+            self.agent.process_image(encoded((width, 900)))
+        self.assertEqual(len(self.agent._image_cache), 2)
+
+    def test_invalid_image_returned_unchanged(self):
+        """Undecodable data falls back to the original payload"""
+        bogus = base64.b64encode(b'not an image').decode('utf-8')
+        self.assertEqual(self.agent.process_image(bogus), bogus)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+import threading
+import time
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.model.profiling import Profile, Profiler
+
+def busy_leaf(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def busy_parent(seconds):
+    busy_leaf(seconds)
+
+class TestProfile(unittest.TestCase):
+    def test_collapsed_merges_repeated_stacks(self):
+        profile = Profile("p", threading.get_ident())
+        frames = sys._current_frames()
+        for _ in range(3):
+            profile.add(frames, time.perf_counter())
+        lines = profile.collapsed().splitlines()
+        self.assertEqual(len(lines), 1)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertEqual(count, "3")
+        self.assertTrue(stack.startswith("request;"))
+        self.assertIn("test_collapsed_merges_repeated_stacks (test_profiling.py:", stack)
+
+    def test_speedscope_document(self):
+        profile = Profile("p", threading.get_ident())
+        profile.add(sys._current_frames(), time.perf_counter())
+        document = profile.speedscope()
+        sampled = document["profiles"][0]
+        self.assertEqual(sampled["type"], "sampled")
+        self.assertEqual(len(sampled["samples"]), len(sampled["weights"]))
+        names = [frame["name"] for frame in document["shared"]["frames"]]
+        self.assertEqual(names[sampled["samples"][0][0]], "request")
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_profiles_only_selected_requests(self):
+        profiler = Profiler(self.tmp_dir)
+        self.assertIsNone(profiler.start("GET /"))
+        profile = profiler.start("GET /", requested=True)
+        self.assertIsNotNone(profile)
+        profiler.stop(profile)
+
+    def test_samples_request_thread(self):
+        """A busy function shows up under the request root in the written profile"""
+        profiler = Profiler(self.tmp_dir, interval=0.001, output_format="collapsed")
+        profile = profiler.start("POST /predict", requested=True)
+        busy_parent(0.2)
+        path = profiler.stop(profile)
+        self.assertTrue(path.endswith(".folded"))
+        with open(path) as f:
+            content = f.read()
+        busy = [line for line in content.splitlines() if "busy_parent" in line and "busy_leaf" in line]
+        self.assertTrue(busy)
+        self.assertGreater(sum(int(line.rsplit(" ", 1)[1]) for line in busy), 10)
+        self.assertIn("POST_predict", os.path.basename(path))
+
+    def test_speedscope_file(self):
+        profiler = Profiler(self.tmp_dir, interval=0.001)
+        profile = profiler.start("GET /", requested=True)
+        busy_leaf(0.05)
+        with open(profiler.stop(profile)) as f:
+            document = json.load(f)
+        self.assertGreater(len(document["profiles"][0]["samples"]), 0)
+
+    def test_window_and_active_limit(self):
+        profiler = Profiler(self.tmp_dir, max_active=1)
+        profiler.enable_window(10)
+        first = profiler.start("GET /")
+        self.assertIsNotNone(first)
+        self.assertIsNone(profiler.start("GET /"))
+        self.assertEqual(profiler.stats()["skipped"], 1)
+        profiler.stop(first)
+        profiler.enable_window(0)
+        self.assertIsNone(profiler.start("GET /"))
+
+    def test_sample_rate(self):
+        profiler = Profiler(self.tmp_dir, sample_rate=1.0)
+        profile = profiler.start("GET /")
+        self.assertIsNotNone(profile)
+        profiler.stop(profile)
+
+    def test_retention(self):
+        profiler = Profiler(self.tmp_dir, max_files=2)
+        for _ in range(4):
+            profiler.stop(profiler.start("GET /", requested=True))
+        self.assertEqual(len(profiler.files()), 2)
+
+    def test_stop_releases_slot_on_failure(self):
+        # A file where the profile directory should be makes the write fail
+        blocked = os.path.join(self.tmp_dir, "blocked")
+        open(blocked, "w").close()
+        profiler = Profiler(blocked, max_active=1)
+        profile = profiler.start("GET /", requested=True)
+        with self.assertRaises(OSError):
+            profiler.stop(profile)
+        self.assertEqual(profiler.stats()["active"], 0)
+        self.assertNotIn(profile, profiler.sampler._profiles)
+        self.assertIsNone(profiler.stop(profile))
+        self.assertEqual(profiler.stats()["active"], 0)
+        self.assertIsNotNone(profiler.start("GET /", requested=True))
+
+    def test_rejects_unknown_format(self):
+        with self.assertRaises(ValueError):
+            Profiler(self.tmp_dir, output_format="pprof")
+
+if __name__ == '__main__':
+    unittest.main()
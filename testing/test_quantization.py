@@ -0,0 +1,141 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import numpy as np
+from PIL import Image
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from backend.model.emotions import CLASS_NAMES
+from backend.model.inference import artifact_backend, backend_model_path
+from backend.model.preprocessing import preprocess_batch
+from backend.model.quantize_model import compare_predictions, load_image_set
+
+try:
+    import tensorflow  # noqa: F401
+    from backend.model.inference import load_backend
+    from backend.model.quantize_model import quantize
+    from mock_model import create_dummy_model
+    import_error = None
+except Exception as e:
+    import_error = str(e)
+    quantize = None
+
+def one_hot(indices, confidence=0.9):
+    scores = np.full((len(indices), 7), (1 - confidence) / 6, dtype=np.float32)
+    scores[np.arange(len(indices)), indices] = confidence
+    return scores
+
+class TestComparePredictions(unittest.TestCase):
+    def test_identical_scores(self):
+        """A model compared with itself agrees everywhere with zero drift"""
+        scores = one_hot([0, 3, 3, 4])
+        report = compare_predictions(scores, scores, CLASS_NAMES)
+        self.assertEqual(report["top1_agreement"], 1.0)
+        self.assertEqual(report["max_abs_drift"], 0.0)
+        self.assertEqual(report["per_class"]["happy"]["count"], 2)
+        self.assertIsNone(report["per_class"]["sad"]["agreement"])
+
+    def test_disagreement_and_drift(self):
+        """Flipped top-1 and lowered confidence show up per class"""
+        reference = one_hot([3, 3, 5, 5])
+        candidate = one_hot([3, 4, 5, 5], confidence=0.8)
+        report = compare_predictions(reference, candidate, CLASS_NAMES)
+        self.assertEqual(report["top1_agreement"], 0.75)
+        self.assertEqual(report["per_class"]["happy"]["agreement"], 0.5)
+        self.assertEqual(report["per_class"]["sad"]["agreement"], 1.0)
+        self.assertLess(report["top1_confidence_drift"], 0)
+        self.assertNotIn("accuracy", report)
+
+    def test_accuracy_against_labels(self):
+        """Labels add float32 and int8 accuracy"""
+        report = compare_predictions(one_hot([0, 1]), one_hot([0, 2]), CLASS_NAMES, labels=np.array([0, 1]))
+        self.assertEqual(report["accuracy"], {"float32": 1.0, "int8": 0.5})
+
+class TestLoadImageSet(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_class_directories_become_labels(self):
+        """FER2013-style class folders are preprocessed like /predict and labelled"""
+        for name in ("happy", "sad"):
+            os.makedirs(os.path.join(self.tmp_dir, name))
+            for i in range(2):
+                Image.new("RGB", (64, 64), (i * 100, 50, 50)).save(os.path.join(self.tmp_dir, name, f"{i}.png"))
+        inputs, labels = load_image_set(self.tmp_dir, CLASS_NAMES, preprocess_batch)
+        self.assertEqual(inputs.shape, (4, 48, 48, 1))
+        self.assertEqual(inputs.dtype, np.float32)
+        self.assertEqual(sorted(labels.tolist()), [3, 3, 5, 5])
+
+    def test_unsorted_images_have_no_labels(self):
+        Image.new("L", (48, 48)).save(os.path.join(self.tmp_dir, "face.jpg"))
+        inputs, labels = load_image_set(self.tmp_dir, CLASS_NAMES, preprocess_batch)
+        self.assertEqual(len(inputs), 1)
+        self.assertIsNone(labels)
+
+    def test_npz_input(self):
+        path = os.path.join(self.tmp_dir, "calibration.npz")
+        np.savez(path, images=np.random.rand(10, 48, 48).astype(np.float32), labels=np.arange(10) % 7)
+        inputs, labels = load_image_set(path, CLASS_NAMES, preprocess_batch, limit=4)
+        self.assertEqual(inputs.shape, (4, 48, 48, 1))
+        self.assertEqual(labels.tolist(), [0, 1, 2, 3])
+
+class TestArtifactPaths(unittest.TestCase):
+    def test_int8_path(self):
+        self.assertEqual(backend_model_path("models/model.h5", "tflite_int8"), "models/model_int8.tflite")
+        self.assertEqual(backend_model_path("models/model_int8.tflite", "tflite_int8"), "models/model_int8.tflite")
+
+    def test_backend_from_extension(self):
+        self.assertEqual(artifact_backend("models/model_int8.tflite"), "tflite_int8")
+        self.assertEqual(artifact_backend("models/model.tflite"), "tflite")
+        self.assertEqual(artifact_backend("models/model.onnx"), "onnx")
+        self.assertIsNone(artifact_backend("models/model.h5"))
+
+@unittest.skipIf(quantize is None, f"Skipping tests because import failed: {import_error}")
+class TestInt8Model(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        import tensorflow as tf
+
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.model_path = os.path.join(cls.tmp_dir, "model.h5")
+        create_dummy_model(cls.model_path)
+        calibration = np.random.RandomState(0).rand(32, 48, 48, 1).astype(np.float32)
+        model = tf.keras.models.load_model(cls.model_path, compile=False)
+        quantize(model, calibration, backend_model_path(cls.model_path, "tflite_int8"))
+        cls.keras = load_backend("keras", cls.model_path)
+        cls.int8 = load_backend("tflite_int8", cls.model_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+
+    def test_integer_io(self):
+        """The quantized model has int8 input and output tensors"""
+        self.assertTrue(self.int8.quantized)
+        self.assertEqual(self.int8._input["dtype"], np.int8)
+
+    def test_float_in_float_out(self):
+        """The backend quantizes inputs and dequantizes scores transparently"""
+        batch = np.random.RandomState(1).rand(5, 48, 48, 1).astype(np.float32)
+        scores = self.int8.predict(batch)
+        self.assertEqual(scores.shape, (5, 7))
+        self.assertEqual(scores.dtype, np.float32)
+        np.testing.assert_allclose(scores.sum(axis=1), 1.0, atol=0.05)
+        # Batch size changes between calls must be handled
+        self.assertEqual(self.int8.predict(batch[:1]).shape, (1, 7))
+
+    def test_close_to_float_model(self):
+        """int8 scores stay within a few points of the float32 model's"""
+        batch = np.random.RandomState(2).rand(16, 48, 48, 1).astype(np.float32)
+        np.testing.assert_allclose(self.int8.predict(batch), self.keras.predict(batch), atol=0.05)
+
+if __name__ == '__main__':
+    unittest.main()
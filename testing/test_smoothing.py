@@ -0,0 +1,98 @@
+import unittest
+import sys
+import os
+import numpy as np
+from PIL import Image
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.model.smoothing import StreamSmoother, frame_signature, signature_distance
+
+def frame(seed=0, brightness=0, size=(320, 240)):
+    pixels = np.random.RandomState(seed).randint(0, 200, size=(size[1], size[0])) + brightness
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), mode="L")
+
+def one_hot(index):
+    scores = np.zeros(7, dtype=np.float32)
+    scores[index] = 1.0
+    return scores
+
+class TestFrameSignature(unittest.TestCase):
+    def test_identical_frames(self):
+        self.assertEqual(signature_distance(frame_signature(frame()), frame_signature(frame())), 0.0)
+
+    def test_different_frames(self):
+        self.assertGreater(signature_distance(frame_signature(frame(0)), frame_signature(frame(1))), 0.01)
+
+    def test_ignores_global_brightness(self):
+        """An auto-exposure shift is not treated as a change"""
+        distance = signature_distance(frame_signature(frame(brightness=0)), frame_signature(frame(brightness=30)))
+        self.assertLess(distance, 0.005)
+
+class TestStreamSmoother(unittest.TestCase):
+    def run_frame(self, smoother, image, scores):
+        """Mimic the app: reuse on unchanged frames, otherwise smooth fresh scores"""
+        if not smoother.changed(image):
+            return smoother.last_result, True
+        smoothed = smoother.smooth(scores)
+        smoother.last_result = smoothed
+        return smoothed, False
+
+    def test_first_frame_is_inferred(self):
+        smoother = StreamSmoother()
+        self.assertTrue(smoother.changed(frame()))
+
+    def test_static_scene_reuses_result(self):
+        """Unchanged frames skip the model"""
+        smoother = StreamSmoother(change_threshold=0.01, max_reuse=100)
+        outcomes = [self.run_frame(smoother, frame(), one_hot(3))[1] for _ in range(10)]
+        self.assertEqual(outcomes, [False] + [True] * 9)
+        self.assertEqual(smoother.stats()["inferred"], 1)
+        self.assertEqual(smoother.stats()["reused"], 9)
+
+    def test_changed_frame_is_inferred(self):
+        smoother = StreamSmoother(change_threshold=0.01)
+        self.run_frame(smoother, frame(0), one_hot(3))
+        self.assertTrue(smoother.changed(frame(1)))
+
+    def test_max_reuse_forces_refresh(self):
+        """At most max_reuse frames in a row are skipped"""
+        smoother = StreamSmoother(max_reuse=3)
+        outcomes = [self.run_frame(smoother, frame(), one_hot(3))[1] for _ in range(9)]
+        self.assertEqual(outcomes, [False, True, True, True, False, True, True, True, False])
+
+    def test_zero_threshold_disables_skipping(self):
+        smoother = StreamSmoother(change_threshold=0)
+        outcomes = [self.run_frame(smoother, frame(), one_hot(3))[1] for _ in range(3)]
+        self.assertEqual(outcomes, [False, False, False])
+
+    def test_ema_smoothing(self):
+        """The EMA puts alpha on the newest frame, so one outlier frame is damped"""
+        smoother = StreamSmoother(method="ema", alpha=0.25)
+        smoother.smooth(one_hot(3))
+        smoothed = smoother.smooth(one_hot(5))
+        self.assertEqual(int(np.argmax(smoothed)), 3)
+        self.assertAlmostEqual(float(smoothed[3]), 0.75)
+        self.assertAlmostEqual(float(smoothed[5]), 0.25)
+        self.assertAlmostEqual(float(smoothed.sum()), 1.0, places=5)
+
+    def test_window_smoothing(self):
+        """Window smoothing averages the last `window` vectors"""
+        smoother = StreamSmoother(method="window", window=2)
+        smoother.smooth(one_hot(0))
+        smoother.smooth(one_hot(1))
+        smoothed = smoother.smooth(one_hot(1))
+        np.testing.assert_allclose(smoothed, one_hot(1))
+
+    def test_no_smoothing(self):
+        smoother = StreamSmoother(method="none")
+        smoother.smooth(one_hot(0))
+        np.testing.assert_allclose(smoother.smooth(one_hot(4)), one_hot(4))
+
+    def test_rejects_unknown_method(self):
+        with self.assertRaises(ValueError):
+            StreamSmoother(method="median")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.model.startup import Startup, READY, FAILED, LOADING
+
+def sleeper(seconds):
+    return lambda: time.sleep(seconds)
+
+def failing():
+    raise OSError("weights file missing")
+
+class TestStartup(unittest.TestCase):
+    def test_components_load_in_parallel(self):
+        """Background loaders overlap instead of running one after another"""
+        startup = Startup()
+        startup.add("model", sleeper(0.3))
+        startup.add("faces", sleeper(0.3))
+        start = time.perf_counter()
+        startup.start()
+        self.assertFalse(startup.ready)
+        self.assertTrue(startup.wait(timeout=5))
+        self.assertLess(time.perf_counter() - start, 0.55)
+
+    def test_start_returns_before_loading_finishes(self):
+        """start() does not block on slow loaders"""
+        release = threading.Event()
+        startup = Startup()
+        startup.add("model", release.wait)
+        startup.start()
+        self.assertEqual(startup.state("model"), LOADING)
+        release.set()
+        self.assertTrue(startup.wait(timeout=5, name="model"))
+
+    def test_required_failure_blocks_readiness(self):
+        """A failing required component leaves the app not ready and records the error"""
+        startup = Startup()
+        startup.add("model", failing)
+        startup.start()
+        self.assertFalse(startup.wait(timeout=5))
+        status = startup.status()["model"]
+        self.assertEqual(status["state"], FAILED)
+        self.assertIn("weights file missing", status["error"])
+
+    def test_optional_failure_still_ready(self):
+        """Optional components only show up in the status"""
+        startup = Startup()
+        startup.add("model", sleeper(0))
+        startup.add("chat_client", failing, required=False)
+        startup.start()
+        self.assertTrue(startup.wait(timeout=5))
+        self.assertEqual(startup.state("chat_client"), FAILED)
+
+    def test_eager_start_loads_inline(self):
+        """background=False loads everything before returning"""
+        loaded = []
+        startup = Startup()
+        startup.add("model", lambda: loaded.append("model"))
+        startup.start(background=False)
+        self.assertEqual(loaded, ["model"])
+        self.assertEqual(startup.state("model"), READY)
+        self.assertIsNotNone(startup.status()["model"]["seconds"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import sys
+import os
+import json
+import queue
+import threading
+import time
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from backend.model.stream import LatestFrameSlot, FrameStreamSession
+    import_error = None
+except Exception as e:
+    import_error = str(e)
+    LatestFrameSlot = None
+
+@unittest.skipIf(LatestFrameSlot is None, f"Skipping tests because import failed: {import_error}")
+class TestLatestFrameSlot(unittest.TestCase):
+    def test_newer_frame_replaces_pending(self):
+        """Only the newest unprocessed frame is kept"""
+        slot = LatestFrameSlot()
+        self.assertFalse(slot.put(b'1'))
+        self.assertTrue(slot.put(b'2'))
+        self.assertTrue(slot.put(b'3'))
+        self.assertEqual(slot.get(timeout=1), (3, b'3'))
+        self.assertEqual(slot.dropped, 2)
+        self.assertEqual(slot.received, 3)
+
+    def test_get_times_out_when_empty(self):
+        """get returns None when no frame arrives in time"""
+        self.assertIsNone(LatestFrameSlot().get(timeout=0.01))
+
+    def test_close_wakes_waiter(self):
+        """Closing the slot releases a blocked consumer"""
+        slot = LatestFrameSlot()
+        result = []
+        t = threading.Thread(target=lambda: result.append(slot.get()))
+        t.start()
+        slot.close()
+        t.join(timeout=1)
+        self.assertEqual(result, [None])
+
+@unittest.skipIf(LatestFrameSlot is None, f"Skipping tests because import failed: {import_error}")
+class TestFrameStreamSession(unittest.TestCase):
+    def _run_session(self, frames, process_frame, gap=0.0):
+        incoming = queue.Queue()
+        sent = []
+
+        def receive():
+            return incoming.get()
+
+        session = FrameStreamSession(receive, lambda message: sent.append(json.loads(message)), process_frame)
+        runner = threading.Thread(target=session.run)
+        runner.start()
+        for frame in frames:
+            incoming.put(frame)
+            time.sleep(gap)
+        # Let the worker drain before disconnecting
+        time.sleep(0.3)
+        incoming.put(None)
+        runner.join(timeout=2)
+        self.assertFalse(runner.is_alive())
+        return sent
+
+    def test_each_frame_answered_when_fast(self):
+        """A fast model answers every frame in order"""
+        sent = self._run_session([b'a', b'b', b'c'], lambda frame: {"echo": frame.decode()}, gap=0.05)
+        self.assertEqual([m['echo'] for m in sent], ['a', 'b', 'c'])
+        self.assertEqual([m['frame'] for m in sent], [1, 2, 3])
+        self.assertTrue(all('latency_ms' in m for m in sent))
+
+    def test_stale_frames_dropped_when_slow(self):
+        """A slow model skips stale frames but always ends on the newest"""
+        def slow(frame):
+            time.sleep(0.1)
+            return {"echo": frame.decode()}
+
+        frames = [str(i).encode() for i in range(10)]
+        sent = self._run_session(frames, slow, gap=0.01)
+        self.assertLess(len(sent), len(frames))
+        self.assertEqual(sent[-1]['echo'], '9')
+        self.assertGreater(sent[-1]['dropped'], 0)
+
+    def test_errors_reported_per_frame(self):
+        """A failing frame sends an error message and the stream keeps going"""
+        def process(frame):
+            if frame == b'bad':
+                raise ValueError("cannot identify image file")
+            return {"ok": True}
+
+        sent = self._run_session([b'bad', b'good'], process, gap=0.05)
+        self.assertIn('error', sent[0])
+        self.assertTrue(sent[1]['ok'])
+
+    def test_text_messages_ignored(self):
+        """Text messages are not treated as frames"""
+        sent = self._run_session(['hello', b'x'], lambda frame: {"n": len(frame)}, gap=0.05)
+        self.assertEqual(len(sent), 1)
+
+if __name__ == '__main__':
+    unittest.main()
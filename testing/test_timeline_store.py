@@ -0,0 +1,165 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+import glob
+import numpy as np
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.model.emotions import CLASS_NAMES
+from backend.model.timeline_store import TimelineStore
+
+T0 = 1_700_000_040.0  # A whole minute
+
+def one_hot(index, value=0.9):
+    scores = np.full(7, (1 - value) / 6, dtype=np.float32)
+    scores[index] = value
+    return scores
+
+class TestTimelineStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = TimelineStore(self.tmp_dir, CLASS_NAMES, chunk_rows=100)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_round_trip(self):
+        """uint8 scores come back within one quantization step"""
+        scores = np.random.RandomState(0).dirichlet(np.ones(7), size=50).astype(np.float32)
+        times = T0 + np.arange(50) * 0.1
+        self.store.append("alice", "s1", times, scores)
+        read_times, read_scores = self.store.read("alice", "s1")
+        np.testing.assert_allclose(read_times, times, atol=0.001)
+        np.testing.assert_allclose(read_scores, scores, atol=1 / 255)
+
+    def test_compact_on_disk(self):
+        """11 bytes per frame with uint8 scores"""
+        self.store.append("alice", "s1", T0 + np.arange(80), np.tile(one_hot(3), (80, 1)))
+        directory = self.store.stream_dir("alice", "s1")
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        self.assertEqual(size, 80 * 11)
+
+    def test_chunks_and_single_appends(self):
+        """Frames appended one at a time roll over into new chunks and still read in order"""
+        for i in range(250):
+            self.store.append("alice", "s1", T0 + i, one_hot(i % 7))
+        directory = self.store.stream_dir("alice", "s1")
+        self.assertEqual(len([name for name in os.listdir(directory) if name.endswith(".time")]), 3)
+        times, scores = self.store.read("alice", "s1")
+        self.assertEqual(len(times), 250)
+        self.assertTrue(np.all(np.diff(times) > 0))
+        self.assertEqual(list(scores.argmax(axis=1)[:8]), [0, 1, 2, 3, 4, 5, 6, 0])
+
+    def test_range_query(self):
+        self.store.append("alice", "s1", T0 + np.arange(250), np.tile(one_hot(0), (250, 1)))
+        times, _ = self.store.read("alice", "s1", start=T0 + 95, end=T0 + 105)
+        np.testing.assert_allclose(times, T0 + np.arange(95, 106))
+        self.assertEqual(len(self.store.read("alice", "s1", start=T0 + 1000)[0]), 0)
+
+    def test_per_minute_aggregate(self):
+        """Per-minute means, dominant emotion per bucket and the overall histogram"""
+        times = T0 + np.arange(180)
+        scores = np.array([one_hot(3) if t < 60 else one_hot(5) if t < 160 else one_hot(4) for t in range(180)])
+        self.store.append("alice", "s1", times, scores)
+        result = self.store.aggregate("alice", "s1", bucket=60)
+        self.assertEqual(result["frames"], 180)
+        self.assertEqual(result["start"], [T0, T0 + 60, T0 + 120])
+        self.assertEqual(result["count"], [60, 60, 60])
+        self.assertEqual(result["dominant"], ["happy", "sad", "sad"])
+        self.assertAlmostEqual(result["mean"]["happy"][0], 90.0, delta=0.5)
+        self.assertAlmostEqual(result["mean"]["neutral"][2], (20 * 90 + 40 * 100 / 60) / 60, delta=0.5)
+        self.assertEqual(result["histogram"], {
+            "angry": 0, "disgust": 0, "fear": 0, "happy": 60, "neutral": 20, "sad": 100, "surprise": 0,
+        })
+
+    def test_aggregate_skips_empty_buckets(self):
+        self.store.append("alice", "s1", [T0, T0 + 600], [one_hot(0), one_hot(1)])
+        result = self.store.aggregate("alice", "s1", bucket=60)
+        self.assertEqual(result["start"], [T0, T0 + 600])
+
+    def test_downsample(self):
+        self.store.append("alice", "s1", T0 + np.arange(1000) * 0.1, np.tile(one_hot(2), (1000, 1)))
+        result = self.store.downsample("alice", "s1", points=50)
+        self.assertLessEqual(len(result["start"]), 51)
+        self.assertEqual(sum(result["count"]), 1000)
+
+    def test_sessions_and_isolation(self):
+        self.store.append("alice", "s1", [T0, T0 + 5], [one_hot(0), one_hot(0)])
+        self.store.append("alice", "s2", [T0 + 100], [one_hot(0)])
+        self.store.append("bob", "s1", [T0], [one_hot(0)])
+        sessions = self.store.sessions("alice")
+        self.assertEqual([s["session"] for s in sessions], ["s2", "s1"])
+        self.assertEqual(sessions[1], {"session": "s1", "start": T0, "end": T0 + 5, "frames": 2})
+        self.assertEqual(len(self.store.read("bob", "s1")[0]), 1)
+        self.store.delete("alice", "s1")
+        self.assertEqual([s["session"] for s in self.store.sessions("alice")], ["s2"])
+        self.assertEqual(self.store.sessions("carol"), [])
+
+    def test_out_of_order_timestamps_are_clamped(self):
+        self.store.append("alice", "s1", [T0 + 10], [one_hot(0)])
+        self.store.append("alice", "s1", [T0 + 5], [one_hot(1)])
+        times, _ = self.store.read("alice", "s1")
+        self.assertEqual(list(times), [T0 + 10, T0 + 10])
+
+    def test_torn_write_is_repaired(self):
+        self.store.append("alice", "s1", [T0], [one_hot(0)])
+        prefix = os.path.join(self.store.stream_dir("alice", "s1"), f"000000-{int(T0 * 1000)}")
+        with open(prefix + ".scores", "ab") as f:
+            f.write(b"\x01\x02\x03")
+        self.assertEqual(len(self.store.read("alice", "s1")[0]), 1)
+        self.store.append("alice", "s1", [T0 + 1], [one_hot(4)])
+        _, scores = self.store.read("alice", "s1")
+        self.assertEqual(list(scores.argmax(axis=1)), [0, 4])
+
+    def test_concurrent_appends(self):
+        def writer(offset):
+            for i in range(50):
+                self.store.append("alice", "s1", T0 + offset + i, one_hot(offset % 7))
+
+        threads = [threading.Thread(target=writer, args=(k,)) for k in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        times, scores = self.store.read("alice", "s1")
+        self.assertEqual(len(times), 200)
+        self.assertTrue(np.all(np.diff(times) >= 0))
+        self.assertTrue(np.allclose(scores.max(axis=1), 0.9, atol=1 / 255))
+
+    def test_float16_scores(self):
+        store = TimelineStore(self.tmp_dir, CLASS_NAMES, score_dtype="float16")
+        store.append("alice", "s1", [T0], [one_hot(6, 0.123)])
+        self.assertAlmostEqual(float(store.read("alice", "s1")[1][0, 6]), 0.123, places=3)
+
+    def test_invalid_session_ids_are_rejected(self):
+        """Ids are never rewritten, so two different ids cannot share a stream"""
+        for session in ("../x", "a/b", "", "x" * 65):
+            with self.assertRaises(ValueError):
+                self.store.append("alice", session, [T0], [one_hot(0)])
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+    def test_retention_purges_idle_sessions(self):
+        store = TimelineStore(self.tmp_dir, CLASS_NAMES, retention=3600, purge_interval=0)
+        store.append("alice", "old", [T0], [one_hot(0)])
+        store.append("bob", "old", [T0], [one_hot(0)])
+        for path in glob.glob(os.path.join(self.tmp_dir, "*", "old", "*")):
+            os.utime(path, (time.time() - 7200, time.time() - 7200))
+        store.append("alice", "new", [T0], [one_hot(0)])
+        self.assertEqual([s["session"] for s in store.sessions("alice")], ["new"])
+        self.assertEqual(store.sessions("bob"), [])
+        self.assertEqual(os.listdir(self.tmp_dir), [store.user_key("alice")])
+
+    def test_locks_do_not_grow_with_sessions(self):
+        locks = list(self.store._locks)
+        for i in range(200):
+            self.store.append("alice", f"s{i}", [T0], [one_hot(0)])
+        self.assertEqual(self.store._locks, locks)
+
+if __name__ == '__main__':
+    unittest.main()
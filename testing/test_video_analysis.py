@@ -0,0 +1,113 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import numpy as np
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.model.emotions import CLASS_NAMES, format_prediction
+from backend.model.preprocessing import preprocess_batch
+from backend.model.video_analysis import VideoSummary, analyze_video, iter_sampled_frames
+
+try:
+    import cv2
+    import_error = None
+except Exception as e:
+    import_error = str(e)
+    cv2 = None
+
+def write_video(path, seconds=3, fps=10, size=(160, 120)):
+    """Dark frames for the first half of the clip, bright ones for the second"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for i in range(seconds * fps):
+        value = 30 if i < seconds * fps / 2 else 220
+        writer.write(np.full((size[1], size[0], 3), value, dtype=np.uint8))
+    writer.release()
+
+def brightness_model(batch):
+    """Scores 'happy' for bright inputs and 'sad' for dark ones"""
+    scores = np.full((len(batch), 7), 0.05, dtype=np.float32)
+    bright = batch.reshape(len(batch), -1).mean(axis=1) > 0.5
+    scores[bright, 3] = 0.7
+    scores[~bright, 5] = 0.7
+    return scores
+
+class TestVideoSummary(unittest.TestCase):
+    def test_max_emotions_match_live_detection(self):
+        """Peak confidence per top emotion, in percent, like maxEmotionsRef"""
+        summary = VideoSummary(CLASS_NAMES)
+        summary.add(0.0, [0, 0, 0, 0.6, 0.4, 0, 0])
+        summary.add(0.5, [0, 0, 0, 0.8, 0.2, 0, 0])
+        summary.add(1.0, [0, 0, 0, 0.3, 0.7, 0, 0])
+        result = summary.result()
+        self.assertEqual(result["max_emotions"], {"happy": 80.0, "neutral": 70.0})
+        self.assertEqual(result["dominant"], "happy")
+        self.assertEqual(result["changes"], 1)
+        self.assertEqual(result["frames"], 3)
+        self.assertEqual(result["duration"], 1.0)
+        self.assertAlmostEqual(result["share"]["happy"], 0.6667)
+
+    def test_empty(self):
+        result = VideoSummary(CLASS_NAMES).result()
+        self.assertEqual(result["frames"], 0)
+        self.assertIsNone(result["dominant"])
+        self.assertEqual(result["max_emotions"], {})
+
+@unittest.skipIf(cv2 is None, f"Skipping tests because import failed: {import_error}")
+class TestVideoAnalysis(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.video_path = os.path.join(cls.tmp_dir, "clip.avi")
+        write_video(cls.video_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+
+    def test_sampling_rate(self):
+        """A 3 s clip at 10 fps sampled at 2 fps gives one frame every 0.5 s"""
+        frames = list(iter_sampled_frames(self.video_path, sample_fps=2))
+        self.assertEqual([round(t, 2) for _, t, _ in frames], [0.0, 0.5, 1.0, 1.5, 2.0, 2.5])
+        self.assertEqual([index for index, _, _ in frames], [0, 5, 10, 15, 20, 25])
+        self.assertEqual(frames[0][2].ndim, 2)
+
+    def test_every_frame_and_limit(self):
+        self.assertEqual(len(list(iter_sampled_frames(self.video_path, sample_fps=0))), 30)
+        self.assertEqual(len(list(iter_sampled_frames(self.video_path, sample_fps=0, max_frames=7))), 7)
+
+    def test_unreadable_video(self):
+        with self.assertRaises(ValueError):
+            list(iter_sampled_frames(os.path.join(self.tmp_dir, "missing.mp4")))
+
+    def test_timeline_and_summary(self):
+        """Frames are scored in batches no larger than batch_size and summarized"""
+        batch_sizes = []
+
+        def predict(batch):
+            batch_sizes.append(len(batch))
+            return brightness_model(batch)
+
+        summary = VideoSummary(CLASS_NAMES)
+        timeline = list(analyze_video(
+            self.video_path, predict, preprocess_batch, format_prediction, summary, sample_fps=4, batch_size=4,
+        ))
+        self.assertEqual(len(timeline), 12)
+        self.assertEqual(batch_sizes, [4, 4, 4])
+        self.assertEqual(timeline[0]["prediction"], "Sad")
+        self.assertEqual(timeline[-1]["prediction"], "Happy")
+        self.assertIn("all_emotions", timeline[0])
+        # 0.25 s falls between frames, so the next frame (0.3 s) is taken
+        self.assertEqual(timeline[1]["time"], 0.3)
+
+        result = summary.result()
+        self.assertEqual(result["frames"], 12)
+        self.assertEqual(result["changes"], 1)
+        self.assertEqual(set(result["max_emotions"]), {"happy", "sad"})
+        self.assertAlmostEqual(result["max_emotions"]["happy"], 70.0, places=3)
+
+if __name__ == '__main__':
+    unittest.main()